@@ -17,6 +17,10 @@ if config.config_file_name is not None:
 
 database_url = decouple_config("DB_URL")
 
+# How long a DDL statement may wait for its lock on PostgreSQL before it
+# fails, instead of blocking every query queued behind it
+lock_timeout = decouple_config("MIGRATION_LOCK_TIMEOUT", default="5s")
+
 # Set the SQLAlchemy URL dynamically
 config.set_main_option("sqlalchemy.url", database_url)
 # add your model's MetaData object here
@@ -49,6 +53,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
     )
 
     with context.begin_transaction():
@@ -69,9 +74,17 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        if connection.dialect.name == "postgresql" and lock_timeout:
+            connection.exec_driver_sql(f"SET lock_timeout = '{lock_timeout}'")
+            connection.commit()
+
+        # One transaction per revision: a revision's locks are released when
+        # it's done, and the helpers in api/db/migrations.py that must run
+        # outside a transaction only commit their own revision
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
+            transaction_per_migration=True,
         )
 
         with context.begin_transaction():
@@ -1,4 +1,13 @@
 from abc import ABC, abstractmethod
+from typing import Any, Generic, List, Optional, Type, TypeVar, Union
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.exc import StatementError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.db.types import MalformedIdError
 
 
 class AsyncService(ABC):
@@ -21,3 +30,94 @@ class AsyncService(ABC):
     @abstractmethod
     async def delete(self):
         pass
+
+
+ModelType = TypeVar("ModelType")
+
+
+class AsyncCRUDService(AsyncService, Generic[ModelType]):
+    """CRUD operations for `model` over an `AsyncSession`, see `get_async_db`
+
+    Example use:
+        ``` python
+        class ProductService(AsyncCRUDService[Product]):
+            def __init__(self):
+                super().__init__(Product)
+
+        product_service = ProductService()
+
+        @router.post("/products")
+        async def create_product(
+            schema: ProductCreate, db: AsyncSession = Depends(get_async_db)
+        ):
+            return await product_service.create(db, schema)
+        ```
+    """
+
+    def __init__(self, model: Type[ModelType]):
+        self.model = model
+
+    @staticmethod
+    def _values(data: Union[BaseModel, dict], exclude_unset: bool = False) -> dict:
+        if isinstance(data, BaseModel):
+            return data.model_dump(exclude_unset=exclude_unset)
+        return dict(data)
+
+    async def create(self, db: AsyncSession, data: Union[BaseModel, dict]) -> ModelType:
+        obj = self.model(**self._values(data))
+        db.add(obj)
+        await db.commit()
+        await db.refresh(obj)
+        return obj
+
+    async def fetch(
+        self, db: AsyncSession, id: Any, raise_if_none: bool = True
+    ) -> Optional[ModelType]:
+        """Returns the object with primary key `id`. Raises a 404 if it
+        doesn't exist, unless `raise_if_none` is `False`
+        """
+
+        try:
+            obj = await db.get(self.model, id)
+        except StatementError as exc:
+            # No row can have an id that isn't a UUID
+            if not isinstance(exc.orig, MalformedIdError):
+                raise
+            obj = None
+
+        if obj is None and raise_if_none:
+            raise HTTPException(
+                status_code=404, detail=f"{self.model.__name__} does not exist"
+            )
+        return obj
+
+    async def fetch_all(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        **filters,
+    ) -> List[ModelType]:
+        """Returns the objects matching `filters` (column=value)"""
+
+        query = select(self.model).filter_by(**filters).offset(skip).limit(limit)
+        result = await db.execute(query)
+        return list(result.scalars().all())
+
+    async def update(
+        self, db: AsyncSession, id: Any, data: Union[BaseModel, dict]
+    ) -> ModelType:
+        """Updates the fields set in `data` on the object with primary key `id`"""
+
+        obj = await self.fetch(db, id)
+        for key, value in self._values(data, exclude_unset=True).items():
+            setattr(obj, key, value)
+
+        await db.commit()
+        await db.refresh(obj)
+        return obj
+
+    async def delete(self, db: AsyncSession, id: Any):
+        obj = await self.fetch(db, id)
+        await db.delete(obj)
+        await db.commit()
@@ -1,4 +1,78 @@
 from abc import ABC, abstractmethod
+from itertools import groupby, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+# Rows per INSERT/UPDATE round of the bulk operations. SQLAlchemy splits
+# each round into multi-row statements that fit the driver's limits
+BULK_CHUNK_SIZE = 1000
+
+# Dialects with `INSERT ... ON CONFLICT DO UPDATE`
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _find_ids(
+    db: Session, table, conflict_columns: List[str], rows: List[dict]
+) -> List[Optional[Any]]:
+    """The id of the row matching each of `rows` on `conflict_columns`,
+    `None` where there is none
+    """
+
+    pk = table.primary_key.columns[0]
+    columns = [table.c[key] for key in conflict_columns]
+    keys = [tuple(row[key] for key in conflict_columns) for row in rows]
+    found = {
+        tuple(found_row[1:]): found_row[0]
+        for found_row in db.execute(
+            select(pk, *columns).where(tuple_(*columns).in_(keys))
+        )
+    }
+    return [found.get(key) for key in keys]
+
+
+def _existing_ids(
+    db: Session, table, conflict_columns: List[str], rows: List[dict]
+) -> List[Any]:
+    """The ids of the rows matching each of `rows` on `conflict_columns`,
+    which all exist
+    """
+
+    pk = table.primary_key.columns[0]
+    if conflict_columns == [pk.key]:
+        return [row[pk.key] for row in rows]
+    return _find_ids(db, table, conflict_columns, rows)
+
+
+def _by_columns(rows: List[dict]) -> Iterator[List[dict]]:
+    # executemany needs the same keys in every row of a statement
+    for _, group in groupby(rows, key=lambda row: tuple(sorted(row))):
+        yield list(group)
+
+
+def _with_ids(model, rows: Iterable[dict]) -> Iterator[dict]:
+    """Fills in the primary key of rows that don't have one from its
+    Python-side default (uuid7 for `BaseTableModel`), so the ids are known
+    without reading them back
+    """
+
+    for row in rows:
+        row = dict(row)
+        for column in model.__table__.primary_key:
+            if row.get(column.key) is None and column.default is not None:
+                if column.default.is_callable:
+                    row[column.key] = column.default.arg(None)
+                elif column.default.is_scalar:
+                    row[column.key] = column.default.arg
+        yield row
 
 
 class Service(ABC):
@@ -21,3 +95,166 @@ class Service(ABC):
     @abstractmethod
     def delete(self):
         pass
+
+    def create_many(
+        self,
+        db: Session,
+        model,
+        rows: Iterable[Dict[str, Any]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        commit: bool = True,
+    ) -> List[Any]:
+        """Inserts `rows` (dicts of column values) into `model`'s table with
+        multi-row INSERTs, `chunk_size` rows at a time, and returns their
+        ids in order.
+
+        Example use:
+            ``` python
+            ids = product_service.create_many(
+                db, Product, [{"name": "Pen"}, {"name": "Ink"}]
+            )
+            ```
+        """
+
+        table = model.__table__
+        pk = table.primary_key.columns[0].key
+        ids = []
+
+        for chunk in _chunks(_with_ids(model, rows), chunk_size):
+            for group in _by_columns(chunk):
+                db.execute(insert(table), group)
+            ids.extend(row[pk] for row in chunk)
+
+        if commit:
+            db.commit()
+        return ids
+
+    def update_many(
+        self,
+        db: Session,
+        model,
+        rows: Iterable[Dict[str, Any]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        commit: bool = True,
+    ) -> List[Any]:
+        """Updates rows by primary key. Every row must hold the primary key
+        and the columns to set, returns the ids of the rows passed in.
+        """
+
+        pk = model.__table__.primary_key.columns[0].key
+        ids = []
+
+        for chunk in _chunks(rows, chunk_size):
+            for group in _by_columns(chunk):
+                db.execute(update(model), group)
+            ids.extend(row[pk] for row in chunk)
+
+        if commit:
+            db.commit()
+        return ids
+
+    def upsert_many(
+        self,
+        db: Session,
+        model,
+        rows: Iterable[Dict[str, Any]],
+        conflict_columns: Optional[Sequence[str]] = None,
+        update_columns: Optional[Sequence[str]] = None,
+        chunk_size: int = BULK_CHUNK_SIZE,
+        commit: bool = True,
+    ) -> List[Any]:
+        """Inserts `rows`, updating the existing row instead when one with the
+        same `conflict_columns` (default: the primary key, otherwise a unique
+        constraint) exists. Returns the ids of the inserted or updated rows,
+        in the order of `rows`.
+
+        Uses `INSERT ... ON CONFLICT DO UPDATE` on PostgreSQL and SQLite.
+        Rows with nothing to update (only conflict columns) use
+        `ON CONFLICT DO NOTHING`, whose RETURNING skips the existing rows,
+        so their ids are looked up by `conflict_columns` afterwards.
+        Elsewhere the existing rows of each chunk are looked up by
+        `conflict_columns` first, then the others are inserted and the
+        existing ones updated by primary key. Unlike `ON CONFLICT`, that
+        isn't atomic: a row inserted concurrently in between makes the
+        insert fail.
+        """
+
+        table = model.__table__
+        pk = table.primary_key.columns[0]
+        conflict_columns = list(conflict_columns or [pk.key])
+        dialect_insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+
+        ids = []
+        for chunk in _chunks(_with_ids(model, rows), chunk_size):
+            if dialect_insert is None:
+                ids.extend(
+                    self._upsert_without_on_conflict(
+                        db, model, chunk, conflict_columns, update_columns
+                    )
+                )
+                continue
+
+            for group in _by_columns(chunk):
+                statement = dialect_insert(table)
+                columns = update_columns or [
+                    key
+                    for key in group[0]
+                    if key not in conflict_columns and key != pk.key
+                ]
+                values = {key: statement.excluded[key] for key in columns}
+                if "updated_at" in table.c and "updated_at" not in values:
+                    values["updated_at"] = func.now()
+
+                if not values:
+                    db.execute(
+                        statement.on_conflict_do_nothing(
+                            index_elements=conflict_columns
+                        ),
+                        group,
+                    )
+                    ids.extend(_existing_ids(db, table, conflict_columns, group))
+                    continue
+
+                statement = statement.on_conflict_do_update(
+                    index_elements=conflict_columns, set_=values
+                )
+                result = db.execute(
+                    statement.returning(pk, sort_by_parameter_order=True), group
+                )
+                ids.extend(result.scalars().all())
+
+        if commit:
+            db.commit()
+        return ids
+
+    @staticmethod
+    def _upsert_without_on_conflict(
+        db: Session,
+        model,
+        rows: List[dict],
+        conflict_columns: List[str],
+        update_columns: Optional[Sequence[str]],
+    ) -> List[Any]:
+        """`upsert_many` of one chunk for dialects without `ON CONFLICT`"""
+
+        table = model.__table__
+        pk = table.primary_key.columns[0].key
+        existing = _find_ids(db, table, conflict_columns, rows)
+
+        new_rows, updates = [], []
+        for row, id in zip(rows, existing):
+            if id is None:
+                new_rows.append(row)
+                continue
+            columns = update_columns or [
+                key for key in row if key not in conflict_columns and key != pk
+            ]
+            if columns:
+                updates.append({pk: id, **{key: row[key] for key in columns}})
+
+        for group in _by_columns(new_rows):
+            db.execute(insert(table), group)
+        for group in _by_columns(updates):
+            db.execute(update(model), group)
+
+        return [row[pk] if id is None else id for row, id in zip(rows, existing)]
@@ -0,0 +1,175 @@
+"""
+Application Middleware
+File: api/core/middleware.py
+
+These are plain ASGI callables rather than `BaseHTTPMiddleware` subclasses.
+`BaseHTTPMiddleware` runs the downstream app in a separate task and pipes
+the response body through an anyio memory stream, which costs a task and a
+buffer copy per layer and per streamed chunk. Here the downstream app is
+awaited directly and only the `send` callable is wrapped.
+"""
+
+import hmac
+import random
+import threading
+import time
+
+from uuid import uuid4
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.db.query_stats import QueryStats, current_query_stats, report_n_plus_one
+from api.loggers.app_logger import app_logger
+from api.utils.profiler import profile_store, stack_sampler
+from api.utils.request_metrics import (
+    request_metrics,
+    latency_histograms,
+    get_route_template,
+)
+from api.utils.settings import settings
+
+PROFILE_TOKEN_HEADER = "x-profile-token"
+
+
+def get_client_ip(scope: Scope):
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+class RequestCountMiddleware:
+    """Tracks request counts and IP addresses per route template"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # The route is only known once the router has run
+            request_metrics.record(get_route_template(scope), get_client_ip(scope))
+
+
+class RequestLoggingMiddleware:
+    """Logs details and records the latency of each request"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # Capture request start time
+        start_time = time.perf_counter()
+        status_code = 500
+
+        # Collects the queries of this request, see api/db/query_stats.py
+        query_stats = QueryStats()
+        token = current_query_stats.set(query_stats)
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.SQL_STATS_HEADERS:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("X-DB-Query-Count", str(query_stats.count))
+                    headers.append("X-DB-Time", f"{query_stats.duration:.4f}")
+            await send(message)
+
+        try:
+            # Process the request
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+
+            # Calculate processing time
+            process_time = time.perf_counter() - start_time
+            formatted_process_time = f"{process_time:.3f}s"
+
+            # Capture request and response details
+            client_ip = get_client_ip(scope)
+            method = scope["method"]
+            url = scope["path"]
+
+            log_string = (
+                f'{client_ip} - "{method} {url} HTTP/1.1" {status_code} - '
+                f"{formatted_process_time} - db {query_stats.count} queries "
+                f"{query_stats.duration:.3f}s"
+            )
+            app_logger.info(log_string)
+
+            route = get_route_template(scope)
+            report_n_plus_one(query_stats, method, route)
+
+            latency_histograms.observe(
+                request_metrics.route_label(route),
+                method,
+                status_code,
+                process_time,
+            )
+
+
+def is_profiling_token(token) -> bool:
+    """Checks `token` against the configured profiling token"""
+
+    return bool(settings.PROFILING_TOKEN) and hmac.compare_digest(
+        str(token or ""), settings.PROFILING_TOKEN
+    )
+
+
+class ProfilingMiddleware:
+    """Profiles requests that send a valid `X-Profile-Token` header, plus a
+    random `PROFILING_SAMPLE_RATE` fraction of all requests. The profile id
+    is returned in the `X-Profile-Id` response header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def _should_profile(self, scope: Scope) -> bool:
+        token = Headers(scope=scope).get(PROFILE_TOKEN_HEADER)
+        if token is not None and is_profiling_token(token):
+            return True
+
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            return await self.app(scope, receive, send)
+
+        # The profile is only stored once the response is sent, so its id is
+        # picked up front to go out with the response headers
+        profile_id = uuid4().hex[:12]
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Profile-Id", profile_id)
+            await send(message)
+
+        start_time = time.perf_counter()
+        profile = stack_sampler.begin(threading.get_ident())
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stack_sampler.end(profile)
+            profile_store.add(
+                profile_id,
+                scope["method"],
+                scope["path"],
+                get_route_template(scope),
+                status_code,
+                time.perf_counter() - start_time,
+                profile,
+            )
+            app_logger.info(f"Profiled {scope['path']} | profile {profile_id}")
@@ -1,7 +1,17 @@
 """The database module"""
 
+from functools import lru_cache
+from typing import Dict, Optional
+
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from api.db.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from api.db.query_stats import instrument_engine
+from api.db.routing import ReplicaSet, RoutingSession
+from api.db.sqlite import WriteQueue, configure_sqlite_engine
+from api.utils.identity_cache import IdentityCachedSession
 from api.utils.settings import settings, BASE_DIR
 
 
@@ -13,37 +23,158 @@ DB_NAME = settings.DB_NAME
 DB_TYPE = settings.DB_TYPE
 
 
+# Async drivers for the sync drivers used by `get_db_engine`
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_pool_options(poolclass=InstrumentedQueuePool) -> dict:
+    """Connection pool settings, see the DB_POOL_* settings"""
+
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+    }
+
+
+def get_sqlite_url() -> str:
+    """DB_URL when it names a SQLite database, else `<DB_NAME>.db` in the
+    project directory
+    """
+
+    if settings.DB_URL.startswith("sqlite"):
+        return settings.DB_URL
+    return f"sqlite:///{BASE_DIR / f'{DB_NAME}.db'}"
+
+
 def get_db_engine(test_mode: bool = False):
     DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
     if DB_TYPE == "sqlite" or test_mode:
-        BASE_PATH = f"sqlite:///{BASE_DIR}"
-        DATABASE_URL = BASE_PATH + "/"
+        DATABASE_URL = get_sqlite_url()
 
         if test_mode:
-            DATABASE_URL = BASE_PATH + "test.db"
+            DATABASE_URL = f"sqlite:///{BASE_DIR / 'test.db'}"
 
             return create_engine(
                 DATABASE_URL, connect_args={"check_same_thread": False}
             )
+
+        sqlite_engine = create_engine(
+            DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            **get_pool_options(),
+        )
+        configure_sqlite_engine(sqlite_engine)
+        return sqlite_engine
     elif DB_TYPE == "postgresql":
         DATABASE_URL = (
             f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
         )
 
-    return create_engine(DATABASE_URL)
+    return create_engine(DATABASE_URL, **get_pool_options())
+
+
+def get_replica_set() -> Optional[ReplicaSet]:
+    """Engines for the read replicas in DB_REPLICA_URLS, `None` without any"""
+
+    urls = [url.strip() for url in settings.DB_REPLICA_URLS.split(",") if url.strip()]
+    if not urls:
+        return None
+
+    engines = [create_engine(url, **get_pool_options()) for url in urls]
+    for replica in engines:
+        instrument_engine(replica)
+
+    return ReplicaSet(
+        engines,
+        check_interval=settings.DB_REPLICA_CHECK_INTERVAL,
+        retry_interval=settings.DB_REPLICA_RETRY_INTERVAL,
+    )
+
+
+class AppSession(IdentityCachedSession, RoutingSession):
+    """Session used by `get_db`: identity cache, then replica routing"""
 
 
 engine = get_db_engine()
+instrument_engine(engine)
+
+replica_set = get_replica_set()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    class_=AppSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    replica_set=replica_set,
+)
 
 db_session = scoped_session(SessionLocal)
 
+# Async sessions don't expire on commit: touching an expired attribute would
+# need an implicit (blocking) refresh, which async sessions can't do
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
+@lru_cache(maxsize=None)
+def get_async_db_engine() -> AsyncEngine:
+    """Returns the async engine for the same database as `engine`, using
+    asyncpg for PostgreSQL and aiosqlite for SQLite.
+
+    Created on first use, so the async drivers are only needed by apps
+    that use `get_async_db`.
+    """
+
+    backend = engine.url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for {backend}")
+
+    url = engine.url.set(drivername=ASYNC_DRIVERS[backend])
+    async_engine = create_async_engine(
+        url, **get_pool_options(poolclass=InstrumentedAsyncQueuePool)
+    )
+    instrument_engine(async_engine.sync_engine)
+    if DB_TYPE == "sqlite":
+        configure_sqlite_engine(async_engine.sync_engine)
+    return async_engine
+
+
+def get_pool_engines() -> Dict[str, Engine]:
+    """The engines whose connection pools /metrics reports, by pool name"""
+
+    engines = {"primary": engine}
+    if replica_set is not None:
+        for index, replica in enumerate(replica_set.replicas):
+            engines[f"replica{index}"] = replica.engine
+    # Only once something has created it
+    if get_async_db_engine.cache_info().currsize:
+        engines["async"] = get_async_db_engine().sync_engine
+    return engines
+
+
+@lru_cache(maxsize=None)
+def get_write_queue() -> WriteQueue:
+    """Returns the queue serializing write transactions on `engine`, meant
+    for SQLite (see api/db/sqlite.py)
+    """
+
+    return WriteQueue(engine)
+
+
 def create_database():
+    # Registers the search indexes to create with the tables
+    import api.utils.search  # noqa: F401
+
     return Base.metadata.create_all(bind=engine)
 
 
@@ -53,3 +184,18 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Async counterpart of `get_db`, for async routes and `AsyncService`s
+
+    Example use:
+        ``` python
+        @router.get("/products/{id}")
+        async def get_product(id: str, db: AsyncSession = Depends(get_async_db)):
+            return await product_service.fetch(db, id)
+        ```
+    """
+
+    async with AsyncSessionLocal(bind=get_async_db_engine()) as db:
+        yield db
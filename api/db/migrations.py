@@ -0,0 +1,401 @@
+"""
+Migration Helpers
+File: api/db/migrations.py
+
+Operations for Alembic revisions that the `op` API doesn't cover. Call
+them from a revision's `upgrade()` / `downgrade()`.
+
+Changing a big table without stalling traffic (alembic/env.py commits each
+revision separately and sets MIGRATION_LOCK_TIMEOUT on PostgreSQL):
+    ``` python
+    from api.db.migrations import backfill, create_index_concurrently
+
+    def upgrade():
+        op.add_column("orders", sa.Column("total_cents", sa.BigInteger()))
+        backfill(
+            "orders",
+            "total_cents = (total * 100)::bigint",
+            where="total_cents IS NULL",
+        )
+        create_index_concurrently("ix_orders_total_cents", "orders", ["total_cents"])
+    ```
+
+Converting text ids to `HexUUID` (api/db/types.py):
+    ``` python
+    from api.db.migrations import downgrade_ids_to_text, upgrade_ids_to_uuid
+
+    TABLES = ["users", "orders"]
+
+    def upgrade():
+        upgrade_ids_to_uuid(TABLES)
+
+    def downgrade():
+        downgrade_ids_to_text(TABLES)
+    ```
+"""
+
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import exc
+from sqlalchemy.dialects import postgresql
+
+from api.loggers.app_logger import app_logger
+
+# PostgreSQL error raised when lock_timeout expires (lock_not_available)
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+def _referencing_columns(tables: Sequence[str]) -> Dict[str, List[dict]]:
+    """Returns the foreign keys pointing at the `id` of `tables`, by table"""
+
+    inspector = sa.inspect(op.get_bind())
+    found = {}
+    for table in inspector.get_table_names():
+        for foreign_key in inspector.get_foreign_keys(table):
+            referred = foreign_key["referred_table"], foreign_key["referred_columns"]
+            if referred[0] in tables and referred[1] == ["id"]:
+                found.setdefault(table, []).append(foreign_key)
+    return found
+
+
+def _drop_id_indexes(tables: Sequence[str]):
+    # The `index=True` the id columns used to have on top of the primary key
+    for table in tables:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_id")
+
+
+def _retype_postgresql(
+    tables: Sequence[str], references: Dict[str, List[dict]], type_, using: str
+):
+    """Changes the type of the `id` of `tables` and of the foreign keys
+    pointing at them, converting with the `using` expression template
+    """
+
+    # Foreign keys must go while the two sides have different types
+    for table, foreign_keys in references.items():
+        for foreign_key in foreign_keys:
+            op.drop_constraint(foreign_key["name"], table, type_="foreignkey")
+
+    columns = [(table, "id") for table in tables] + [
+        (table, column)
+        for table, foreign_keys in references.items()
+        for foreign_key in foreign_keys
+        for column in foreign_key["constrained_columns"]
+    ]
+    for table, column in columns:
+        op.alter_column(
+            table, column, type_=type_, postgresql_using=using.format(column)
+        )
+
+    for table, foreign_keys in references.items():
+        for foreign_key in foreign_keys:
+            op.create_foreign_key(
+                foreign_key["name"],
+                table,
+                foreign_key["referred_table"],
+                foreign_key["constrained_columns"],
+                ["id"],
+                **foreign_key.get("options", {}),
+            )
+
+
+def _uuid_blob(value):
+    if value is None or isinstance(value, bytes):
+        return value
+    return uuid.UUID(value).bytes
+
+
+def upgrade_ids_to_uuid(tables: Sequence[str]):
+    """Converts the `id` of `tables`, and the foreign keys pointing at them,
+    from hex text to a native `uuid` (PostgreSQL) or 16-byte blobs (SQLite),
+    and drops the redundant `ix_<table>_id` indexes.
+
+    On PostgreSQL each `ALTER COLUMN ... TYPE` rewrites its table under an
+    exclusive lock, so run it in a maintenance window on big tables. On
+    SQLite the values are rewritten in place (a BLOB is stored as is
+    whatever the declared column type), and the search index triggers
+    carry the new keys over to their key tables; foreign key enforcement
+    must be off, as it is by default.
+    """
+
+    references = _referencing_columns(tables)
+    _drop_id_indexes(tables)
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        _retype_postgresql(
+            tables, references, postgresql.UUID(as_uuid=True), '"{0}"::uuid'
+        )
+
+    elif dialect == "sqlite":
+        # SQLite before 3.41 has no unhex()
+        op.get_bind().connection.driver_connection.create_function(
+            "uuid_blob", 1, _uuid_blob, deterministic=True
+        )
+        for table in tables:
+            op.execute(f"UPDATE {table} SET id = uuid_blob(id)")
+        for table, foreign_keys in references.items():
+            for foreign_key in foreign_keys:
+                for column in foreign_key["constrained_columns"]:
+                    op.execute(f"UPDATE {table} SET {column} = uuid_blob({column})")
+
+    else:
+        raise NotImplementedError(f"No UUID key conversion for {dialect}")
+
+
+def downgrade_ids_to_text(tables: Sequence[str]):
+    """Reverts `upgrade_ids_to_uuid`"""
+
+    references = _referencing_columns(tables)
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        _retype_postgresql(
+            tables, references, sa.String(), "replace(\"{0}\"::text, '-', '')"
+        )
+
+    elif dialect == "sqlite":
+        for table in tables:
+            op.execute(
+                f"UPDATE {table} SET id = lower(hex(id)) WHERE typeof(id) = 'blob'"
+            )
+        for table, foreign_keys in references.items():
+            for foreign_key in foreign_keys:
+                for column in foreign_key["constrained_columns"]:
+                    op.execute(
+                        f"UPDATE {table} SET {column} = lower(hex({column})) "
+                        f"WHERE typeof({column}) = 'blob'"
+                    )
+
+    else:
+        raise NotImplementedError(f"No UUID key conversion for {dialect}")
+
+    for table in tables:
+        op.create_index(f"ix_{table}_id", table, ["id"])
+
+
+# Lock-free changes
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _is_lock_timeout(error: exc.DBAPIError) -> bool:
+    return (
+        getattr(error.orig, "pgcode", None) == LOCK_NOT_AVAILABLE
+        or getattr(error.orig, "sqlstate", None) == LOCK_NOT_AVAILABLE
+    )
+
+
+@contextmanager
+def lock_timeout(timeout: str = "5s", statement_timeout: Optional[str] = None):
+    """Makes the statements of the block give up on locks after `timeout`
+    (and, with `statement_timeout`, stop after it), instead of queueing
+    behind a long transaction while every query on the table queues behind
+    them. No-op outside PostgreSQL.
+    """
+
+    if not _is_postgresql():
+        yield
+        return
+
+    bind = op.get_bind()
+    previous = bind.exec_driver_sql("SHOW lock_timeout").scalar()
+    previous_statement = bind.exec_driver_sql("SHOW statement_timeout").scalar()
+    bind.exec_driver_sql(f"SET lock_timeout = '{timeout}'")
+    if statement_timeout is not None:
+        bind.exec_driver_sql(f"SET statement_timeout = '{statement_timeout}'")
+    try:
+        yield
+    finally:
+        bind.exec_driver_sql(f"SET lock_timeout = '{previous}'")
+        bind.exec_driver_sql(f"SET statement_timeout = '{previous_statement}'")
+
+
+def with_lock_retries(
+    func: Callable, attempts: int = 5, timeout: str = "2s", delay: float = 5
+):
+    """Runs `func()` (e.g. an `op.add_column`) with a short lock timeout,
+    retrying up to `attempts` times, `delay` seconds apart (doubling), when
+    it times out waiting for its lock. Each attempt runs in a savepoint so a
+    timeout doesn't abort the migration's transaction.
+    """
+
+    bind = op.get_bind()
+    for attempt in range(1, attempts + 1):
+        try:
+            with lock_timeout(timeout), bind.begin_nested():
+                return func()
+        except exc.DBAPIError as error:
+            if not _is_lock_timeout(error) or attempt == attempts:
+                raise
+            app_logger.warning(
+                f"Migration lock wait timed out, retrying in {delay:g}s "
+                f"({attempt}/{attempts})"
+            )
+            time.sleep(delay)
+            delay *= 2
+
+
+@contextmanager
+def _outside_transaction() -> Iterator[None]:
+    # Commits the migration's transaction so far, see autocommit_block
+    with op.get_context().autocommit_block():
+        yield
+
+
+def _drop_invalid_index(name: str):
+    # A failed CREATE INDEX CONCURRENTLY leaves an invalid index behind,
+    # which IF NOT EXISTS would then keep
+    query = sa.text(
+        "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+        "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+    )
+    invalid = op.get_bind().execute(query, {"name": name}).first()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+def create_index_concurrently(
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    timeout: str = "5s",
+    **kw,
+):
+    """Creates an index without blocking writes to `table`: on PostgreSQL
+    with `CREATE INDEX CONCURRENTLY`, outside the migration's transaction
+    (which is committed first). Elsewhere it's a plain `create_index`.
+    """
+
+    if not _is_postgresql():
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True, **kw)
+        return
+
+    with _outside_transaction(), lock_timeout(timeout):
+        _drop_invalid_index(name)
+        op.create_index(
+            name,
+            table,
+            columns,
+            unique=unique,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+            **kw,
+        )
+
+
+def drop_index_concurrently(name: str, table: str, timeout: str = "5s"):
+    """Drops an index without blocking `table`, see `create_index_concurrently`"""
+
+    if not _is_postgresql():
+        op.drop_index(name, table_name=table, if_exists=True)
+        return
+
+    with _outside_transaction(), lock_timeout(timeout):
+        op.drop_index(
+            name, table_name=table, if_exists=True, postgresql_concurrently=True
+        )
+
+
+def backfill(
+    table: str,
+    set_clause: str,
+    where: Optional[str] = None,
+    batch_size: int = 1000,
+    pause: float = 0.1,
+    key: str = "id",
+    timeout: str = "5s",
+    attempts: int = 5,
+    report_every: float = 10,
+):
+    """Runs `UPDATE table SET set_clause [WHERE where]` in batches of
+    `batch_size` rows in `key` order, each committed on its own, so the
+    rows are only locked for one batch and replicas can keep up.
+
+    Runs outside the migration's transaction (which is committed first).
+    Sleeps `pause` seconds between batches, gives up on locks after
+    `timeout` and retries a timed out batch up to `attempts` times, and
+    logs its progress every `report_every` seconds. `where` must stop
+    matching rows once they're backfilled if the backfill is to be resumable.
+    """
+
+    condition = f"({where})" if where else "1 = 1"
+    bind = op.get_bind()
+
+    with _outside_transaction(), lock_timeout(timeout):
+        total = bind.exec_driver_sql(
+            f"SELECT count(*) FROM {table} WHERE {condition}"
+        ).scalar()
+        app_logger.info(f"Backfilling {table}: {total} rows")
+
+        # The last key of the next batch. Not max(): PostgreSQL has no max()
+        # of uuid, the type of the `id` columns
+        next_key = sa.text(
+            f"SELECT {key} FROM (SELECT {key} FROM {table} "
+            f"WHERE {key} > :last AND {condition} ORDER BY {key} LIMIT :limit) batch "
+            f"ORDER BY {key} DESC LIMIT 1"
+        )
+        first_key = sa.text(
+            f"SELECT {key} FROM (SELECT {key} FROM {table} "
+            f"WHERE {condition} ORDER BY {key} LIMIT :limit) batch "
+            f"ORDER BY {key} DESC LIMIT 1"
+        )
+        update = sa.text(
+            f"UPDATE {table} SET {set_clause} "
+            f"WHERE {key} > :last AND {key} <= :upper AND {condition}"
+        )
+        update_first = sa.text(
+            f"UPDATE {table} SET {set_clause} WHERE {key} <= :upper AND {condition}"
+        )
+
+        last = None
+        done = 0
+        started = reported = time.monotonic()
+        while True:
+            if last is None:
+                upper = bind.execute(first_key, {"limit": batch_size}).scalar()
+            else:
+                upper = bind.execute(
+                    next_key, {"last": last, "limit": batch_size}
+                ).scalar()
+            if upper is None:
+                break
+
+            for attempt in range(1, attempts + 1):
+                try:
+                    if last is None:
+                        result = bind.execute(update_first, {"upper": upper})
+                    else:
+                        result = bind.execute(update, {"last": last, "upper": upper})
+                    break
+                except exc.DBAPIError as error:
+                    if not _is_lock_timeout(error) or attempt == attempts:
+                        raise
+                    time.sleep(pause * 2**attempt)
+
+            done += result.rowcount
+            last = upper
+
+            now = time.monotonic()
+            if now - reported >= report_every:
+                reported = now
+                rate = done / (now - started)
+                app_logger.info(
+                    f"Backfilling {table}: {done}/{total} rows "
+                    f"({done * 100 / max(total, 1):.0f}%, {rate:.0f} rows/s)"
+                )
+            if pause:
+                time.sleep(pause)
+
+        app_logger.info(
+            f"Backfilled {table}: {done} rows in {time.monotonic() - started:.1f}s"
+        )
+        return done
@@ -0,0 +1,215 @@
+"""
+Connection Pool Metrics
+File: api/db/pool_metrics.py
+
+Instrumented `QueuePool` that records how long requests wait to check out
+a connection, how often checkout times out, and how many connections are
+created and invalidated. Together with the live size/overflow/in-use
+gauges this shows when the pool, not the database, is the bottleneck.
+`render_pool_metrics` exports every pool (primary, replicas, async) with a
+`pool` label.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from api.utils.request_metrics import Histogram, _escape_label, process_label
+
+# Checkout waits are usually well under a millisecond, anything in the
+# upper buckets means requests are queueing for a connection
+CHECKOUT_WAIT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    30.0,
+)
+
+# Set while a checkout is being timed. A context variable rather than a
+# thread local, so concurrent async checkouts on one thread don't see it
+_timing_checkout = ContextVar("timing_checkout", default=False)
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkout_wait = Histogram(CHECKOUT_WAIT_BUCKETS)
+        self.checkout_timeouts = 0
+        self.connections_created = 0
+        self.invalidations = 0
+
+
+class InstrumentedQueuePool(QueuePool):
+    """`QueuePool` that times connection checkout"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+        # `recreate` passes the old pool's listeners on in `_dispatch`,
+        # adding them again would count every event twice
+        if "_dispatch" not in kwargs:
+            event.listen(self, "connect", self._on_connect)
+            event.listen(self, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.metrics.connections_created += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.metrics.invalidations += 1
+
+    def _do_get(self):
+        # QueuePool._do_get calls itself again when it loses a race for an
+        # overflow slot, only the outermost call is timed
+        if _timing_checkout.get():
+            return super()._do_get()
+
+        token = _timing_checkout.set(True)
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.checkout_timeouts += 1
+            raise
+        finally:
+            self.metrics.checkout_wait.observe(time.perf_counter() - start)
+            _timing_checkout.reset(token)
+
+    def recreate(self):
+        pool = super().recreate()
+        # Keep counting across pool recreation (e.g. after a disconnect or
+        # `dispose`); the listeners carried over update this same object
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """`InstrumentedQueuePool` for async engines"""
+
+
+def get_pool_stats(engine) -> dict:
+    """Returns the current state and counters of `engine`'s pool"""
+
+    pool = engine.pool
+    stats = {"status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(
+            checkout_timeouts=metrics.checkout_timeouts,
+            connections_created=metrics.connections_created,
+            invalidations=metrics.invalidations,
+        )
+    return stats
+
+
+def _render_family(name: str, help_text: str, metric_type: str, samples) -> str:
+    """Renders one metric family from `(labels, value)` samples"""
+
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines.extend(f"{name}{{{labels}}} {value}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+def _histogram_samples(name: str, labels: str, histogram: Histogram):
+    bounds = [repr(bound) for bound in histogram.buckets] + ["+Inf"]
+    running = 0
+    for bound, count in zip(bounds, histogram.counts):
+        running += count
+        yield f'{name}_bucket{{{labels},le="{bound}"}} {running}'
+    yield f"{name}_sum{{{labels}}} {histogram.sum}"
+    yield f"{name}_count{{{labels}}} {running}"
+
+
+def render_pool_metrics(engines: Dict[str, Engine]) -> str:
+    """Renders the pool metrics of `engines` in this process, by pool name,
+    in the Prometheus text format
+    """
+
+    pid = process_label()
+    pools = [
+        (f'{pid},pool="{_escape_label(name)}"', engine.pool)
+        for name, engine in engines.items()
+        if isinstance(engine.pool, QueuePool)
+    ]
+    if not pools:
+        return ""
+
+    content = "".join(
+        _render_family(
+            name, help_text, "gauge", [(labels, read(pool)) for labels, pool in pools]
+        )
+        for name, help_text, read in (
+            ("db_pool_size", "Configured pool size.", QueuePool.size),
+            ("db_pool_checked_out", "Connections in use.", QueuePool.checkedout),
+            (
+                "db_pool_checked_in",
+                "Idle connections in the pool.",
+                QueuePool.checkedin,
+            ),
+            (
+                "db_pool_overflow",
+                "Connections open beyond the pool size.",
+                lambda pool: max(pool.overflow(), 0),
+            ),
+        )
+    )
+
+    instrumented = [
+        (labels, pool.metrics)
+        for labels, pool in pools
+        if getattr(pool, "metrics", None) is not None
+    ]
+    if not instrumented:
+        return content
+
+    name = "db_pool_checkout_wait_seconds"
+    lines = [
+        f"# HELP {name} Time spent waiting to check out a connection.",
+        f"# TYPE {name} histogram",
+    ]
+    for labels, metrics in instrumented:
+        lines.extend(_histogram_samples(name, labels, metrics.checkout_wait))
+    content += "\n".join(lines) + "\n"
+
+    for name, help_text, attribute in (
+        (
+            "db_pool_checkout_timeouts_total",
+            "Checkouts that timed out waiting for a connection.",
+            "checkout_timeouts",
+        ),
+        (
+            "db_pool_connections_created_total",
+            "Database connections opened by the pool.",
+            "connections_created",
+        ),
+        (
+            "db_pool_invalidations_total",
+            "Connections invalidated (e.g. failed pre-ping).",
+            "invalidations",
+        ),
+    ):
+        content += _render_family(
+            name,
+            help_text,
+            "counter",
+            [(labels, getattr(metrics, attribute)) for labels, metrics in instrumented],
+        )
+    return content
@@ -0,0 +1,128 @@
+"""
+Query Statistics
+File: api/db/query_stats.py
+
+Per-request SQL instrumentation. Cursor execution events on the engines
+add each statement's count and duration to the `QueryStats` of the request
+being served (a context variable set by `RequestLoggingMiddleware`, which
+also reaches the threadpool running sync endpoints).
+
+Statements whose SQL is executed SQL_N_PLUS_ONE_THRESHOLD times or more
+in one request are reported as N+1 candidates, and statements slower than
+SQL_SLOW_QUERY_MS are logged with their parameters redacted.
+"""
+
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from api.loggers.app_logger import app_logger
+from api.utils.settings import settings
+
+# Statements are shortened to this many characters in log lines
+MAX_STATEMENT_LENGTH = 500
+
+
+class QueryStats:
+    __slots__ = ("count", "duration", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement] += 1
+
+    def n_plus_one(self, threshold: int) -> List[Tuple[str, int]]:
+        """Returns `(statement, executions)` for the statements executed at
+        least `threshold` times, most repeated first
+        """
+
+        return [
+            (statement, count)
+            for statement, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def _shorten(statement: str) -> str:
+    statement = " ".join(statement.split())
+    if len(statement) > MAX_STATEMENT_LENGTH:
+        return statement[:MAX_STATEMENT_LENGTH] + "..."
+    return statement
+
+
+def redact(parameters: Any) -> Any:
+    """Replaces parameter values with their type names"""
+
+    if isinstance(parameters, dict):
+        return {key: redact(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: describe the first row only
+            return [redact(parameters[0]), f"... {len(parameters)} rows"]
+        return [redact(value) for value in parameters]
+    if parameters is None:
+        return None
+    return f"<{type(parameters).__name__}>"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+    if duration * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        app_logger.warning(
+            f"Slow query | {duration * 1000:.1f}ms | {_shorten(statement)} | "
+            f"params={redact(parameters)}"
+        )
+
+
+def _handle_error(context):
+    # after_cursor_execute doesn't run for failed statements
+    if context.connection is not None:
+        starts = context.connection.info.get("query_start")
+        if starts:
+            starts.pop()
+
+
+def instrument_engine(engine: Engine):
+    """Attaches the query statistics listeners to `engine` (for an async
+    engine, pass its `sync_engine`)
+    """
+
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def report_n_plus_one(stats: QueryStats, method: str, route: str):
+    """Logs the N+1 candidates of a finished request"""
+
+    for statement, count in stats.n_plus_one(settings.SQL_N_PLUS_ONE_THRESHOLD):
+        app_logger.warning(
+            f"Possible N+1 | {method} {route} | {count} executions | "
+            f"{_shorten(statement)}"
+        )
@@ -0,0 +1,152 @@
+"""
+Read Replica Routing
+File: api/db/routing.py
+
+Session that sends read-only work to read replicas. A session reads from
+one replica, picked round-robin, until it writes (flushes, or executes
+anything but a plain SELECT): from then on everything, reads included,
+goes to the primary until the session is closed, so a request always sees
+its own writes. `get_bind()` without a statement, e.g. to look up the
+dialect, and statements executed with `bind_arguments={"primary": True}`
+use the primary without switching the session to it.
+
+A replica that fails a health check, or whose connection errors out, is
+skipped for DB_REPLICA_RETRY_INTERVAL seconds; with no healthy replica the
+primary serves the reads.
+"""
+
+import itertools
+import threading
+import time
+from typing import List, Optional
+
+from sqlalchemy import Select, event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from api.loggers.app_logger import app_logger
+
+
+class Replica:
+    __slots__ = ("engine", "checked_at", "down_until")
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.checked_at = 0.0
+        self.down_until = 0.0
+
+
+class ReplicaSet:
+    """Round-robin over the healthy replicas"""
+
+    def __init__(
+        self, engines: List[Engine], check_interval: float, retry_interval: float
+    ):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+        for replica in self.replicas:
+            event.listen(replica.engine, "handle_error", self._on_error(replica))
+
+    def _on_error(self, replica: Replica):
+        def handle_error(context):
+            # `original_exception` is the driver's own exception class
+            if context.is_disconnect or isinstance(
+                context.sqlalchemy_exception, exc.OperationalError
+            ):
+                self.mark_down(replica, context.original_exception)
+
+        return handle_error
+
+    def mark_down(self, replica: Replica, error: BaseException):
+        if replica.down_until < time.monotonic():
+            app_logger.warning(
+                f"Read replica {replica.engine.url!r} is unavailable, using the "
+                f"primary for {self.retry_interval}s: {error}"
+            )
+        replica.down_until = time.monotonic() + self.retry_interval
+
+    def _healthy(self, replica: Replica) -> bool:
+        now = time.monotonic()
+        if replica.down_until > now:
+            return False
+        if now - replica.checked_at < self.check_interval:
+            return True
+
+        # Only one thread probes a replica, the others keep using it
+        # meanwhile
+        if not self._lock.acquire(blocking=False):
+            return True
+        try:
+            with replica.engine.connect() as connection:
+                connection.exec_driver_sql("SELECT 1")
+            replica.checked_at = time.monotonic()
+            return True
+        except Exception as error:
+            self.mark_down(replica, error)
+            return False
+        finally:
+            self._lock.release()
+
+    def pick(self) -> Optional[Engine]:
+        """Returns the next healthy replica's engine, `None` if there is none"""
+
+        if not self.replicas:
+            return None
+
+        start = next(self._next)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if self._healthy(replica):
+                return replica.engine
+        return None
+
+    def dispose(self):
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+
+class RoutingSession(Session):
+    """Session that reads from `replica_set` until its first write"""
+
+    def __init__(self, *args, replica_set: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_set = replica_set
+        self._replica: Optional[Engine] = None
+        self._wrote = False
+
+    def _is_read(self, clause) -> bool:
+        return isinstance(clause, Select) and clause._for_update_arg is None
+
+    def get_bind(self, mapper=None, clause=None, primary=False, **kwargs):
+        # `primary`: from `bind_arguments={"primary": True}`, one statement
+        # read from the primary without switching the session to it
+        engine = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self.replica_set is None or self._wrote or primary:
+            return engine
+
+        if self._flushing or (clause is not None and not self._is_read(clause)):
+            self._wrote = True
+            return engine
+        if clause is None:
+            return engine
+
+        # Stay on one replica for the whole session, for a consistent view
+        if self._replica is None:
+            self._replica = self.replica_set.pick()
+        return self._replica or engine
+
+    def use_primary(self):
+        """Sends everything from now on to the primary, e.g. before reading
+        a row that another request has just written
+        """
+
+        self._wrote = True
+
+    def close(self):
+        super().close()
+        self._replica = None
+        self._wrote = False
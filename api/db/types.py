@@ -0,0 +1,108 @@
+"""
+Column Types
+File: api/db/types.py
+
+`HexUUID` stores UUIDs in 16 bytes, a native `uuid` on PostgreSQL and a
+`BLOB` elsewhere, instead of 32 characters of text, while the application
+keeps seeing (and binding) the same hex strings. Primary keys, the
+foreign keys pointing at them and their indexes are less than half the
+size of text ones.
+
+Binding a value that isn't a UUID raises `MalformedIdError` (the lookup
+helpers in api/utils/db_validators.py treat it as "no such row"). On
+PostgreSQL the values are bound as untyped hex text, which the server
+reads as a `uuid`, or as the text of `varchar` ids not migrated yet.
+
+Foreign keys must use the type of the key they reference:
+    ``` python
+    class Order(BaseTableModel):
+        __tablename__ = "orders"
+
+        user_id = Column(HexUUID, ForeignKey("users.id"), index=True)
+    ```
+"""
+
+import uuid
+from typing import Optional
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator, UserDefinedType
+
+
+def to_uuid(value) -> Optional[uuid.UUID]:
+    """Parses a hex string (with or without dashes), 16 bytes or a UUID,
+    `None` if `value` is none of them
+    """
+
+    if isinstance(value, uuid.UUID):
+        return value
+    if isinstance(value, bytes):
+        return uuid.UUID(bytes=value) if len(value) == 16 else None
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+class MalformedIdError(ValueError):
+    """A value bound to a `HexUUID` column isn't a UUID"""
+
+
+class _PostgresUUID(UserDefinedType):
+    """PostgreSQL `uuid` whose bind parameters get no `::UUID` cast, so
+    they compare with `varchar` columns too
+    """
+
+    cache_ok = True
+
+    def get_col_spec(self, **kwargs):
+        return "UUID"
+
+
+class HexUUID(TypeDecorator):
+    """UUID column exposed as a 32-character hex string"""
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    @property
+    def python_type(self):
+        return str
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return _PostgresUUID()
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def _parse(self, value) -> uuid.UUID:
+        parsed = to_uuid(value)
+        if parsed is None:
+            raise MalformedIdError(f"Malformed id: {value!r}")
+        return parsed
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+
+        value = self._parse(value)
+        if dialect.name == "postgresql":
+            return value.hex
+        return value.bytes
+
+    def process_literal_param(self, value, dialect):
+        if value is None:
+            return "NULL"
+
+        value = self._parse(value)
+        if dialect.name == "postgresql":
+            return f"'{value.hex}'"
+        return f"X'{value.hex}'"
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, bytes):
+            return value.hex()
+        if isinstance(value, uuid.UUID):
+            return value.hex
+        # `uuid` text from the driver, or text ids of rows not converted yet
+        parsed = to_uuid(value) if value is not None else None
+        return parsed.hex if parsed is not None else value
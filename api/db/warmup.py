@@ -0,0 +1,176 @@
+"""
+Database Warm-up
+File: api/db/warmup.py
+
+Startup and shutdown of the database engines. On startup the mappers are
+configured, a few pooled connections are opened and validated, the
+SQLite row counters (see api/utils/count_cache.py) are installed and the
+hot queries are run once against the primary and each read replica, which
+compiles them into each engine's statement cache, so the first requests
+after a deploy don't pay for any of it. On shutdown the pools are closed.
+
+The hot queries are the lookup by id (`Session.get`, behind
+`check_model_existence` and `get_by_id`) and the first page of
+`paginated_response` (without its total) for every model; register others with
+`register_hot_query`. A hot query must build its statement the way the app
+does (same columns, filters and bind parameter names) for the cache entry
+to be reused; the bound values don't matter.
+
+Example use:
+    ``` python
+    @register_hot_query
+    def user_by_email(db: Session):
+        db.execute(select(User).where(User.email == "warm-up@example.com"))
+    ```
+"""
+
+import asyncio
+import time
+from functools import partial
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, configure_mappers
+from sqlalchemy.pool import QueuePool
+from uuid_extensions import uuid7
+
+from api.db.database import Base, get_async_db_engine, replica_set
+from api.loggers.app_logger import app_logger
+from api.utils.count_cache import install_sqlite_row_counters
+from api.utils.pagination import paginated_response
+
+# Each runs its queries on the session it's given, which is rolled back
+_hot_queries: List[Callable[[Session], None]] = []
+
+
+def register_hot_query(func: Callable[[Session], None]):
+    """Registers `func(db)`, run on startup to get its statements compiled"""
+
+    _hot_queries.append(func)
+    return func
+
+
+def _model_queries() -> List[Tuple[str, Callable[[Session], None]]]:
+    """The lookup by id and the first page of every mapped model"""
+
+    # An id no row has: the statement runs, nothing gets cached
+    missing = uuid7().hex
+    queries = []
+    for mapper in Base.registry.mappers:
+        model = mapper.class_
+        queries.append(
+            (
+                f"{model.__name__} by id",
+                partial(Session.get, entity=model, ident=missing),
+            )
+        )
+        queries.append(
+            (
+                f"{model.__name__} first page",
+                # No total: counting every table on every boot would be a
+                # full scan of each of them
+                partial(
+                    paginated_response,
+                    model=model,
+                    skip=0,
+                    limit=1,
+                    include_total=False,
+                ),
+            )
+        )
+    return queries
+
+
+def open_connections(engine: Engine, count: int) -> int:
+    """Opens and validates up to `count` pooled connections, returns how
+    many were opened
+    """
+
+    connections = []
+    try:
+        # Hold every connection until all are open, otherwise the pool
+        # would hand the same one back each time
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+    return len(connections)
+
+
+def run_hot_queries(engine: Engine) -> int:
+    """Runs the hot queries on `engine`, each in its own rolled back
+    session, returns how many ran without error
+    """
+
+    queries = _model_queries() + [(func.__name__, func) for func in _hot_queries]
+    ran = 0
+    for name, func in queries:
+        try:
+            with Session(engine) as db:
+                func(db)
+                db.rollback()
+            ran += 1
+        except Exception as exc:
+            app_logger.warning(f"Warm-up query {name!r} failed: {exc}")
+    return ran
+
+
+def warm_up(engine: Engine, connections: int):
+    start = time.perf_counter()
+    configure_mappers()
+
+    # Connections beyond the pool size would be closed right away again
+    if isinstance(engine.pool, QueuePool):
+        connections = min(connections, engine.pool.size())
+
+    opened = 0
+    if connections:
+        try:
+            opened = open_connections(engine, connections)
+        except Exception as exc:
+            app_logger.error(f"Database warm-up failed, cannot connect: {exc}")
+
+    if engine.dialect.name == "sqlite":
+        # Once here rather than on the first estimated count, which would
+        # take the write lock in the middle of a request
+        try:
+            with engine.begin() as connection:
+                install_sqlite_row_counters(connection)
+        except Exception as exc:
+            app_logger.error(f"Installing the SQLite row counters failed: {exc}")
+
+    engines = [engine]
+    if replica_set is not None:
+        engines.extend(replica.engine for replica in replica_set.replicas)
+    queries = sum(run_hot_queries(each) for each in engines)
+
+    app_logger.info(
+        f"Database warmed up | connections={opened} queries={queries} "
+        f"duration={time.perf_counter() - start:.3f}s"
+    )
+
+
+async def warm_up_engine(engine: Engine, connections: int):
+    """Runs `warm_up` in a thread, so a slow database doesn't block the loop"""
+
+    await asyncio.to_thread(warm_up, engine, connections)
+
+
+async def dispose_engines(engine: Engine):
+    """Closes the pooled connections of `engine`, of the read replicas and
+    of the async engine, if it was created
+    """
+
+    if replica_set is not None:
+        replica_set.dispose()
+
+    if get_async_db_engine.cache_info().currsize:
+        await get_async_db_engine().dispose()
+        get_async_db_engine.cache_clear()
+
+    engine.dispose()
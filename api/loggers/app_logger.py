@@ -1,10 +1,152 @@
+"""
+Application Logger
+File: api/loggers/app_logger.py
+
+Logging calls never touch the disk on the calling thread. Records are put
+on a bounded queue without blocking and a background thread formats and
+writes them in batches, flushing once per batch. When the queue is full
+(e.g. the disk is stalled) new records are dropped and counted instead of
+adding latency to requests.
+"""
+
+import atexit
+import json
 import logging
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from typing import List
 
-# Configure the logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d: %(message)s",
-    handlers=[logging.FileHandler("logs/app_logs.log"), logging.StreamHandler()],
+from api.utils.settings import settings
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d: %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": f"{record.filename}:{record.lineno}",
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+
+        return json.dumps(payload, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enqueues records without blocking, counting the ones that don't fit"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the args into the message here, formatting is left to
+        # the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchLogWriter(threading.Thread):
+    """Background thread that drains the log queue into the real handlers"""
+
+    _STOP = object()
+
+    def __init__(
+        self, log_queue: queue.Queue, handlers: List[logging.Handler], batch_size: int
+    ):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = self._STOP in batch
+            self._write([record for record in batch if record is not self._STOP])
+            if stop:
+                return
+
+    def _write(self, records: List[logging.LogRecord]):
+        for handler in self.handlers:
+            lines = [
+                handler.format(record)
+                for record in records
+                if record.levelno >= handler.level
+            ]
+            if not lines:
+                continue
+
+            handler.acquire()
+            try:
+                if handler.stream is None:
+                    # dictConfig (e.g. uvicorn's) closes existing handlers,
+                    # reopen the file the same way FileHandler.emit does
+                    handler.stream = handler._open()
+                handler.stream.write("\n".join(lines) + "\n")
+                handler.flush()
+            except Exception:
+                handler.handleError(records[-1])
+            finally:
+                handler.release()
+
+    def stop(self):
+        """Writes out everything still queued and stops the thread"""
+
+        # Blocking here is fine, this only runs at interpreter exit
+        self.queue.put(self._STOP)
+        self.join()
+
+
+def get_log_stats() -> dict:
+    """Returns counters describing the state of the logging pipeline"""
+
+    return {
+        "queued": log_queue.qsize(),
+        "queue_size": log_queue.maxsize,
+        "dropped": queue_handler.dropped,
+    }
+
+
+formatter = JsonFormatter() if settings.LOG_JSON else logging.Formatter(LOG_FORMAT)
+
+file_handler = logging.FileHandler("logs/app_logs.log")
+stream_handler = logging.StreamHandler(sys.stderr)
+for handler in (file_handler, stream_handler):
+    handler.setFormatter(formatter)
+
+log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+queue_handler = NonBlockingQueueHandler(log_queue)
+
+log_writer = BatchLogWriter(
+    log_queue, [file_handler, stream_handler], batch_size=settings.LOG_BATCH_SIZE
 )
+log_writer.start()
+atexit.register(log_writer.stop)
+
+# Configure the logging
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
 
 app_logger = logging.getLogger(__name__)
@@ -0,0 +1,333 @@
+"""
+Count Cache
+File: api/utils/count_cache.py
+
+Totals for paginated listings without a `COUNT(*)` per page view.
+
+Exact counts are cached per model and filter set for COUNT_CACHE_TTL
+seconds, and dropped as soon as a session flushes or commits a change to
+one of the counted tables. The cache is per worker process, so writes made
+by other workers show up at the latest after the TTL.
+
+Estimated counts skip counting altogether: on PostgreSQL they come from
+the planner statistics (`pg_class.reltuples`, or the row estimate of the
+query plan when filtering), on SQLite from a row counter maintained by
+triggers. When no estimate is available the exact count is used.
+
+The SQLite counters are installed with the tables by `create_all`, for
+the existing tables on startup (see api/db/warmup.py), and by:
+
+    python -m api.utils.count_cache --install
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from api.db.database import Base, engine
+from api.loggers.app_logger import app_logger
+from api.utils.settings import settings
+
+# Table holding the SQLite row counters
+SQLITE_COUNTER_TABLE = "_row_counts"
+
+
+class CountCache:
+    """LRU of counts that expire after `ttl` seconds"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._keys_by_table: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, tables: Iterable[str], value: Any):
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable):
+        self._entries.pop(key, None)
+        # key[0] is the tables the count depends on, see `count_key`
+        for table in key[0]:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+    def invalidate(self, tables: Iterable[str]):
+        with self._lock:
+            for table in tables:
+                for key in self._keys_by_table.pop(table, ()):
+                    self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_table.clear()
+
+
+count_cache = CountCache(
+    ttl=settings.COUNT_CACHE_TTL, max_entries=settings.COUNT_CACHE_MAX_ENTRIES
+)
+
+
+def count_key(
+    tables: Tuple[str, ...], filters: Optional[Dict[str, Any]], estimated: bool
+) -> Hashable:
+    filter_key = tuple(
+        sorted((name, repr(value)) for name, value in (filters or {}).items())
+    )
+    return (tables, filter_key, estimated)
+
+
+# Invalidation. Tables written in a session are collected in `session.info`
+# and dropped from the cache on flush (for bulk statements) and on commit.
+
+_WRITTEN_TABLES = "count_cache_written_tables"
+
+
+def _written_tables(session: Session) -> set:
+    return session.info.setdefault(_WRITTEN_TABLES, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    tables = _written_tables(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        mapper = getattr(obj, "__mapper__", None)
+        if mapper is not None:
+            tables.update(table.name for table in mapper.tables)
+
+    count_cache.invalidate(tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_execute(orm_execute_state):
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return
+
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None:
+        _written_tables(orm_execute_state.session).add(table.name)
+        count_cache.invalidate([table.name])
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    tables = session.info.pop(_WRITTEN_TABLES, None)
+    if tables:
+        count_cache.invalidate(tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_WRITTEN_TABLES, None)
+
+
+# Estimates
+
+
+def _postgres_estimate(db: Session, query, table, filtered: bool) -> Optional[int]:
+    if not filtered:
+        row = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"),
+            {"t": table.fullname},
+        ).first()
+        # -1 (or 0 before PostgreSQL 14) until the table is first analyzed
+        if row is not None and row[0] > 0:
+            return int(row[0])
+        return None
+
+    compiled = query.statement.compile(dialect=db.get_bind().dialect)
+    plan = (
+        db.connection()
+        .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params)
+        .scalar()
+    )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def install_sqlite_row_counter(connection, table: str):
+    """Creates the triggers that keep `_row_counts` up to date for `table`
+    and (re)seeds its counter. Safe to call again.
+    """
+
+    connection.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {SQLITE_COUNTER_TABLE} "
+        "(table_name TEXT PRIMARY KEY, row_count INTEGER NOT NULL)"
+    )
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table} "
+        f"BEGIN UPDATE {SQLITE_COUNTER_TABLE} SET row_count = row_count + 1 "
+        f"WHERE table_name = '{table}'; END"
+    )
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table} "
+        f"BEGIN UPDATE {SQLITE_COUNTER_TABLE} SET row_count = row_count - 1 "
+        f"WHERE table_name = '{table}'; END"
+    )
+    connection.exec_driver_sql(
+        f"INSERT OR REPLACE INTO {SQLITE_COUNTER_TABLE} (table_name, row_count) "
+        f"SELECT '{table}', COUNT(*) FROM {table}"
+    )
+
+
+def install_sqlite_row_counters(connection, tables: Optional[Iterable[str]] = None):
+    """Installs the missing row counters of `tables` (default: every model
+    table in the database), returns the tables it installed them for
+    """
+
+    existing = {
+        name
+        for (name,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+    if tables is None:
+        tables = [table.name for table in Base.metadata.sorted_tables]
+    triggers = {
+        name
+        for (name,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        )
+    }
+
+    installed = []
+    for table in tables:
+        if table in existing and f"{table}_count_insert" not in triggers:
+            install_sqlite_row_counter(connection, table)
+            installed.append(table)
+    return installed
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(metadata, connection, tables=(), **kwargs):
+    if connection.dialect.name == "sqlite":
+        install_sqlite_row_counters(connection, [table.name for table in tables])
+
+
+def _sqlite_estimate(db: Session, table, filtered: bool) -> Optional[int]:
+    # Installed ahead of time: installing here would take the write lock in
+    # the middle of a request
+    if filtered:
+        return None
+
+    row = db.execute(
+        text(f"SELECT row_count FROM {SQLITE_COUNTER_TABLE} WHERE table_name = :t"),
+        {"t": table.name},
+    ).first()
+    return int(row[0]) if row is not None else None
+
+
+def estimate_count(db: Session, query, model, filtered: bool) -> Optional[int]:
+    """Returns an estimate of `query`'s row count, or `None` if the
+    database can't provide one
+    """
+
+    dialect = db.get_bind().dialect.name
+    try:
+        if dialect == "postgresql":
+            return _postgres_estimate(db, query, model.__table__, filtered)
+        if dialect == "sqlite":
+            return _sqlite_estimate(db, model.__table__, filtered)
+    except Exception as exc:
+        app_logger.warning(f"Count estimate for {model.__tablename__} failed: {exc}")
+    return None
+
+
+def count_total(
+    db: Session,
+    query,
+    model,
+    join: Optional[Any] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    estimated: bool = False,
+) -> Tuple[int, bool]:
+    """Returns `(total, is_estimate)` for `query`, from the cache when
+    possible. With `estimated` the planner/counter estimate is used where
+    available.
+    """
+
+    tables = [model.__tablename__]
+    join_table = getattr(join, "name", None) or getattr(join, "__tablename__", None)
+    if join_table:
+        tables.append(join_table)
+
+    filtered = any(value is not None for value in (filters or {}).values())
+    key = count_key(tuple(tables), filters if filtered else None, estimated)
+    cached = count_cache.get(key)
+    if cached is not None:
+        return cached
+
+    total, is_estimate = None, False
+    if estimated and join is None:
+        total = estimate_count(db, query, model, filtered)
+        is_estimate = total is not None
+
+    if total is None:
+        total = query.count()
+
+    count_cache.set(key, tables, (total, is_estimate))
+    return total, is_estimate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite row counter maintenance")
+    parser.add_argument(
+        "--install", action="store_true", help="Create missing row counters"
+    )
+    args = parser.parse_args()
+
+    # Import the models so their tables are registered
+    import api.v1.models  # noqa: F401
+
+    if engine.dialect.name != "sqlite":
+        print("Row counters are only used on SQLite")
+        return
+
+    with engine.begin() as connection:
+        if args.install:
+            installed = install_sqlite_row_counters(connection)
+            app_logger.info(f"Row counters installed for {len(installed)} tables")
+
+        for table, row_count in connection.exec_driver_sql(
+            f"SELECT table_name, row_count FROM {SQLITE_COUNTER_TABLE}"
+        ):
+            print(f"{table}: {row_count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 from fastapi import HTTPException
+from sqlalchemy.exc import StatementError
 from sqlalchemy.orm import Session
 
+from api.db.types import MalformedIdError
+from api.utils.search import search_filter
+
 
 def check_model_existence(db: Session, model, id):
     """Checks if a model exists by its id"""
 
-    obj = db.get(model, ident=id)
+    obj = get_model_or_none(db, model, id)
 
     if not obj:
         raise HTTPException(status_code=404, detail=f"{model.__name__} does not exist")
@@ -17,15 +21,25 @@ def get_model_or_none(db: Session, model, id):
     """Unlike `check_model_existence` which throws
     error if object is not found, this fnction returns
     the object if it exists, and `None` otherwise"""
-    return db.get(model, ident=id)
+    try:
+        return db.get(model, ident=id)
+    except StatementError as exc:
+        # No row can have an id that isn't a UUID
+        if isinstance(exc.orig, MalformedIdError):
+            return None
+        raise
 
 
 def get_models_by_params(db: Session, model, query_params):
-    """Get collection of a model by multiple query params"""
+    """Get collection of a model by multiple query params
+
+    Columns listed in the model's `__searchable__` are matched through the
+    search index, see `api/utils/search.py`
+    """
     query = db.query(model)
     for column, value in query_params.items():
         if hasattr(model, column) and value:
-            query = query.filter(getattr(model, column).ilike(f"%{value}%"))
+            query = query.filter(search_filter(db, model, column, value))
     return query
 
 
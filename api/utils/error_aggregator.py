@@ -0,0 +1,192 @@
+"""
+Error Aggregator
+File: api/utils/error_aggregator.py
+
+Deduplicates error logging in the exception handlers. Exceptions are
+fingerprinted by type, route template and the frame that raised them.
+The first occurrence of a fingerprint is logged in full (with its
+traceback for server errors, without for client errors), repeats are only
+counted in memory and reported in periodic summaries, so a burst of
+identical errors produces a handful of log lines instead of thousands.
+"""
+
+import asyncio
+import hashlib
+import time
+import traceback
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy.exc import StatementError
+
+from api.loggers.app_logger import app_logger
+from api.utils.settings import settings
+
+
+def get_top_frame(exc: BaseException) -> str:
+    """Returns `file:line in function` of the frame that raised `exc`"""
+
+    frames = traceback.extract_tb(exc.__traceback__) if exc.__traceback__ else None
+    if not frames:
+        return "<unknown>"
+
+    frame = frames[-1]
+    return f"{frame.filename}:{frame.lineno} in {frame.name}"
+
+
+def redacted_message(exc: BaseException) -> str:
+    """Returns the first line of `exc`'s message. Statement errors are
+    reduced to the database's own message, without the SQL and its bound
+    parameters, which may hold other users' data.
+    """
+
+    if isinstance(exc, StatementError) and exc.orig is not None:
+        exc = exc.orig
+    lines = str(exc).strip().splitlines()
+    return lines[0][:200] if lines else ""
+
+
+def fingerprint(exc_type: str, route: str, frame: str) -> str:
+    key = f"{exc_type}|{route}|{frame}".encode()
+    return hashlib.blake2b(key, digest_size=8).hexdigest()
+
+
+class ErrorRecord:
+    __slots__ = (
+        "fingerprint",
+        "exc_type",
+        "route",
+        "frame",
+        "message",
+        "count",
+        "unreported",
+        "first_seen",
+        "last_seen",
+    )
+
+    def __init__(self, fingerprint: str, exc_type: str, route: str, frame: str):
+        self.fingerprint = fingerprint
+        self.exc_type = exc_type
+        self.route = route
+        self.frame = frame
+        self.message = ""
+        self.count = 0
+        self.unreported = 0
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+
+    def to_dict(self):
+        return {
+            "fingerprint": self.fingerprint,
+            "type": self.exc_type,
+            "route": self.route,
+            "frame": self.frame,
+            "message": self.message,
+            "count": self.count,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+        }
+
+
+class ErrorAggregator:
+    """Keeps counts for at most `max_fingerprints` distinct errors, evicting
+    the least recently seen one when full
+    """
+
+    def __init__(self, max_fingerprints: int):
+        self.max_fingerprints = max_fingerprints
+        self._records: "OrderedDict[str, ErrorRecord]" = OrderedDict()
+
+    def capture(
+        self,
+        exc: BaseException,
+        route: str,
+        summary: str,
+        exc_type: Optional[str] = None,
+        client_error: bool = False,
+    ) -> ErrorRecord:
+        """Counts an occurrence of `exc` on `route`.
+
+        `summary` is the one-line description logged the first time this
+        fingerprint is seen, with the traceback at ERROR level, or without
+        it at INFO level for a `client_error` (4xx). `exc_type` overrides
+        the type part of the fingerprint, e.g. to tell HTTP status codes
+        apart.
+        """
+
+        exc_type = exc_type or type(exc).__name__
+        frame = get_top_frame(exc)
+        key = fingerprint(exc_type, route, frame)
+
+        record = self._records.get(key)
+        if record is None:
+            if len(self._records) >= self.max_fingerprints:
+                self._records.popitem(last=False)
+
+            record = self._records[key] = ErrorRecord(key, exc_type, route, frame)
+            record.message = redacted_message(exc)
+            record.count = 1
+
+            message = (
+                f"[ERROR] - An error occured | [{key}] {exc_type}: {exc} at {frame}"
+            )
+            if client_error:
+                app_logger.info(f"{summary} | {message}")
+            else:
+                app_logger.info(summary)
+                app_logger.error(message, exc_info=(type(exc), exc, exc.__traceback__))
+            return record
+
+        self._records.move_to_end(key)
+        record.count += 1
+        record.unreported += 1
+        record.last_seen = time.time()
+        return record
+
+    def emit_summary(self):
+        """Logs one line per fingerprint that repeated since the last summary"""
+
+        for record in self._records.values():
+            if record.unreported:
+                app_logger.info(
+                    f"[ERROR] - Repeated {record.unreported} times | [{record.fingerprint}] "
+                    f"{record.exc_type} {record.route} at {record.frame} "
+                    f"(total {record.count})"
+                )
+                record.unreported = 0
+
+    async def run_summaries(self, interval: float):
+        """Emits summaries every `interval` seconds until cancelled, and a
+        last one when cancelled
+        """
+
+        if interval <= 0:
+            raise ValueError(f"Summary interval must be positive, got {interval}")
+
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                self.emit_summary()
+        finally:
+            self.emit_summary()
+
+    def start_summaries(self, interval: float) -> Optional[asyncio.Task]:
+        """Starts `run_summaries` as a task, cancel and await it to stop.
+        An `interval` of 0 or less disables the summaries and returns `None`.
+        """
+
+        if interval <= 0:
+            return None
+        return asyncio.create_task(self.run_summaries(interval))
+
+    def top(self, limit: int = 20):
+        """Returns the most frequent fingerprints"""
+
+        records = sorted(self._records.values(), key=lambda r: r.count, reverse=True)
+        return [record.to_dict() for record in records[:limit]]
+
+    def reset(self):
+        self._records.clear()
+
+
+error_aggregator = ErrorAggregator(max_fingerprints=settings.ERROR_MAX_FINGERPRINTS)
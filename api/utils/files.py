@@ -1,10 +1,14 @@
-import os, requests, io, mimetypes, cv2, asyncio
+import os, requests, io, mimetypes, asyncio
 from typing import List, Optional, Union
 from secrets import token_hex
 from fastapi import HTTPException, status, UploadFile
 from pathlib import Path
 from api.utils.settings import settings
 from api.utils.minio_service import minio_service
+from api.utils.lazy_import import lazy_import
+
+# OpenCV takes long to import and is only used for face detection
+cv2 = lazy_import("cv2")
 
 
 # BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -0,0 +1,264 @@
+"""
+Identity Cache
+File: api/utils/identity_cache.py
+
+Per-process cache of rows looked up by primary key, for hot rows that are
+read far more often than they change. Models opt in with
+`__identity_cache__ = True`; `Session.get` (and so `check_model_existence`
+and `get_model_or_none`) then serves them from the cache.
+
+Rows are cached as their column values and attached to the session on a
+hit without a query, so callers get a normal persistent instance. Misses
+are read from the primary, even in sessions routed to a read replica, so a
+lagging replica never puts an outdated row back in the cache. A row is
+dropped when a session flushes a change to it and again when that session
+commits; INSERT (upserts included), UPDATE and DELETE statements, ORM or
+on the model's Core table, drop every cached row of their model. Values
+are copied in and out of the cache, so mutating a loaded JSON column
+doesn't change the cached row. Like the count cache, invalidation is per
+worker process, other workers see a change after IDENTITY_CACHE_TTL seconds at the latest.
+
+Example use:
+    ``` python
+    class Plan(BaseTableModel):
+        __tablename__ = "plans"
+        __identity_cache__ = True
+    ```
+"""
+
+import copy
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Mapper, Session, make_transient_to_detached
+
+from api.db.types import to_uuid
+from api.utils.request_metrics import _escape_label, process_label
+from api.utils.settings import settings
+
+
+def is_cached_model(model) -> bool:
+    return getattr(model, "__identity_cache__", False) is True
+
+
+# Tables of the opted-in models, for statements on the table itself
+_cached_tables = set()
+
+
+@event.listens_for(Mapper, "after_mapper_constructed")
+def _register_table(mapper, class_):
+    if is_cached_model(class_):
+        _cached_tables.add(mapper.local_table.name)
+
+
+def cache_key(ident) -> Hashable:
+    """The same key for every spelling of a UUID primary key (hex, dashed,
+    `uuid.UUID`)
+    """
+
+    value = to_uuid(ident)
+    return ident if value is None else value.hex
+
+
+class IdentityCache:
+    """LRU of serialized rows keyed by `(table, primary key)`, with a TTL"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = Counter()
+        self.misses = Counter()
+        self.invalidations = Counter()
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, dict]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        # Bumped on every invalidation, a row read from the database before
+        # an invalidation must not be cached after it
+        self.version = 0
+
+    def get(self, table: str, ident: Hashable) -> Optional[dict]:
+        key = (table, ident)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits[table] += 1
+                return copy.deepcopy(entry[1])
+
+            if entry is not None:
+                del self._entries[key]
+            self.misses[table] += 1
+            return None
+
+    def set(self, table: str, ident: Hashable, values: dict, version: int):
+        if self.ttl <= 0:
+            return
+
+        values = copy.deepcopy(values)
+        with self._lock:
+            if version != self.version:
+                return
+            key = (table, ident)
+            self._entries[key] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, table: str, ident: Hashable):
+        with self._lock:
+            self.version += 1
+            if self._entries.pop((table, ident), None) is not None:
+                self.invalidations[table] += 1
+
+    def invalidate_table(self, table: str):
+        with self._lock:
+            self.version += 1
+            for key in [key for key in self._entries if key[0] == table]:
+                del self._entries[key]
+                self.invalidations[table] += 1
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        tables = set(self.hits) | set(self.misses) | set(self.invalidations)
+        return {
+            table: {
+                "hits": self.hits[table],
+                "misses": self.misses[table],
+                "invalidations": self.invalidations[table],
+            }
+            for table in sorted(tables)
+        }
+
+
+identity_cache = IdentityCache(
+    ttl=settings.IDENTITY_CACHE_TTL, max_entries=settings.IDENTITY_CACHE_MAX_ENTRIES
+)
+
+
+def _serialize(obj) -> dict:
+    return {attr.key: getattr(obj, attr.key) for attr in obj.__mapper__.column_attrs}
+
+
+class IdentityCachedSession(Session):
+    """Session whose `get` goes through the identity cache for opted-in
+    models. Lookups with options (locking, `populate_existing`...) and
+    composite keys skip the cache.
+    """
+
+    def get(self, entity, ident, **kwargs):
+        if (
+            kwargs
+            or not is_cached_model(entity)
+            or isinstance(ident, (tuple, list, dict))
+        ):
+            return super().get(entity, ident, **kwargs)
+
+        # Keep the identity map's guarantee: one instance per row per session
+        mapper = entity.__mapper__
+        if mapper.identity_key_from_primary_key([ident]) in self.identity_map:
+            return super().get(entity, ident)
+
+        table = mapper.local_table.name
+        key = cache_key(ident)
+        values = identity_cache.get(table, key)
+        if values is not None:
+            obj = mapper.class_manager.new_instance()
+            for name, value in values.items():
+                setattr(obj, name, value)
+            make_transient_to_detached(obj)
+            return self.merge(obj, load=False)
+
+        # Misses read from the primary (see api/db/routing.py): a lagging
+        # replica could serve the row from before a write that has just
+        # dropped it, which would then be cached for the whole TTL
+        version = identity_cache.version
+        obj = super().get(entity, ident, bind_arguments={"primary": True})
+        # Rows this transaction has written may not be committed yet
+        if obj is not None and table not in self.info.get(_WRITTEN, ()):
+            identity_cache.set(table, key, _serialize(obj), version)
+        return obj
+
+
+# Invalidation
+
+_WRITTEN = "identity_cache_written"
+
+
+def _pending(session: Session) -> Dict[str, set]:
+    return session.info.setdefault(_WRITTEN, {})
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if not is_cached_model(type(obj)):
+            continue
+
+        table = obj.__mapper__.local_table.name
+        ident = cache_key(obj.__mapper__.primary_key_from_instance(obj)[0])
+        _pending(session).setdefault(table, set()).add(ident)
+        identity_cache.invalidate(table, ident)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_execute(orm_execute_state):
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return
+
+    # `insert(Model)` or `insert(Model.__table__)`, with or without ON CONFLICT
+    table = getattr(orm_execute_state.statement.table, "name", None)
+    if table in _cached_tables:
+        # Which rows are affected isn't known, drop the whole model
+        _pending(orm_execute_state.session).setdefault(table, set()).add(None)
+        identity_cache.invalidate_table(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    for table, idents in session.info.pop(_WRITTEN, {}).items():
+        if None in idents:
+            identity_cache.invalidate_table(table)
+            continue
+        for ident in idents:
+            identity_cache.invalidate(table, ident)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_WRITTEN, None)
+
+
+def render_identity_cache_metrics() -> str:
+    """Renders this process's hit/miss/invalidation counters per table in
+    the Prometheus text format
+    """
+
+    stats = identity_cache.stats()
+    pid = process_label()
+    lines = []
+    for name, help_text in (
+        ("hits", "Primary key lookups served from the identity cache."),
+        ("misses", "Primary key lookups that went to the database."),
+        ("invalidations", "Identity cache entries dropped by writes."),
+    ):
+        metric = f"identity_cache_{name}_total"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for table, counters in stats.items():
+            lines.append(
+                f'{metric}{{{pid},table="{_escape_label(table)}"}} {counters[name]}'
+            )
+
+    return "\n".join(lines) + "\n"
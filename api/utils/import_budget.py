@@ -0,0 +1,110 @@
+"""
+Import Time Budget
+File: api/utils/import_budget.py
+
+Reports how long importing the app takes and fails when it goes over
+budget, or when a heavy optional dependency is imported at startup instead
+of lazily (see `api/utils/lazy_import.py`). The import runs in a fresh
+interpreter with `-X importtime`, so the numbers are cold-start numbers.
+
+Usage:
+    python -m api.utils.import_budget --budget 1.5
+    python -m api.utils.import_budget --module main --top 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Dependencies that must never be imported just by starting the app
+HEAVY_MODULES = (
+    "cv2",
+    "minio",
+    "reportlab",
+    "pandas",
+    "numpy",
+    "twilio",
+    "firebase_admin",
+)
+
+
+def measure_imports(module: str) -> Dict[str, Tuple[int, int]]:
+    """Imports `module` in a subprocess and returns the `-X importtime`
+    figures as `{module: (self_us, cumulative_us)}`
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+
+    return timings
+
+
+def check_budget(
+    module: str, budget: float, forbidden: List[str] = HEAVY_MODULES
+) -> Tuple[float, List[str], Dict[str, Tuple[int, int]]]:
+    """Returns `(seconds, problems, timings)` for importing `module`"""
+
+    timings = measure_imports(module)
+    seconds = timings[module][1] / 1_000_000
+
+    problems = []
+    if seconds > budget:
+        problems.append(
+            f"importing {module} took {seconds:.3f}s, budget is {budget:.3f}s"
+        )
+
+    for name in forbidden:
+        if name in timings:
+            problems.append(f"{name} is imported at startup, import it lazily")
+
+    return seconds, problems, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=float(os.environ.get("IMPORT_TIME_BUDGET", 2.0)),
+        help="Maximum import time in seconds (default: $IMPORT_TIME_BUDGET or 2.0)",
+    )
+    parser.add_argument(
+        "--top", type=int, default=15, help="Number of slowest imports to list"
+    )
+    args = parser.parse_args()
+
+    seconds, problems, timings = check_budget(args.module, args.budget)
+
+    print(f"Importing {args.module}: {seconds:.3f}s (budget {args.budget:.3f}s)")
+    print(f"\n{'self ms':>10}{'cumulative ms':>16}  module")
+    slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (self_us, cumulative_us) in slowest[: args.top]:
+        print(f"{self_us / 1000:>10.1f}{cumulative_us / 1000:>16.1f}  {name}")
+
+    if problems:
+        print("\nFAILED:")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
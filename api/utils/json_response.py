@@ -0,0 +1,118 @@
+"""
+JSON Response
+File: api/utils/json_response.py
+
+Single-pass JSON serialization for API responses. Instead of running the
+payload through `jsonable_encoder` and then serializing the result again,
+the payload is handed straight to the serializer, which only calls back
+into `default` for types it doesn't know. `orjson` is used when installed,
+otherwise the stdlib `json` module.
+
+NaN and Infinity aren't valid JSON: both serializers write them as `null`.
+"""
+
+import dataclasses
+import datetime
+import json
+import math
+from decimal import Decimal
+from enum import Enum
+from pathlib import PurePath
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.engine import Row
+
+from api.utils.serializer import encode_decimal, get_serializer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def default(obj: Any):
+    """Converts the types the JSON serializer can't handle natively"""
+
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return encode_decimal(obj)
+    if isinstance(obj, datetime.timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json", by_alias=True)
+    if isinstance(obj, Row):
+        return obj._asdict()
+    if hasattr(obj, "__mapper__"):
+        # ORM instance: only column attributes, so relationships are never
+        # lazy-loaded during serialization
+        return get_serializer(type(obj)).serialize(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if isinstance(obj, PurePath):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(content: Any) -> bytes:
+        """Serializes `content` to JSON bytes in a single pass"""
+        return orjson.dumps(content, default=default, option=_ORJSON_OPTIONS)
+
+else:
+
+    def _finite(obj: Any):
+        """Replaces NaN and Infinity in `obj` with `None`, like orjson"""
+
+        if isinstance(obj, float):
+            return obj if math.isfinite(obj) else None
+        if isinstance(obj, dict):
+            return {key: _finite(value) for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [_finite(value) for value in obj]
+        return obj
+
+    def _dumps(content: Any, default) -> bytes:
+        return json.dumps(
+            content,
+            default=default,
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+    def dumps(content: Any) -> bytes:
+        """Serializes `content` to JSON bytes in a single pass"""
+
+        try:
+            return _dumps(content, default)
+        except ValueError as exc:
+            if "Out of range float" not in str(exc):
+                raise
+            # NaN or Infinity somewhere in the payload: only then is it
+            # walked to replace them, including in what `default` returns
+            return _dumps(_finite(content), lambda obj: _finite(default(obj)))
+
+
+class FastJSONResponse(JSONResponse):
+    """`JSONResponse` that serializes with `dumps` instead of
+    `jsonable_encoder` + `json.dumps`
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
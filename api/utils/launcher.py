@@ -0,0 +1,184 @@
+"""
+Server Launcher
+File: api/utils/launcher.py
+
+Production entry point for the API. Sizes the worker pool from the CPUs
+actually available to the process (affinity and cgroup quota aware),
+picks uvloop/httptools when installed and reports the effective
+configuration before starting.
+
+Workers are supervised by uvicorn: a worker that exits (e.g. after
+SERVER_MAX_REQUESTS) is replaced, and `kill -HUP <master pid>` restarts
+the workers one at a time so the others keep serving.
+
+Usage:
+    python -m api.utils.launcher
+    python main.py --reload          # development, single process
+"""
+
+import argparse
+import importlib.util
+import math
+import os
+import random
+from typing import Optional
+
+import uvicorn
+from uvicorn.supervisors import ChangeReload, Multiprocess
+
+from api.loggers.app_logger import app_logger
+from api.utils.settings import settings
+
+
+def available_cpus() -> int:
+    """Returns the number of CPUs this process may use, honouring CPU
+    affinity and a cgroup v2/v1 CPU quota (containers)
+    """
+
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - not available on macOS
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+            if limit != "max":
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+
+    return max(1, cpus)
+
+
+def worker_count(configured: int, max_workers: int) -> int:
+    """`configured` workers, or one per available CPU when it is 0"""
+
+    workers = configured or available_cpus()
+    if max_workers:
+        workers = min(workers, max_workers)
+    return max(1, workers)
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+class LauncherConfig(uvicorn.Config):
+    """uvicorn config that spreads `limit_max_requests` by a random jitter
+    per worker process, so workers don't all recycle at the same time
+    """
+
+    max_requests_jitter = 0
+
+    @property
+    def limit_max_requests(self) -> Optional[int]:
+        if not self._limit_max_requests:
+            return None
+
+        # Each worker process draws its own jitter the first time it asks
+        if getattr(self, "_jitter_pid", None) != os.getpid():
+            self._jitter_pid = os.getpid()
+            self._jitter = random.randint(0, self.max_requests_jitter)
+        return self._limit_max_requests + self._jitter
+
+    @limit_max_requests.setter
+    def limit_max_requests(self, value: Optional[int]):
+        self._limit_max_requests = value
+
+
+def build_config(reload: bool = False, workers: Optional[int] = None) -> LauncherConfig:
+    reload = reload or settings.SERVER_RELOAD
+    workers = worker_count(
+        workers if workers is not None else settings.SERVER_WORKERS,
+        settings.SERVER_MAX_WORKERS,
+    )
+    if reload and workers > 1:
+        app_logger.warning(f"Reload is on, ignoring {workers} workers and using 1")
+        workers = 1
+
+    config = LauncherConfig(
+        "main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        loop="uvloop" if _installed("uvloop") else "asyncio",
+        http="httptools" if _installed("httptools") else "h11",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        limit_max_requests=settings.SERVER_MAX_REQUESTS or None,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+        reload=reload,
+        reload_excludes=["logs", "tmp"] if reload else None,
+    )
+    config.max_requests_jitter = settings.SERVER_MAX_REQUESTS_JITTER
+    return config
+
+
+def describe(config: LauncherConfig) -> str:
+    max_requests = config._limit_max_requests
+    db_connections = config.workers * (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+    return (
+        f"Starting server | pid={os.getpid()} bind={config.host}:{config.port} "
+        f"workers={config.workers} cpus={available_cpus()} loop={config.loop} "
+        f"http={config.http} backlog={config.backlog} "
+        f"keep_alive={config.timeout_keep_alive}s "
+        f"graceful_timeout={config.timeout_graceful_shutdown}s "
+        f"max_requests={max_requests or 'off'}"
+        f"{f'+0..{config.max_requests_jitter}' if max_requests else ''} "
+        f"reload={config.reload} "
+        f"db_connections_max={db_connections}"
+    )
+
+
+def run(reload: bool = False, workers: Optional[int] = None):
+    config = build_config(reload=reload, workers=workers)
+    app_logger.info(describe(config))
+
+    if config.workers > settings.REQUEST_STATS_MAX_WORKERS:
+        app_logger.warning(
+            f"{config.workers} workers but only {settings.REQUEST_STATS_MAX_WORKERS} "
+            "shared request stats regions, raise REQUEST_STATS_MAX_WORKERS"
+        )
+
+    server = uvicorn.Server(config)
+
+    if config.should_reload:
+        sock = config.bind_socket()
+        ChangeReload(config, target=server.run, sockets=[sock]).run()
+    elif config.workers > 1:
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--reload", action="store_true", help="Reload on code changes (development)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Override SERVER_WORKERS"
+    )
+    args = parser.parse_args()
+
+    run(reload=args.reload, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Lazy Imports
+File: api/utils/lazy_import.py
+
+Defers importing heavy optional dependencies (OpenCV, MinIO, reportlab...)
+until they are first used, so they don't slow down worker boot, `--reload`
+cycles and test collection for code paths that never touch them.
+
+Example use:
+    ``` python
+    cv2 = lazy_import("cv2")
+
+    def detect_faces(path):
+        image = cv2.imread(path)  # cv2 is imported here, on first use
+    ```
+"""
+
+import importlib
+import types
+from typing import Any, Callable
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_loaded"] = False
+
+    def _load(self):
+        try:
+            module = importlib.import_module(self.__name__)
+        except ImportError as exc:
+            raise ImportError(
+                f"{self.__name__} is required for this feature but is not installed"
+            ) from exc
+
+        # Copy the real module's namespace so later lookups don't go
+        # through __getattr__ anymore
+        self.__dict__.update(module.__dict__)
+        self.__dict__["_lazy_loaded"] = True
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        if self.__dict__["_lazy_loaded"]:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {attr!r}")
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        if not self.__dict__["_lazy_loaded"]:
+            self._load()
+        return list(self.__dict__)
+
+
+class LazyObject:
+    """Stand-in for an object that is only built on first attribute access.
+
+    Used for module-level singletons whose constructor is expensive or
+    needs a heavy dependency, e.g. `minio_service = lazy_object(MinioService)`.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+
+    def _get_instance(self):
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            instance = object.__getattribute__(self, "_factory")()
+            object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._get_instance(), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self._get_instance(), attr, value)
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Returns a module that is imported on first use"""
+    return LazyModule(name)
+
+
+def lazy_object(factory: Callable[[], Any]) -> LazyObject:
+    """Returns a proxy that calls `factory` on first use"""
+    return LazyObject(factory)
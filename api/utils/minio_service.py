@@ -1,17 +1,20 @@
 from datetime import timedelta
 import json, requests, os
 from uuid import uuid4
-from minio import Minio
-from minio.error import S3Error
 
 from api.utils.settings import settings
 from api.utils.mime_types import mime_types
+from api.utils.lazy_import import lazy_import, lazy_object
+
+# The minio client is only needed once a file is actually stored
+minio = lazy_import("minio")
+minio_error = lazy_import("minio.error")
 
 
 class MinioService:
 
     def __init__(self):
-        self.minio_client = Minio(
+        self.minio_client = minio.Minio(
             endpoint="media.tifi.tv",
             access_key=settings.MINIO_ACCESS_KEY,
             secret_key=settings.MINIO_SECRET_KEY,
@@ -51,7 +54,7 @@ class MinioService:
                 ),
             )
             return url
-        except S3Error as s3_error:
+        except minio_error.S3Error as s3_error:
             print(f"An error occured: {s3_error}")
 
     def upload_to_minio(
@@ -100,7 +103,7 @@ class MinioService:
 
             return preview_url, download_url
 
-        except S3Error as s3_error:
+        except minio_error.S3Error as s3_error:
             print(f"An error occured: {s3_error}")
 
     def upload_to_tmp_bucket(
@@ -135,7 +138,7 @@ class MinioService:
 
             return preview_url
 
-        except S3Error as s3_error:
+        except minio_error.S3Error as s3_error:
             raise s3_error
 
     def download_file_from_minio(self, url: str):
@@ -166,4 +169,4 @@ class MinioService:
             print(f"Error downloading large file: {e}")
 
 
-minio_service = MinioService()
+minio_service = lazy_object(MinioService)
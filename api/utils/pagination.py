@@ -1,12 +1,81 @@
-from typing import Any, Dict, List, Optional
-from fastapi.encoders import jsonable_encoder
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException
 from sqlalchemy.orm import Session, subqueryload
 from api.db.database import Base
-from sqlalchemy import desc
+from api.db.types import to_uuid
+from sqlalchemy import asc, desc
 
+from api.utils.count_cache import count_total
+from api.utils.search import search_filter, searchable_columns
 from api.utils.success_response import success_response
 
 
+def encode_cursor(id: str, direction: str) -> str:
+    """Returns an opaque cursor for the row with `id`. `direction` is
+    `"next"` for the rows after it or `"prev"` for the rows before it
+    """
+
+    payload = json.dumps([direction, id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Returns `(direction, id)`, raises a 400 for a bad cursor"""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, id = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        # `BaseTableModel` ids, which would fail to bind
+        if to_uuid(id) is None:
+            raise ValueError(id)
+        return direction, id
+    except (binascii.Error, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def _keyset_page(db: Session, query, model, limit: int, cursor: Optional[str]):
+    """Returns `(items, next_cursor, prev_cursor)` for the page after or
+    before `cursor`, newest first.
+
+    Rows are keyed on the id alone: uuid7 ids start with their creation
+    time, so they sort in creation order and the primary key index serves
+    both the filter and the order.
+    """
+
+    direction = "next"
+
+    if cursor:
+        direction, cursor_id = decode_cursor(cursor)
+        query = query.filter(
+            model.id < cursor_id if direction == "next" else model.id > cursor_id
+        )
+
+    # Pages before the cursor are read in ascending order from the cursor
+    # and flipped, so both directions use the index the same way
+    order = desc if direction == "next" else asc
+    items = query.order_by(order(model.id)).limit(limit + 1).all()
+
+    has_more = len(items) > limit
+    items = items[:limit]
+    if direction == "prev":
+        items.reverse()
+
+    if not items:
+        return items, None, None
+
+    has_next = has_more if direction == "next" else True
+    has_prev = bool(cursor) if direction == "next" else has_more
+
+    next_cursor = encode_cursor(items[-1].id, "next") if has_next else None
+    prev_cursor = encode_cursor(items[0].id, "prev") if has_prev else None
+    return items, next_cursor, prev_cursor
+
+
 def paginated_response(
     db: Session,
     model,
@@ -14,6 +83,10 @@ def paginated_response(
     limit: int,
     join: Optional[Any] = None,
     filters: Optional[Dict[str, Any]] = None,
+    cursor: Optional[str] = None,
+    keyset: bool = False,
+    include_total: bool = True,
+    estimate_total: bool = False,
 ):
     """
     Custom response for pagination.\n
@@ -24,7 +97,20 @@ def paginated_response(
         * skip- this is the number of items to skip before fetching the next page of data. This would also
         be a query parameter
         * join- this is an optional argument to join a table to the query
-        * filters- this is an optional dictionary of filters to apply to the query
+        * filters- this is an optional dictionary of filters to apply to the query.
+        Values are matched exactly, except on `__searchable__` columns where
+        they are substring matches
+        * cursor- this is the `next_cursor` or `prev_cursor` of a previous page,
+        it turns on keyset pagination
+        * keyset- use keyset pagination from the first page (no cursor yet).
+        Pages are ordered by id, which for uuid7 ids is creation order, and
+        read straight from the primary key index, so deep pages cost the
+        same as the first one. `skip` is ignored
+        * include_total- set to `False` to skip counting the matching rows,
+        `total` and `pages` are then `None`
+        * estimate_total- use the database's estimate of the row count instead
+        of counting (see `api/utils/count_cache.py`), `total_estimated` tells
+        which one the response holds. Totals are cached either way
 
     Example use:
         **Without filter**
@@ -59,6 +145,19 @@ def paginated_response(
             filters={'org_id': org_id}
         )
         ```
+
+        **With keyset pagination**
+        ``` python
+        return paginated_response(
+            db=db,
+            model=Product,
+            limit=limit,
+            skip=0,
+            cursor=cursor,
+            keyset=True,
+            include_total=False
+        )
+        ```
     """
 
     query = db.query(model)
@@ -66,38 +165,52 @@ def paginated_response(
     if join is not None:
         query = query.join(join)
 
-    if filters and join is None:
-        # Apply filters
-        for attr, value in filters.items():
-            if value is not None:
-                column = getattr(model, attr)
-
-                if isinstance(column.type, bool):
-                    # Handle boolean fields
-                    query = query.filter(column == value)
-                elif isinstance(column.type, str):
-                    # Handle string fields
-                    query = query.filter(column.like(f"%{value}%"))
-                else:
-                    # Handle other types (e.g., Integer, DateTime)
-                    query = query.filter(column == value)
-
-    elif filters and join is not None:
-        # Apply filters
+    if filters:
+        # Columns listed in `__searchable__` are substring matches served by
+        # the search index (see api/utils/search.py), all others exact matches
+        target = model if join is None else join
+        searchable = searchable_columns(target)
         for attr, value in filters.items():
-            if value is not None:
+            if value is None:
+                continue
+
+            if attr in searchable:
                 query = query.filter(
-                    getattr(getattr(join, "columns"), attr).like(f"%{value}%")
+                    search_filter(db, target, attr, value, case_sensitive=True)
                 )
+            elif join is None:
+                query = query.filter(getattr(model, attr) == value)
+            else:
+                query = query.filter(join.columns[attr] == value)
+
+    total = total_pages = None
+    total_estimated = False
+    if include_total:
+        total, total_estimated = count_total(
+            db, query, model, join, filters, estimated=estimate_total
+        )
+        try:
+            total_pages = int(total / limit) + (total % limit > 0)
+        except:
+            total_pages = int(total / limit)
+
+    if keyset or cursor:
+        items, next_cursor, prev_cursor = _keyset_page(db, query, model, limit, cursor)
+        return success_response(
+            status_code=200,
+            message="Successfully fetched items",
+            data={
+                "pages": total_pages,
+                "total": total,
+                "total_estimated": total_estimated,
+                "limit": limit,
+                "next_cursor": next_cursor,
+                "prev_cursor": prev_cursor,
+                "items": items,
+            },
+        )
 
-    total = query.count()
-    results = query.order_by(desc(model.created_at)).offset(skip).limit(limit).all()
-    items = jsonable_encoder(results)
-
-    try:
-        total_pages = int(total / limit) + (total % limit > 0)
-    except:
-        total_pages = int(total / limit)
+    items = query.order_by(desc(model.created_at)).offset(skip).limit(limit).all()
 
     return success_response(
         status_code=200,
@@ -105,6 +218,7 @@ def paginated_response(
         data={
             "pages": total_pages,
             "total": total,
+            "total_estimated": total_estimated,
             "skip": skip,
             "limit": limit,
             "items": items,
@@ -1,13 +1,16 @@
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from api.utils.lazy_import import lazy_import
+
+# reportlab is only imported once a PDF is built
+pagesizes = lazy_import("reportlab.lib.pagesizes")
+styles = lazy_import("reportlab.lib.styles")
+platypus = lazy_import("reportlab.platypus")
 
 
 class PDFBuilder:
 
     def __init__(self, pdf_buffer):
-        self.doc = SimpleDocTemplate(pdf_buffer, pagesize=letter)
-        self.styles = getSampleStyleSheet()
+        self.doc = platypus.SimpleDocTemplate(pdf_buffer, pagesize=pagesizes.letter)
+        self.styles = styles.getSampleStyleSheet()
         self.story = []
 
     def build(self):
@@ -15,18 +18,18 @@ class PDFBuilder:
 
     def add_title(self, title: str):
         title_style = self.styles["Title"]
-        self.story.append(Paragraph(title, title_style))
-        self.story.append(Spacer(1, 12))
+        self.story.append(platypus.Paragraph(title, title_style))
+        self.story.append(platypus.Spacer(1, 12))
 
     def add_body(self, text: str):
         normal_style = self.styles["Normal"]
         paragraphs = text.split("\n\n")
 
         for paragraph in paragraphs:
-            self.story.append(Paragraph(paragraph, normal_style))
-            self.story.append(Spacer(1, 12))
+            self.story.append(platypus.Paragraph(paragraph, normal_style))
+            self.story.append(platypus.Spacer(1, 12))
 
     def add_section(self, title: str, text: str):
         self.add_title(title)
         self.add_body(text)
-        self.story.append(Spacer(1, 24))
+        self.story.append(platypus.Spacer(1, 24))
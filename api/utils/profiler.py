@@ -0,0 +1,183 @@
+"""
+Request Profiler
+File: api/utils/profiler.py
+
+On-demand statistical profiling of single requests. While a profiled
+request runs, one long-lived background thread samples the stacks of the event loop
+thread and of the busy threadpool threads (where sync endpoints and
+dependencies run) every few milliseconds. Other requests served at the
+same time show up in the samples too, so profiles are most useful when
+the worker isn't saturated. The samples are stored as collapsed stacks
+(`root;caller;callee count` per line), which `flamegraph.pl`, speedscope
+and inferno read directly, in a bounded ring of recent profiles.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Optional
+
+from api.utils.settings import settings
+
+MAX_STACK_DEPTH = 128
+
+# Name anyio gives the threads that run sync endpoints
+WORKER_THREAD_NAME = "AnyIO worker thread"
+
+
+def collapse_stack(frame) -> str:
+    """Returns the stack ending at `frame` as `root;...;leaf`"""
+
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        name = getattr(code, "co_qualname", code.co_name)
+        names.append(
+            f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+
+    return ";".join(reversed(names))
+
+
+class Profile:
+    """Collapsed stacks sampled while one request ran"""
+
+    def __init__(self, loop_thread_id: int):
+        self.loop_thread_id = loop_thread_id
+        self.stacks = Counter()
+        self.samples = 0
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.items())
+
+
+class StackSampler(threading.Thread):
+    """Long-lived thread sampling, every `interval` seconds, the event loop
+    thread and busy worker threads into each running `Profile`. It sleeps
+    while no request is profiled, and starting or ending a profile never
+    waits for it, so the event loop doesn't block on the profiler.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self._profiles = set()
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+
+    def begin(self, loop_thread_id: int) -> Profile:
+        """Starts sampling into a new profile"""
+
+        profile = Profile(loop_thread_id)
+        with self._lock:
+            if self.ident is None:
+                self.start()
+            self._profiles.add(profile)
+            self._active.set()
+        return profile
+
+    def end(self, profile: Profile):
+        """Stops sampling into `profile`, which receives no more samples
+        once this returns
+        """
+
+        with self._lock:
+            self._profiles.discard(profile)
+            if not self._profiles:
+                self._active.clear()
+
+    def _worker_thread_ids(self):
+        return {
+            thread.ident
+            for thread in threading.enumerate()
+            if thread.name == WORKER_THREAD_NAME
+        }
+
+    def _sample(self, loop_thread_ids) -> list:
+        frames = sys._current_frames()
+        stacks = []
+        for thread_id in loop_thread_ids:
+            frame = frames.get(thread_id)
+            if frame is not None:
+                stacks.append("event-loop;" + collapse_stack(frame))
+
+        for thread_id in self._worker_thread_ids():
+            frame = frames.get(thread_id)
+            # Idle workers are parked waiting for a job
+            if frame is None or (
+                frame.f_code.co_name == "wait"
+                and frame.f_code.co_filename == threading.__file__
+            ):
+                continue
+            stacks.append("worker;" + collapse_stack(frame))
+        return stacks
+
+    def run(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+
+            with self._lock:
+                loop_thread_ids = {profile.loop_thread_id for profile in self._profiles}
+            if not loop_thread_ids:
+                continue
+
+            # Collapsing happens outside the lock, `end` never waits for it
+            stacks = self._sample(loop_thread_ids)
+            with self._lock:
+                for profile in self._profiles:
+                    profile.samples += 1
+                    profile.stacks.update(stacks)
+
+
+class ProfileStore:
+    """Ring of the most recent request profiles"""
+
+    def __init__(self, max_profiles: int):
+        self._profiles = deque(maxlen=max_profiles)
+
+    def add(
+        self,
+        profile_id: str,
+        method: str,
+        path: str,
+        route: str,
+        status_code: int,
+        duration: float,
+        profile: Profile,
+    ):
+        self._profiles.append(
+            {
+                "id": profile_id,
+                "method": method,
+                "path": path,
+                "route": route,
+                "status_code": status_code,
+                "duration": duration,
+                "samples": profile.samples,
+                "created_at": time.time(),
+                "collapsed": profile.collapsed(),
+            }
+        )
+
+    def list(self):
+        """Returns the stored profiles without their stacks, newest first"""
+
+        return [
+            {key: value for key, value in profile.items() if key != "collapsed"}
+            for profile in reversed(self._profiles)
+        ]
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        for profile in self._profiles:
+            if profile["id"] == profile_id:
+                return profile
+        return None
+
+
+profile_store = ProfileStore(max_profiles=settings.PROFILING_MAX_PROFILES)
+
+stack_sampler = StackSampler(interval=settings.PROFILING_INTERVAL_MS / 1000)
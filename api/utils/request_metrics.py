@@ -0,0 +1,386 @@
+"""
+Request Metrics
+File: api/utils/request_metrics.py
+
+Bounded-memory request counters and latency histograms. Paths are
+normalized to their route template (``/api/v1/users/{id}`` instead of every
+concrete id) and each route keeps a fixed-size top-K sketch of the heaviest
+client IPs, so the memory used does not grow with traffic.
+
+`/request-stats` merges the counts of every worker (see
+api/utils/shared_stats.py). `/metrics` only renders the series of the
+worker serving the scrape, labelled with its `pid`: no counter appears to
+go back when the next scrape reaches another worker, and summing over
+`pid` gives the totals of the whole server.
+"""
+
+import os
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from api.utils.settings import settings
+
+UNMATCHED_ROUTE = "<unmatched>"
+OVERFLOW_ROUTE = "<other>"
+
+# Upper bounds (in seconds) of the latency buckets, same as the Prometheus
+# client defaults with a few extra buckets for slow endpoints
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+    30.0,
+    60.0,
+)
+
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+def get_route_template(scope: dict) -> str:
+    """Returns the route template that served a request.
+
+    This must be called after the router has run, since the router is
+    what stores the matched route on the ASGI scope.
+    """
+
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path_format", None) or route.path
+
+    # Mounted apps (e.g. StaticFiles) don't set `route`, but they do set
+    # their own mount point as the root path
+    if "endpoint" in scope and scope.get("root_path"):
+        return scope["root_path"]
+
+    return UNMATCHED_ROUTE
+
+
+class SpaceSaving:
+    """Fixed-memory top-K heavy hitters sketch (Metwally et al.).
+
+    Keeps at most `capacity` keys. When a new key arrives and the sketch
+    is full, the key with the smallest count is evicted and the newcomer
+    inherits its count, which keeps the counts of true heavy hitters an
+    upper bound with an error of at most the evicted minimum.
+    """
+
+    __slots__ = ("capacity", "_counts", "_errors")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1) -> Optional[str]:
+        """Counts `key` and returns the key it evicted, if any"""
+
+        counts = self._counts
+
+        if key in counts:
+            counts[key] += count
+            return None
+
+        if len(counts) < self.capacity:
+            counts[key] = count
+            self._errors[key] = 0
+            return None
+
+        victim = min(counts, key=counts.__getitem__)
+        floor = counts.pop(victim)
+        del self._errors[victim]
+
+        counts[key] = floor + count
+        self._errors[key] = floor
+        return victim
+
+    def count(self, key: str) -> int:
+        return self._counts.get(key, 0)
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Returns the tracked keys ordered by descending count"""
+
+        items = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        return items if n is None else items[:n]
+
+    def error(self, key: str) -> int:
+        """Returns the maximum overestimation of `key`'s count"""
+        return self._errors.get(key, 0)
+
+    def __len__(self):
+        return len(self._counts)
+
+
+class RequestMetrics:
+    """Per-route request counters held in preallocated slots.
+
+    Route templates are assigned a slot on first sight. Once `max_routes`
+    slots are taken every new template is folded into a single overflow
+    slot, so neither the counters nor the IP sketches can grow past the
+    configured size. All updates happen on the event loop thread, so no
+    locking is needed.
+    """
+
+    def __init__(self, max_routes: int, top_ips: int):
+        self.max_routes = max_routes
+        self.top_ips = top_ips
+
+        # Slot 0 is reserved for templates that don't fit in the table
+        self._slots: Dict[str, int] = {OVERFLOW_ROUTE: 0}
+        self._routes: List[str] = [OVERFLOW_ROUTE]
+        self._counts = array("Q", [0] * (max_routes + 1))
+        self._ips: List[SpaceSaving] = [
+            SpaceSaving(top_ips) for _ in range(max_routes + 1)
+        ]
+        self.shared = None
+
+    def attach_shared(self, shared):
+        """Mirrors every update into a `SharedRequestStats` region so the
+        counters can be merged across worker processes
+        """
+        self.shared = shared
+
+    def route_label(self, route: str) -> str:
+        """Returns `route` if it has a slot, otherwise the overflow route.
+
+        Use this for any other per-route series so they share the same
+        cardinality bound as the counters.
+        """
+        return self._routes[self._slot(route)]
+
+    def _slot(self, route: str) -> int:
+        slot = self._slots.get(route)
+        if slot is not None:
+            return slot
+
+        if len(self._routes) > self.max_routes:
+            return 0
+
+        slot = len(self._routes)
+        self._slots[route] = slot
+        self._routes.append(route)
+        return slot
+
+    def record(self, route: str, ip_address: Optional[str]):
+        """Counts a single request to `route` from `ip_address`"""
+
+        slot = self._slot(route)
+        self._counts[slot] += 1
+
+        ip_address = ip_address or "unknown"
+        ips = self._ips[slot]
+        evicted = ips.add(ip_address)
+
+        if self.shared is not None:
+            self.shared.record(
+                slot,
+                self._routes[slot],
+                self._counts[slot],
+                ip_address,
+                ips.count(ip_address),
+                evicted,
+            )
+
+    def request_counts(self) -> Dict[str, Dict[str, int]]:
+        """Returns `{route: {ip: count}}` for the heaviest IPs of each route,
+        merged across workers when shared stats are attached
+        """
+
+        if self.shared is not None:
+            return self.shared.merge()[1]
+
+        return {
+            route: dict(self._ips[slot].top())
+            for slot, route in enumerate(self._routes)
+            if self._counts[slot]
+        }
+
+    def totals(self) -> Dict[str, int]:
+        """Returns the exact number of requests this process served per route"""
+
+        return {
+            route: self._counts[slot]
+            for slot, route in enumerate(self._routes)
+            if self._counts[slot]
+        }
+
+    def reset(self):
+        shared = self.shared
+        self.__init__(self.max_routes, self.top_ips)
+        self.shared = shared
+        if shared is not None:
+            shared.clear()
+
+
+class LatencyHistograms:
+    """Fixed-bucket latency histograms keyed by route, method and status class.
+
+    Each series is a preallocated array of bucket counts, so recording an
+    observation is a dict lookup, a bisect over the (constant) bucket
+    bounds and an increment.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, str, str], array] = {}
+        self._sums: Dict[Tuple[str, str, str], float] = {}
+
+    def observe(self, route: str, method: str, status_code: int, seconds: float):
+        if method not in KNOWN_METHODS:
+            method = "OTHER"
+        key = (route, method, f"{status_code // 100}xx")
+
+        counts = self._series.get(key)
+        if counts is None:
+            # One slot per bucket plus the +Inf bucket
+            counts = self._series[key] = array("Q", [0] * (len(self.buckets) + 1))
+            self._sums[key] = 0.0
+
+        counts[bisect_left(self.buckets, seconds)] += 1
+        self._sums[key] += seconds
+
+    def quantile(self, q: float, route: str, method: str, status_class: str):
+        """Estimates the `q` quantile of a series by linear interpolation
+        within the bucket that contains it. Returns `None` for empty series.
+        """
+
+        counts = self._series.get((route, method, status_class))
+        if not counts:
+            return None
+
+        total = sum(counts)
+        if not total:
+            return None
+
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * ((rank - seen) / count)
+            seen += count
+
+        return self.buckets[-1]
+
+    def series(self):
+        """Yields `(labels, cumulative bucket counts, count, sum)` per series"""
+
+        for key, counts in self._series.items():
+            cumulative = []
+            running = 0
+            for count in counts:
+                running += count
+                cumulative.append(running)
+            yield key, cumulative, running, self._sums[key]
+
+    def reset(self):
+        self._series.clear()
+        self._sums.clear()
+
+
+class Histogram:
+    """Single fixed-bucket histogram for unlabelled measurements"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = array("Q", [0] * (len(self.buckets) + 1))
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, help_text: str) -> str:
+        """Renders the histogram in the Prometheus text format"""
+
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        bounds = [repr(bound) for bound in self.buckets] + ["+Inf"]
+        running = 0
+        for bound, count in zip(bounds, self.counts):
+            running += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {running}')
+        lines.append(f"{name}_sum {self.sum}")
+        lines.append(f"{name}_count {running}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def process_label() -> str:
+    """The `pid` label every series of `/metrics` carries, since each scrape
+    is served by one of the workers
+    """
+
+    return f'pid="{os.getpid()}"'
+
+
+def render_metric(name: str, value, help_text: str, metric_type: str = "gauge"):
+    """Renders a single metric of this process in the Prometheus text format"""
+
+    return (
+        f"# HELP {name} {help_text}\n# TYPE {name} {metric_type}\n"
+        f"{name}{{{process_label()}}} {value}\n"
+    )
+
+
+def render_prometheus(
+    metrics: "RequestMetrics", histograms: "LatencyHistograms"
+) -> str:
+    """Renders this process's request counters and latency histograms in
+    the Prometheus text exposition format (version 0.0.4)
+    """
+
+    pid = process_label()
+    lines = [
+        "# HELP http_requests_total Total HTTP requests served per route.",
+        "# TYPE http_requests_total counter",
+    ]
+    for route, count in metrics.totals().items():
+        lines.append(
+            f'http_requests_total{{{pid},route="{_escape_label(route)}"}} {count}'
+        )
+
+    lines.extend(
+        [
+            "# HELP http_request_duration_seconds HTTP request latency.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+    )
+    bounds = [repr(bound) for bound in histograms.buckets] + ["+Inf"]
+    for (route, method, status_class), cumulative, count, total in histograms.series():
+        labels = (
+            f'{pid},route="{_escape_label(route)}",method="{method}",'
+            f'status="{status_class}"'
+        )
+        for bound, value in zip(bounds, cumulative):
+            lines.append(
+                f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {value}'
+            )
+        lines.append(f"http_request_duration_seconds_sum{{{labels}}} {total}")
+        lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics(
+    max_routes=settings.REQUEST_STATS_MAX_ROUTES,
+    top_ips=settings.REQUEST_STATS_TOP_IPS,
+)
+
+latency_histograms = LatencyHistograms()
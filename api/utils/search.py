@@ -0,0 +1,230 @@
+"""
+Substring Search
+File: api/utils/search.py
+
+Indexed `%value%` filters. Models list the columns they search in with
+`__searchable__` (plain tables with `Table(..., info={"searchable": [...]})`)
+and `search_filter` builds the filter for them:
+
+    * PostgreSQL: a trigram GIN index (pg_trgm) per column, which `LIKE` and
+      `ILIKE` with leading wildcards use directly, so the filter is unchanged.
+    * SQLite: an FTS5 table with the trigram tokenizer copying the
+      searchable columns, kept in sync by triggers; the filter becomes a
+      lookup in it. FTS rows are keyed by a `<table>_search_keys` table
+      mapping the primary key to a stable integer, since the implicit rowid
+      of tables without an INTEGER PRIMARY KEY can change on VACUUM.
+
+Other columns and databases get the plain (sequential scan) filter. The
+indexes are created with the tables by `create_all`, and for databases
+managed with migrations by:
+
+    python -m api.utils.search --install
+
+Example use:
+    ``` python
+    class Product(BaseTableModel):
+        __tablename__ = "products"
+        __searchable__ = ("name", "description")
+
+    query = query.filter(search_filter(db, Product, "name", "blue"))
+    ```
+"""
+
+import argparse
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import Column, Table, column, event, select, table
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from api.db.database import Base, engine
+from api.loggers.app_logger import app_logger
+
+
+def _table(model_or_table) -> Table:
+    return getattr(model_or_table, "__table__", model_or_table)
+
+
+def searchable_columns(model_or_table) -> Tuple[str, ...]:
+    columns = getattr(model_or_table, "__searchable__", None)
+    if columns is None:
+        columns = _table(model_or_table).info.get("searchable", ())
+    return tuple(columns)
+
+
+def searchable_tables(metadata=Base.metadata) -> List[Tuple[Table, Tuple[str, ...]]]:
+    """Returns `(table, columns)` for every table with searchable columns"""
+
+    found = {}
+    for mapper in Base.registry.mappers:
+        columns = searchable_columns(mapper.class_)
+        if columns and mapper.local_table.metadata is metadata:
+            found[mapper.local_table.name] = (mapper.local_table, columns)
+
+    for table_ in metadata.tables.values():
+        columns = table_.info.get("searchable")
+        if columns and table_.name not in found:
+            found[table_.name] = (table_, tuple(columns))
+
+    return list(found.values())
+
+
+def fts_table_name(table_name: str) -> str:
+    return f"{table_name}_search"
+
+
+def fts_keys_table_name(table_name: str) -> str:
+    return f"{table_name}_search_keys"
+
+
+def _primary_key(table_: Table) -> Column:
+    columns = list(table_.primary_key.columns)
+    if len(columns) != 1:
+        raise ValueError(f"{table_.name} needs a single-column primary key to search")
+    return columns[0]
+
+
+def search_filter(
+    db: Session, model_or_table, column_name: str, value, case_sensitive=False
+):
+    """Returns the filter for rows whose `column_name` contains `value`"""
+
+    table_ = _table(model_or_table)
+    target = table_.c[column_name]
+    pattern = f"%{value}%"
+
+    searchable = column_name in searchable_columns(model_or_table)
+    if searchable and db.get_bind().dialect.name == "sqlite":
+        # LIKE on an FTS5 trigram table is answered from its index (for
+        # values of 3+ characters) and is case-insensitive, like ILIKE
+        fts = table(fts_table_name(table_.name), column("rowid"), column(column_name))
+        keys = table(fts_keys_table_name(table_.name), column("id"), column("key"))
+        matches = select(fts.c.rowid).where(fts.c[column_name].like(pattern))
+        return _primary_key(table_).in_(
+            select(keys.c.key).where(keys.c.id.in_(matches))
+        )
+
+    return target.like(pattern) if case_sensitive else target.ilike(pattern)
+
+
+# Index maintenance
+
+
+def _install_postgresql(connection: Connection, table_: Table, columns: Iterable[str]):
+    connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name in columns:
+        connection.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_{table_.name}_{name}_trgm "
+            f'ON "{table_.name}" USING gin ("{name}" gin_trgm_ops)'
+        )
+
+
+def _install_sqlite(connection: Connection, table_: Table, columns: Iterable[str]):
+    fts = fts_table_name(table_.name)
+    keys = fts_keys_table_name(table_.name)
+    key = _primary_key(table_).name
+    columns = list(columns)
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+
+    installed = connection.exec_driver_sql(
+        "SELECT count(*) FROM sqlite_master WHERE (type = 'trigger' AND name = ?) "
+        "OR (type = 'table' AND name = ?)",
+        (f"{fts}_insert", keys),
+    ).scalar()
+    if installed == 2:
+        return
+
+    # Left over from a dropped table (its triggers went with it), or an older
+    # index keyed on the table's rowid
+    for trigger in ("insert", "delete", "update"):
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {fts}_{trigger}")
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {fts}")
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {keys}")
+    connection.exec_driver_sql(
+        f"CREATE TABLE {keys} (id INTEGER PRIMARY KEY, key UNIQUE NOT NULL)"
+    )
+    connection.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({column_list}, tokenize='trigram')"
+    )
+
+    row = f"(SELECT id FROM {keys} WHERE key = new.{key})"
+    old_row = f"(SELECT id FROM {keys} WHERE key = old.{key})"
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table_.name} BEGIN "
+        f"INSERT INTO {keys} (key) VALUES (new.{key}); "
+        f"INSERT INTO {fts} (rowid, {column_list}) VALUES ({row}, {new_values}); "
+        "END"
+    )
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table_.name} BEGIN "
+        f"DELETE FROM {fts} WHERE rowid = {old_row}; "
+        f"DELETE FROM {keys} WHERE key = old.{key}; "
+        "END"
+    )
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER {fts}_update AFTER UPDATE ON {table_.name} BEGIN "
+        f"UPDATE {keys} SET key = new.{key} WHERE key = old.{key}; "
+        f"DELETE FROM {fts} WHERE rowid = {row}; "
+        f"INSERT INTO {fts} (rowid, {column_list}) VALUES ({row}, {new_values}); "
+        "END"
+    )
+    # Index the rows already in the table
+    connection.exec_driver_sql(
+        f"INSERT INTO {keys} (key) SELECT {key} FROM {table_.name}"
+    )
+    connection.exec_driver_sql(
+        f"INSERT INTO {fts} (rowid, {column_list}) "
+        f"SELECT {keys}.id, {', '.join(f'{table_.name}.{name}' for name in columns)} "
+        f"FROM {table_.name} JOIN {keys} ON {keys}.key = {table_.name}.{key}"
+    )
+
+
+def install_search_indexes(connection: Connection, tables=None):
+    """Creates the search indexes of `tables` (default: all searchable
+    tables) that don't exist yet
+    """
+
+    installers = {"postgresql": _install_postgresql, "sqlite": _install_sqlite}
+    install = installers.get(connection.dialect.name)
+    if install is None:
+        return
+
+    if tables is None:
+        tables = searchable_tables()
+
+    for table_, columns in tables:
+        install(connection, table_, columns)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _after_create(metadata, connection, tables=(), **kwargs):
+    names = {table_.name for table_ in tables}
+    install_search_indexes(
+        connection,
+        [entry for entry in searchable_tables(metadata) if entry[0].name in names],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search index maintenance")
+    parser.add_argument(
+        "--install", action="store_true", help="Create missing search indexes"
+    )
+    args = parser.parse_args()
+
+    # Import the models so their tables are registered
+    import api.v1.models  # noqa: F401
+
+    tables = searchable_tables()
+    for table_, columns in tables:
+        print(f"{table_.name}: {', '.join(columns)}")
+
+    if args.install:
+        with engine.begin() as connection:
+            install_search_indexes(connection, tables)
+        app_logger.info(f"Search indexes installed for {len(tables)} tables")
+
+
+if __name__ == "__main__":
+    main()
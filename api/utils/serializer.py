@@ -0,0 +1,144 @@
+"""
+Model Serializer
+File: api/utils/serializer.py
+
+Serializers generated once per mapped class from its column metadata.
+Each one reads an explicit list of column fields and converts the values
+JSON needs converted (datetimes, decimals, UUIDs, enums), with one
+straight-line function per model instead of a loop over `__dict__`.
+Relationships are never touched, so serializing doesn't lazy-load.
+
+Rows selected with `serializer.select()` can be serialized without
+building ORM objects at all.
+
+Example use:
+    ``` python
+    serializer = get_serializer(Product, fields=["id", "name", "price"])
+
+    data = serializer.many(products)
+    data = serializer.many_rows(db.execute(serializer.select()))
+    ```
+"""
+
+import threading
+from decimal import Decimal
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import inspect, select, types
+
+
+def encode_decimal(value: Decimal):
+    # Same rule as FastAPI's decimal encoder: whole numbers become ints
+    if value.as_tuple().exponent >= 0:
+        return int(value)
+    return float(value)
+
+
+def _converter(column) -> Optional[str]:
+    """Returns the expression template converting a value of `column`'s
+    type for JSON, `None` if it serializes as is
+    """
+
+    column_type = column.type
+    if isinstance(column_type, (types.DateTime, types.Date, types.Time)):
+        return "{0}.isoformat()"
+    if isinstance(column_type, types.Interval):
+        return "{0}.total_seconds()"
+    if isinstance(column_type, types.Numeric) and getattr(
+        column_type, "asdecimal", False
+    ):
+        return "encode_decimal({0})"
+    if isinstance(column_type, types.Enum) and column_type.enum_class is not None:
+        return "{0}.value"
+    if isinstance(column_type, types.Uuid) and column_type.as_uuid:
+        return "str({0})"
+    return None
+
+
+class ModelSerializer:
+    """Serializer for `model` restricted to `fields` (default: all columns)"""
+
+    def __init__(self, model, fields: Optional[Sequence[str]] = None):
+        mapper = inspect(model)
+        columns = {attr.key: attr for attr in mapper.column_attrs}
+
+        fields = tuple(fields) if fields else tuple(columns)
+        unknown = [field for field in fields if field not in columns]
+        if unknown:
+            raise ValueError(f"{model.__name__} has no column {', '.join(unknown)}")
+
+        self.model = model
+        self.fields = fields
+        self._attributes = [getattr(model, field) for field in fields]
+        self._table_columns = [columns[field].columns[0] for field in fields]
+
+        self.serialize: Callable[[Any], Dict[str, Any]] = self._compile(
+            "serialize", "_get(obj)"
+        )
+        self.serialize_row: Callable[[Tuple], Dict[str, Any]] = self._compile(
+            "serialize_row", "obj"
+        )
+
+    def _compile(self, name: str, source: str) -> Callable:
+        """Generates `name(obj)`, which unpacks `source` into one variable
+        per field and returns the dict of converted values
+        """
+
+        values = [f"v{index}" for index in range(len(self.fields))]
+        items = []
+        for field, value, column in zip(self.fields, values, self._table_columns):
+            converter = _converter(column)
+            if converter is not None:
+                value = f"{converter.format(value)} if {value} is not None else None"
+            items.append(f"{field!r}: {value}")
+
+        # A trailing comma makes single-field unpacking work too
+        code = (
+            f"def {name}(obj):\n"
+            f"    {', '.join(values)}, = {source}\n"
+            f"    return {{{', '.join(items)}}}\n"
+        )
+        getter = attrgetter(*self.fields)
+        if len(self.fields) == 1:
+            single = getter
+            getter = lambda obj: (single(obj),)  # noqa: E731
+
+        namespace = {"_get": getter, "encode_decimal": encode_decimal}
+        exec(compile(code, f"<serializer {self.model.__name__}>", "exec"), namespace)
+        return namespace[name]
+
+    def __call__(self, obj) -> Dict[str, Any]:
+        return self.serialize(obj)
+
+    def many(self, objs: Iterable[Any]) -> List[Dict[str, Any]]:
+        serialize = self.serialize
+        return [serialize(obj) for obj in objs]
+
+    def many_rows(self, rows: Iterable[Tuple]) -> List[Dict[str, Any]]:
+        """Serializes rows of `select()`, with no ORM objects involved"""
+
+        serialize_row = self.serialize_row
+        return [serialize_row(row) for row in rows]
+
+    def select(self):
+        """`SELECT` of exactly the serialized columns, for `many_rows`"""
+
+        return select(*self._attributes)
+
+
+_serializers: Dict[Tuple[type, Optional[Tuple[str, ...]]], ModelSerializer] = {}
+_lock = threading.Lock()
+
+
+def get_serializer(model, fields: Optional[Sequence[str]] = None) -> ModelSerializer:
+    """Returns the serializer for `model` and `fields`, built on first use"""
+
+    key = (model, tuple(fields) if fields else None)
+    serializer = _serializers.get(key)
+    if serializer is None:
+        with _lock:
+            serializer = _serializers.get(key)
+            if serializer is None:
+                serializer = _serializers[key] = ModelSerializer(model, fields)
+    return serializer
@@ -35,6 +35,53 @@ class Settings(BaseSettings):
     DB_TYPE: str = config("DB_TYPE")
     DB_URL: str = config("DB_URL")
 
+    # Connection pool, per worker process. The database sees up to
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections
+    DB_POOL_SIZE: int = config("DB_POOL_SIZE", default=5, cast=int)
+    DB_MAX_OVERFLOW: int = config("DB_MAX_OVERFLOW", default=10, cast=int)
+    DB_POOL_TIMEOUT: int = config("DB_POOL_TIMEOUT", default=30, cast=int)
+    DB_POOL_RECYCLE: int = config("DB_POOL_RECYCLE", default=1800, cast=int)
+    DB_POOL_PRE_PING: bool = config("DB_POOL_PRE_PING", default=True, cast=bool)
+    DB_POOL_USE_LIFO: bool = config("DB_POOL_USE_LIFO", default=True, cast=bool)
+    # Comma separated read replica URLs, reads are routed to them when set
+    DB_REPLICA_URLS: str = config("DB_REPLICA_URLS", default="")
+    DB_REPLICA_CHECK_INTERVAL: int = config(
+        "DB_REPLICA_CHECK_INTERVAL", default=5, cast=int
+    )
+    DB_REPLICA_RETRY_INTERVAL: int = config(
+        "DB_REPLICA_RETRY_INTERVAL", default=30, cast=int
+    )
+
+    # SQLite connection pragmas, see api/db/sqlite.py
+    SQLITE_SYNCHRONOUS: str = config("SQLITE_SYNCHRONOUS", default="NORMAL")
+    SQLITE_MMAP_SIZE: int = config("SQLITE_MMAP_SIZE", default=268435456, cast=int)
+    # Negative: KiB, positive: pages
+    SQLITE_CACHE_SIZE: int = config("SQLITE_CACHE_SIZE", default=-65536, cast=int)
+    SQLITE_BUSY_TIMEOUT: int = config("SQLITE_BUSY_TIMEOUT", default=5000, cast=int)
+
+    # SQL instrumentation, see api/db/query_stats.py
+    SQL_SLOW_QUERY_MS: int = config("SQL_SLOW_QUERY_MS", default=200, cast=int)
+    SQL_N_PLUS_ONE_THRESHOLD: int = config(
+        "SQL_N_PLUS_ONE_THRESHOLD", default=5, cast=int
+    )
+    SQL_STATS_HEADERS: bool = config("SQL_STATS_HEADERS", default=True, cast=bool)
+
+    # Pooled connections to open and validate at startup, 0 to skip
+    DB_WARMUP_CONNECTIONS: int = config("DB_WARMUP_CONNECTIONS", default=2, cast=int)
+
+    # Cache of listing totals, see api/utils/count_cache.py. 0 disables it
+    COUNT_CACHE_TTL: int = config("COUNT_CACHE_TTL", default=30, cast=int)
+    COUNT_CACHE_MAX_ENTRIES: int = config(
+        "COUNT_CACHE_MAX_ENTRIES", default=1000, cast=int
+    )
+
+    # Cache of rows looked up by primary key, for models that opt in with
+    # __identity_cache__ = True. 0 disables it
+    IDENTITY_CACHE_TTL: int = config("IDENTITY_CACHE_TTL", default=60, cast=int)
+    IDENTITY_CACHE_MAX_ENTRIES: int = config(
+        "IDENTITY_CACHE_MAX_ENTRIES", default=10000, cast=int
+    )
+
     FLUTTERWAVE_SECRET: str = config("FLUTTERWAVE_SECRET")
     FLW_SECRET_HASH: str = config("FLW_SECRET_HASH")
     STRIPE_SECRET: str = config("STRIPE_SECRET")
@@ -66,6 +113,65 @@ class Settings(BaseSettings):
     TWILIO_AUTH_TOKEN: str = config("TWILIO_AUTH_TOKEN", default="")
     TWILIO_PHONE_NUMBER: str = config("TWILIO_PHONE_NUMBER", default="")
 
+    # Server launcher (api/utils/launcher.py)
+    SERVER_HOST: str = config("SERVER_HOST", default="127.0.0.1")
+    SERVER_PORT: int = config("SERVER_PORT", default=7001, cast=int)
+    # 0 means one worker per available CPU
+    SERVER_WORKERS: int = config("SERVER_WORKERS", default=0, cast=int)
+    SERVER_MAX_WORKERS: int = config("SERVER_MAX_WORKERS", default=0, cast=int)
+    SERVER_RELOAD: bool = config("SERVER_RELOAD", default=False, cast=bool)
+    SERVER_MAX_REQUESTS: int = config("SERVER_MAX_REQUESTS", default=0, cast=int)
+    SERVER_MAX_REQUESTS_JITTER: int = config(
+        "SERVER_MAX_REQUESTS_JITTER", default=0, cast=int
+    )
+    SERVER_KEEPALIVE: int = config("SERVER_KEEPALIVE", default=5, cast=int)
+    SERVER_BACKLOG: int = config("SERVER_BACKLOG", default=2048, cast=int)
+    SERVER_GRACEFUL_TIMEOUT: int = config(
+        "SERVER_GRACEFUL_TIMEOUT", default=30, cast=int
+    )
+    SERVER_FORWARDED_ALLOW_IPS: str = config(
+        "SERVER_FORWARDED_ALLOW_IPS", default="127.0.0.1"
+    )
+
+    # Request metrics
+    REQUEST_STATS_MAX_ROUTES: int = config(
+        "REQUEST_STATS_MAX_ROUTES", default=256, cast=int
+    )
+    REQUEST_STATS_TOP_IPS: int = config("REQUEST_STATS_TOP_IPS", default=32, cast=int)
+    # File shared by all workers to merge their stats, empty to disable
+    REQUEST_STATS_SHARED_FILE: str = config(
+        "REQUEST_STATS_SHARED_FILE",
+        default=os.path.join(BASE_DIR, "tmp", "request_stats.bin"),
+    )
+    REQUEST_STATS_MAX_WORKERS: int = config(
+        "REQUEST_STATS_MAX_WORKERS", default=32, cast=int
+    )
+
+    # Logging pipeline
+    LOG_JSON: bool = config("LOG_JSON", default=False, cast=bool)
+    LOG_QUEUE_SIZE: int = config("LOG_QUEUE_SIZE", default=10000, cast=int)
+    LOG_BATCH_SIZE: int = config("LOG_BATCH_SIZE", default=256, cast=int)
+
+    # Error aggregation
+    ERROR_MAX_FINGERPRINTS: int = config(
+        "ERROR_MAX_FINGERPRINTS", default=500, cast=int
+    )
+    # Seconds between repeated-error summaries, 0 disables them
+    ERROR_SUMMARY_INTERVAL: int = config(
+        "ERROR_SUMMARY_INTERVAL", default=60, cast=int
+    )
+
+    # Request profiling, enabled per request with the X-Profile-Token header
+    # or for a random fraction of requests
+    PROFILING_TOKEN: str = config("PROFILING_TOKEN", default="")
+    PROFILING_SAMPLE_RATE: float = config(
+        "PROFILING_SAMPLE_RATE", default=0.0, cast=float
+    )
+    PROFILING_INTERVAL_MS: int = config("PROFILING_INTERVAL_MS", default=5, cast=int)
+    PROFILING_MAX_PROFILES: int = config(
+        "PROFILING_MAX_PROFILES", default=50, cast=int
+    )
+
     TEMP_DIR: str = os.path.join(
         Path(__file__).resolve().parent.parent.parent, "tmp", "media"
     )
@@ -0,0 +1,250 @@
+"""
+Shared Request Stats
+File: api/utils/shared_stats.py
+
+Cross-worker request statistics backed by a memory-mapped file. Every
+uvicorn worker claims its own region of the file and is the only writer
+to it, so updates are plain 8-byte stores with no locking. Any worker can
+read all regions and merge them, which is what `/request-stats` returns.
+
+Region layout (all integers little-endian u64):
+
+    header   | pid | reserved
+    routes   | (route_slots) x [name: 128 bytes | count]
+    ips      | (route_slots x top_ips) x [ip: 48 bytes | count]
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+
+MAGIC = b"REQSTAT1"
+FILE_HEADER = struct.Struct("<8sQQQ")
+REGION_HEADER = struct.Struct("<QQ")
+COUNT = struct.Struct("<Q")
+
+ROUTE_NAME_SIZE = 128
+IP_SIZE = 48
+ROUTE_ENTRY_SIZE = ROUTE_NAME_SIZE + COUNT.size
+IP_ENTRY_SIZE = IP_SIZE + COUNT.size
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedRequestStats:
+    """One worker's view of the shared request stats file"""
+
+    def __init__(self, path: str, max_workers: int, route_slots: int, top_ips: int):
+        self.path = path
+        self.max_workers = max_workers
+        self.route_slots = route_slots
+        self.top_ips = top_ips
+
+        self.ips_offset = REGION_HEADER.size + route_slots * ROUTE_ENTRY_SIZE
+        self.region_size = self.ips_offset + route_slots * top_ips * IP_ENTRY_SIZE
+        self.file_size = FILE_HEADER.size + max_workers * self.region_size
+
+        # Per route slot: which entry of the shared IP table each IP owns
+        self._ip_entries: List[Dict[str, int]] = [{} for _ in range(route_slots)]
+        self._named_routes = set()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._mm = self._map_and_claim()
+
+    def _region_offset(self, region: int) -> int:
+        return FILE_HEADER.size + region * self.region_size
+
+    def _map_and_claim(self) -> mmap.mmap:
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            header = FILE_HEADER.pack(
+                MAGIC, self.max_workers, self.route_slots, self.top_ips
+            )
+            current = os.pread(self._fd, FILE_HEADER.size, 0)
+
+            if current != header or os.fstat(self._fd).st_size != self.file_size:
+                # Missing file or a layout from different settings
+                self._reset(header)
+
+            mm = mmap.mmap(self._fd, self.file_size)
+
+            pids = [
+                REGION_HEADER.unpack_from(mm, self._region_offset(region))[0]
+                for region in range(self.max_workers)
+            ]
+            if not any(_pid_alive(pid) for pid in pids):
+                # Nobody from a previous run is left, start from zero like the
+                # in-process counters would
+                mm.close()
+                self._reset(header)
+                mm = mmap.mmap(self._fd, self.file_size)
+                pids = [0] * self.max_workers
+
+            # Prefer a never-used region so recycled workers' counts are kept,
+            # otherwise take over the region of a dead worker
+            free = [region for region, pid in enumerate(pids) if pid == 0]
+            dead = [
+                region
+                for region, pid in enumerate(pids)
+                if pid and not _pid_alive(pid)
+            ]
+            if not free and not dead:
+                mm.close()
+                raise RuntimeError(
+                    f"All {self.max_workers} request stats regions are in use"
+                )
+
+            self.region = free[0] if free else dead[0]
+            self.base = self._region_offset(self.region)
+            mm[self.base : self.base + self.region_size] = bytes(self.region_size)
+            REGION_HEADER.pack_into(mm, self.base, os.getpid(), 0)
+            return mm
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _reset(self, header: bytes):
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, self.file_size)
+        os.pwrite(self._fd, header, 0)
+
+    def record(
+        self,
+        slot: int,
+        route: str,
+        route_count: int,
+        ip_address: str,
+        ip_count: int,
+        evicted: Optional[str],
+    ):
+        """Mirrors one update of the in-process counters into this
+        worker's region
+        """
+
+        mm = self._mm
+        route_offset = self.base + REGION_HEADER.size + slot * ROUTE_ENTRY_SIZE
+        if slot not in self._named_routes:
+            self._named_routes.add(slot)
+            mm[route_offset : route_offset + ROUTE_NAME_SIZE] = _encode(
+                route, ROUTE_NAME_SIZE
+            )
+        COUNT.pack_into(mm, route_offset + ROUTE_NAME_SIZE, route_count)
+
+        entries = self._ip_entries[slot]
+        entry = entries.get(ip_address)
+        ip_offset = self.base + self.ips_offset + slot * self.top_ips * IP_ENTRY_SIZE
+
+        if entry is None:
+            # The new IP either takes a free entry or the one it evicted
+            entry = entries.pop(evicted) if evicted is not None else len(entries)
+            entries[ip_address] = entry
+            offset = ip_offset + entry * IP_ENTRY_SIZE
+            mm[offset : offset + IP_SIZE] = _encode(ip_address, IP_SIZE)
+
+        COUNT.pack_into(mm, ip_offset + entry * IP_ENTRY_SIZE + IP_SIZE, ip_count)
+
+    def clear(self):
+        """Zeroes this worker's region, for `RequestMetrics.reset`"""
+
+        start = self.base + REGION_HEADER.size
+        self._mm[start : self.base + self.region_size] = bytes(
+            self.region_size - REGION_HEADER.size
+        )
+        self._ip_entries = [{} for _ in range(self.route_slots)]
+        self._named_routes = set()
+
+    def merge(self):
+        """Sums the counters of every worker region.
+
+        Returns `(totals, ip_counts)` where `totals` is `{route: count}` and
+        `ip_counts` is `{route: {ip: count}}` trimmed to the top IPs.
+        """
+
+        mm = self._mm
+        totals: Dict[str, int] = defaultdict(int)
+        ip_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+        for region in range(self.max_workers):
+            base = self._region_offset(region)
+            if not REGION_HEADER.unpack_from(mm, base)[0]:
+                continue
+
+            for slot in range(self.route_slots):
+                route_offset = base + REGION_HEADER.size + slot * ROUTE_ENTRY_SIZE
+                route_count = COUNT.unpack_from(mm, route_offset + ROUTE_NAME_SIZE)[0]
+                if not route_count:
+                    continue
+
+                route = _decode(mm[route_offset : route_offset + ROUTE_NAME_SIZE])
+                totals[route] += route_count
+
+                ip_offset = base + self.ips_offset + slot * self.top_ips * IP_ENTRY_SIZE
+                for entry in range(self.top_ips):
+                    offset = ip_offset + entry * IP_ENTRY_SIZE
+                    ip_count = COUNT.unpack_from(mm, offset + IP_SIZE)[0]
+                    if ip_count:
+                        ip_address = _decode(mm[offset : offset + IP_SIZE])
+                        ip_counts[route][ip_address] += ip_count
+
+        return dict(totals), {
+            route: dict(
+                sorted(ips.items(), key=lambda item: item[1], reverse=True)[
+                    : self.top_ips
+                ]
+            )
+            for route, ips in ip_counts.items()
+        }
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+
+def _encode(value: str, size: int) -> bytes:
+    return value.encode("utf-8")[:size].ljust(size, b"\0")
+
+
+def _decode(value: bytes) -> str:
+    return value.rstrip(b"\0").decode("utf-8", errors="replace")
+
+
+def attach_shared_stats(metrics) -> Optional[SharedRequestStats]:
+    """Attaches this worker to the shared stats file configured in settings.
+
+    Falls back to per-process stats (and logs why) if the file can't be
+    used, since request counting must never stop the app from starting.
+    """
+
+    from api.loggers.app_logger import app_logger
+    from api.utils.settings import settings
+
+    if not settings.REQUEST_STATS_SHARED_FILE:
+        return None
+
+    try:
+        shared = SharedRequestStats(
+            path=settings.REQUEST_STATS_SHARED_FILE,
+            max_workers=settings.REQUEST_STATS_MAX_WORKERS,
+            route_slots=metrics.max_routes + 1,
+            top_ips=metrics.top_ips,
+        )
+    except (OSError, RuntimeError) as exc:
+        app_logger.warning(f"Shared request stats disabled: {exc}")
+        return None
+
+    metrics.attach_shared(shared)
+    return shared
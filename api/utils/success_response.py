@@ -1,6 +1,6 @@
 from typing import Optional
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
+
+from api.utils.json_response import FastJSONResponse
 
 
 def success_response(status_code: int, message: str, data: Optional[dict] = None):
@@ -11,6 +11,4 @@ def success_response(status_code: int, message: str, data: Optional[dict] = None
     if data is not None:
         response_data["data"] = data
 
-    return JSONResponse(
-        status_code=status_code, content=jsonable_encoder(response_data)
-    )
+    return FastJSONResponse(status_code=status_code, content=response_data)
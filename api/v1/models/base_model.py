@@ -1,9 +1,14 @@
 """This is the Base Model Class"""
 
+from typing import Any, Iterator, List, Optional, Sequence
+
 from uuid_extensions import uuid7
-from fastapi import Depends
 from api.db.database import Base
-from sqlalchemy import Column, String, DateTime, func
+from api.db.types import HexUUID
+from api.utils.db_validators import get_model_or_none
+from api.utils.serializer import get_serializer
+from sqlalchemy import Column, DateTime, func, select
+from sqlalchemy.orm import Session
 
 
 class BaseTableModel(Base):
@@ -11,38 +16,82 @@ class BaseTableModel(Base):
 
     __abstract__ = True
 
-    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid7().hex))
+    # 16-byte UUID (see api/db/types.py), read and written as a hex string.
+    # The primary key is indexed already, so no `index=True`
+    id = Column(HexUUID, primary_key=True, default=lambda: uuid7().hex)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
 
     def to_dict(self):
-        """returns a dictionary representation of the instance"""
-        obj_dict = self.__dict__.copy()
-        del obj_dict["_sa_instance_state"]
-        obj_dict["id"] = self.id
-        if self.created_at:
-            obj_dict["created_at"] = self.created_at.isoformat()
-        if self.updated_at:
-            obj_dict["updated_at"] = self.updated_at.isoformat()
-        return obj_dict
+        """returns a dictionary representation of the instance's columns,
+        ready for JSON (see `api/utils/serializer.py`)
+        """
+        return get_serializer(type(self)).serialize(self)
+
+    @classmethod
+    def _select(cls, columns: Optional[Sequence[str]], filters: dict):
+        if columns:
+            query = select(*(getattr(cls, column) for column in columns))
+        else:
+            query = select(cls)
+        return query.filter_by(**filters)
 
     @classmethod
-    def get_all(cls):
-        from api.db.database import get_db
+    def get_all(
+        cls,
+        db: Session,
+        batch_size: int = 1000,
+        columns: Optional[Sequence[str]] = None,
+        **filters,
+    ) -> Iterator[Any]:
+        """Streams all instances of the class matching `filters` (column=value),
+        fetching `batch_size` rows at a time, so memory use doesn't grow with
+        the table. With `columns` it yields plain rows of those columns,
+        skipping the ORM objects altogether (faster for exports).
+
+        Example use:
+            ``` python
+            for user in User.get_all(db):
+                ...
 
-        db = Depends(get_db)
-        """ returns all instance of the class in the db
+            for row in User.get_all(db, columns=["id", "email"], is_active=True):
+                writer.writerow(row)
+            ```
         """
-        return db.query(cls).all()
 
-    @classmethod
-    def get_by_id(cls, id):
-        from api.db.database import get_db
+        for batch in cls.get_batches(db, batch_size, columns, **filters):
+            yield from batch
 
-        db = Depends(get_db)
-        """ returns a single object from the db
+    @classmethod
+    def get_batches(
+        cls,
+        db: Session,
+        batch_size: int = 1000,
+        columns: Optional[Sequence[str]] = None,
+        **filters,
+    ) -> Iterator[List[Any]]:
+        """Like `get_all`, but yields lists of up to `batch_size` rows, for
+        background jobs that process (and commit) a batch at a time
         """
-        obj = db.query(cls).filter_by(id=id).first()
-        return obj
+
+        # yield_per streams the result (server side cursor where the driver
+        # supports it) and hydrates one batch at a time
+        query = cls._select(columns, filters).execution_options(yield_per=batch_size)
+        result = db.execute(query)
+        if not columns:
+            result = result.scalars()
+
+        try:
+            for batch in result.partitions():
+                yield batch
+        finally:
+            result.close()
+
+    @classmethod
+    def get_by_id(cls, db: Session, id):
+        """returns a single object from the db, `None` if there is none
+        (malformed ids included)"""
+
+        return get_model_or_none(db, cls, id)
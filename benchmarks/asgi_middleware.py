@@ -0,0 +1,181 @@
+"""
+ASGI Middleware Benchmark
+File: benchmarks/asgi_middleware.py
+
+Compares the old `BaseHTTPMiddleware` request counting/logging stack with
+the pure ASGI middleware in `api/core/middleware.py`. Requests are driven
+in-process straight through the ASGI interface, so no server or socket
+overhead is measured.
+
+Usage:
+    python -m benchmarks.asgi_middleware --requests 5000
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.sessions import SessionMiddleware
+
+from api.core.middleware import (
+    RequestCountMiddleware,
+    RequestLoggingMiddleware,
+    get_client_ip,
+)
+from api.loggers.app_logger import app_logger
+from api.utils.request_metrics import (
+    request_metrics,
+    latency_histograms,
+    get_route_template,
+)
+from api.utils.settings import settings
+from main import get_root, get_request_stats, origins
+
+STREAM_CHUNKS = 16
+
+
+async def stream_chunks():
+    for _ in range(STREAM_CHUNKS):
+        yield b"x" * 1024
+
+
+async def get_stream():
+    return StreamingResponse(stream_chunks(), media_type="application/octet-stream")
+
+
+class LegacyRequestCountMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        try:
+            response = await call_next(request)
+        finally:
+            request_metrics.record(
+                get_route_template(request.scope), get_client_ip(request.scope)
+            )
+        return response
+
+
+async def legacy_log_requests(request: Request, call_next):
+    start_time = time.perf_counter()
+    response = await call_next(request)
+    process_time = time.perf_counter() - start_time
+
+    app_logger.info(
+        f'{request.client.host} - "{request.method} {request.url.path} HTTP/1.1" '
+        f"{response.status_code} - {process_time:.3f}s"
+    )
+    latency_histograms.observe(
+        request_metrics.route_label(get_route_template(request.scope)),
+        request.method,
+        response.status_code,
+        process_time,
+    )
+    return response
+
+
+def build_app(legacy: bool) -> FastAPI:
+    app = FastAPI()
+
+    app.add_middleware(
+        LegacyRequestCountMiddleware if legacy else RequestCountMiddleware
+    )
+    app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    if legacy:
+        app.middleware("http")(legacy_log_requests)
+    else:
+        app.add_middleware(RequestLoggingMiddleware)
+
+    app.get("/")(get_root)
+    app.get("/request-stats")(get_request_stats)
+    app.get("/stream")(get_stream)
+    return app
+
+
+async def call(app, path: str):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        # The request body is sent once; afterwards the client "disconnects"
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def run(app, path: str, requests: int):
+    # Warm up routing and the middleware stack
+    for _ in range(100):
+        await call(app, path)
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        start = time.perf_counter()
+        await call(app, path)
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument(
+        "--with-logging",
+        action="store_true",
+        help="Keep app_logger output on (off by default to measure the middleware)",
+    )
+    args = parser.parse_args()
+
+    if not args.with_logging:
+        app_logger.setLevel(logging.WARNING)
+
+    apps = {"before": build_app(legacy=True), "after": build_app(legacy=False)}
+
+    print(f"{'path':<16}{'stack':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for path in ("/", "/request-stats", "/stream"):
+        for label, app in apps.items():
+            result = asyncio.run(run(app, path, args.requests))
+            print(
+                f"{path:<16}{label:<8}{result['rps']:>10.0f}"
+                f"{result['p50']:>10.3f}{result['p99']:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
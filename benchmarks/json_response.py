@@ -0,0 +1,97 @@
+"""
+JSON Response Benchmark
+File: benchmarks/json_response.py
+
+Compares the old `jsonable_encoder` + `JSONResponse` path used by
+`success_response` with the single-pass `FastJSONResponse`, over payloads
+of plain dicts and of ORM rows.
+
+Usage:
+    python -m benchmarks.json_response --repeat 50
+"""
+
+import argparse
+import datetime
+import timeit
+import uuid
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import Column, Numeric, String
+
+from api.utils.json_response import FastJSONResponse, orjson
+from api.v1.models.base_model import BaseTableModel
+
+
+class BenchmarkItem(BaseTableModel):
+    __tablename__ = "benchmark_json_items"
+
+    name = Column(String)
+    price = Column(Numeric(10, 2))
+
+
+def build_dicts(size: int):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "name": f"item {index}",
+            "price": Decimal("19.99"),
+            "quantity": index,
+            "active": index % 2 == 0,
+            "created_at": now,
+            "tags": ["a", "b", "c"],
+        }
+        for index in range(size)
+    ]
+
+
+def build_rows(size: int):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        BenchmarkItem(
+            id=uuid.uuid4().hex,
+            name=f"item {index}",
+            price=Decimal("19.99"),
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(size)
+    ]
+
+
+def old_path(items):
+    content = {"status_code": 200, "success": True, "message": "ok", "data": items}
+    return JSONResponse(status_code=200, content=jsonable_encoder(content)).body
+
+
+def new_path(items):
+    content = {"status_code": 200, "success": True, "message": "ok", "data": items}
+    return FastJSONResponse(status_code=200, content=content).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"serializer: {'orjson' if orjson is not None else 'json (stdlib)'}")
+    print(f"{'payload':<14}{'items':>6}{'old ms':>10}{'new ms':>10}{'speedup':>9}")
+    for label, build in (("dicts", build_dicts), ("orm rows", build_rows)):
+        for size in (100, 1000):
+            items = build(size)
+            old = min(
+                timeit.repeat(lambda: old_path(items), number=1, repeat=args.repeat)
+            )
+            new = min(
+                timeit.repeat(lambda: new_path(items), number=1, repeat=args.repeat)
+            )
+            print(
+                f"{label:<14}{size:>6}{old * 1000:>10.3f}{new * 1000:>10.3f}"
+                f"{old / new:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Model Serializer Benchmark
+File: benchmarks/serializer.py
+
+Compares the old `BaseTableModel.to_dict` (copy of `__dict__` plus
+`isoformat()`) + `jsonable_encoder` path with the compiled per-model
+serializer, on loaded ORM objects and on plain `Row` tuples.
+
+Usage:
+    python -m benchmarks.serializer --repeat 20
+"""
+
+import argparse
+import datetime
+import timeit
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Column, Integer, Numeric, String, create_engine, insert
+from sqlalchemy.orm import Session
+
+from api.utils.json_response import dumps
+from api.utils.serializer import get_serializer
+from api.v1.models.base_model import BaseTableModel
+
+
+class BenchmarkOrder(BaseTableModel):
+    __tablename__ = "benchmark_serializer_orders"
+
+    reference = Column(String)
+    customer = Column(String)
+    quantity = Column(Integer)
+    total = Column(Numeric(10, 2))
+
+
+def legacy_to_dict(obj):
+    """`BaseTableModel.to_dict` before the compiled serializer"""
+
+    obj_dict = obj.__dict__.copy()
+    del obj_dict["_sa_instance_state"]
+    obj_dict["id"] = obj.id
+    if obj.created_at:
+        obj_dict["created_at"] = obj.created_at.isoformat()
+    if obj.updated_at:
+        obj_dict["updated_at"] = obj.updated_at.isoformat()
+    return obj_dict
+
+
+def load(size: int):
+    engine = create_engine("sqlite://")
+    BenchmarkOrder.__table__.create(engine)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(BenchmarkOrder.__table__),
+            [
+                {
+                    "id": f"{index:032x}",
+                    "reference": f"ORD-{index}",
+                    "customer": f"customer {index % 97}",
+                    "quantity": index % 10,
+                    "total": Decimal("19.99"),
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for index in range(size)
+            ],
+        )
+
+    session = Session(engine)
+    serializer = get_serializer(BenchmarkOrder)
+    objs = session.query(BenchmarkOrder).all()
+    rows = session.execute(serializer.select()).all()
+    return objs, rows, serializer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'items':>6}{'old ms':>10}{'objects ms':>12}{'rows ms':>10}{'speedup':>17}")
+    for size in (100, 1000, 10000):
+        objs, rows, serializer = load(size)
+
+        def old():
+            return dumps(jsonable_encoder([legacy_to_dict(obj) for obj in objs]))
+
+        def new():
+            return dumps(serializer.many(objs))
+
+        def new_rows():
+            return dumps(serializer.many_rows(rows))
+
+        timings = [
+            min(timeit.repeat(func, number=1, repeat=args.repeat)) * 1000
+            for func in (old, new, new_rows)
+        ]
+        print(
+            f"{size:>6}{timings[0]:>10.3f}{timings[1]:>12.3f}{timings[2]:>10.3f}"
+            f"{timings[0] / timings[1]:>8.1f}x /{timings[0] / timings[2]:>5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
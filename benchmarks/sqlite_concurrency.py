@@ -0,0 +1,176 @@
+"""
+SQLite Concurrency Benchmark
+File: benchmarks/sqlite_concurrency.py
+
+Runs reader and writer threads against one SQLite file for a few seconds
+and reports throughput, read latency, "database is locked" errors and
+lost updates for:
+
+    * default: the bare engine `get_db_engine` used to build (rollback
+      journal, sqlite3 module transactions)
+    * pragmas: the production pragmas, writers on their own sessions
+    * queue: the production pragmas, writes through `WriteQueue`
+
+Each write reads a row and then updates it, like a typical service call.
+Readers pause `--think-ms` between queries for the rest of their request.
+
+Usage:
+    python -m benchmarks.sqlite_concurrency --readers 16 --writers 8 --seconds 5
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.orm import Session
+
+from api.db.sqlite import WriteQueue, configure_sqlite_engine, sqlite_pragmas
+
+ROWS = 10_000
+
+
+def build_engine(path: str, mode: str):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=32,
+    )
+    if mode != "default":
+        configure_sqlite_engine(engine, sqlite_pragmas())
+    return engine
+
+
+def fill(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE accounts (id INTEGER PRIMARY KEY, name TEXT, balance INTEGER)"
+        )
+        connection.execute(
+            text("INSERT INTO accounts VALUES (:id, :name, 0)"),
+            [{"id": index, "name": f"account {index}"} for index in range(ROWS)],
+        )
+
+
+def deposit(db: Session, account_id: int):
+    balance = db.execute(
+        text("SELECT balance FROM accounts WHERE id = :id"), {"id": account_id}
+    ).scalar()
+    db.execute(
+        text("UPDATE accounts SET balance = :balance WHERE id = :id"),
+        {"balance": balance + 1, "id": account_id},
+    )
+
+
+class Counters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.errors = 0
+        self.read_latencies = []
+
+
+def reader(engine, counters: Counters, stop: threading.Event, think: float):
+    generator = random.Random()
+    latencies = []
+    reads = 0
+    while not stop.is_set():
+        time.sleep(think)
+        start = time.perf_counter()
+        with Session(engine) as db:
+            low = generator.randrange(ROWS - 100)
+            db.execute(
+                text("SELECT sum(balance) FROM accounts WHERE id BETWEEN :a AND :b"),
+                {"a": low, "b": low + 100},
+            ).scalar()
+        latencies.append(time.perf_counter() - start)
+        reads += 1
+
+    with counters.lock:
+        counters.reads += reads
+        counters.read_latencies.extend(latencies)
+
+
+def writer(engine, queue, counters: Counters, stop: threading.Event):
+    generator = random.Random()
+    writes = errors = 0
+    while not stop.is_set():
+        account_id = generator.randrange(ROWS)
+        try:
+            if queue is not None:
+                queue.run(deposit, account_id)
+            else:
+                with Session(engine) as db, db.begin():
+                    deposit(db, account_id)
+            writes += 1
+        except exc.OperationalError:
+            errors += 1
+
+    with counters.lock:
+        counters.writes += writes
+        counters.errors += errors
+
+
+def run(mode: str, readers: int, writers: int, seconds: float, think: float):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "concurrency.db")
+    engine = build_engine(path, mode)
+    fill(engine)
+    queue = WriteQueue(engine) if mode == "queue" else None
+
+    counters = Counters()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=reader, args=(engine, counters, stop, think))
+        for _ in range(readers)
+    ] + [
+        threading.Thread(target=writer, args=(engine, queue, counters, stop))
+        for _ in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with engine.connect() as connection:
+        total = connection.exec_driver_sql("SELECT sum(balance) FROM accounts").scalar()
+    engine.dispose()
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+    # Deposits whose update was overwritten by a concurrent one
+    lost = counters.writes - total
+    latencies = sorted(counters.read_latencies) or [0.0]
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(
+        f"{mode:<9}{counters.reads / seconds:>10.0f}{counters.writes / seconds:>10.0f}"
+        f"{counters.errors:>8}{lost:>7}{p99:>10.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--think-ms", type=float, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s\n")
+    print(
+        f"{'mode':<9}{'reads/s':>10}{'writes/s':>10}{'errors':>8}{'lost':>7}"
+        f"{'read p99':>12}"
+    )
+    for mode in ("default", "pragmas", "queue"):
+        run(mode, args.readers, args.writers, args.seconds, args.think_ms / 1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+UUID Key Benchmark
+File: benchmarks/uuid_keys.py
+
+Compares the old text primary keys (32-character hex with an extra index
+on the primary key) with `HexUUID` keys (16-byte blobs on SQLite, native
+`uuid` on PostgreSQL): table and index sizes for a parent table and a child
+table with an indexed foreign key, primary-key lookup time and join time.
+
+Usage:
+    python -m benchmarks.uuid_keys --rows 200000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    bindparam,
+    create_engine,
+    func,
+    insert,
+    select,
+)
+from uuid_extensions import uuid7
+
+from api.db.types import HexUUID
+
+
+def build_tables(key_type, index_id: bool):
+    metadata = MetaData()
+    parents = Table(
+        "parents",
+        metadata,
+        Column("id", key_type, primary_key=True, index=index_id),
+        Column("name", String),
+    )
+    children = Table(
+        "children",
+        metadata,
+        Column("id", key_type, primary_key=True, index=index_id),
+        Column("parent_id", key_type, ForeignKey("parents.id"), index=True),
+        Column("quantity", Integer),
+    )
+    return metadata, parents, children
+
+
+def fill(engine, parents, children, parent_ids, child_rows):
+    batch = 50_000
+    with engine.begin() as connection:
+        for start in range(0, len(parent_ids), batch):
+            connection.execute(
+                insert(parents),
+                [
+                    {"id": id, "name": f"parent {id[:8]}"}
+                    for id in parent_ids[start : start + batch]
+                ],
+            )
+        for start in range(0, len(child_rows), batch):
+            connection.execute(insert(children), child_rows[start : start + batch])
+
+
+def sizes(engine):
+    """Bytes used per table and index, from SQLite's dbstat table"""
+
+    with engine.connect() as connection:
+        return dict(
+            connection.exec_driver_sql(
+                "SELECT name, sum(pgsize) FROM dbstat GROUP BY name"
+            ).all()
+        )
+
+
+def time_lookups(engine, parents, children, ids):
+    with engine.connect() as connection:
+        query = select(parents.c.name).where(parents.c.id == bindparam("id"))
+        start = time.perf_counter()
+        for id in ids:
+            connection.execute(query, {"id": id}).scalar()
+        lookups = time.perf_counter() - start
+
+        start = time.perf_counter()
+        connection.execute(
+            select(func.count())
+            .select_from(children)
+            .join(parents, parents.c.id == children.c.parent_id)
+        ).scalar()
+        join = time.perf_counter() - start
+    return lookups, join
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+
+    generator = random.Random(42)
+    parent_ids = [uuid7().hex for _ in range(args.rows)]
+    child_rows = [
+        {"id": uuid7().hex, "parent_id": generator.choice(parent_ids), "quantity": 1}
+        for _ in range(args.rows)
+    ]
+    lookup_ids = generator.sample(parent_ids, min(args.lookups, args.rows))
+
+    directory = tempfile.mkdtemp()
+    results = {}
+    for name, key_type, index_id in (
+        ("text", String, True),
+        ("uuid", HexUUID, False),
+    ):
+        path = os.path.join(directory, f"{name}.db")
+        engine = create_engine(f"sqlite:///{path}")
+        metadata, parents, children = build_tables(key_type, index_id)
+        metadata.create_all(engine)
+        fill(engine, parents, children, parent_ids, child_rows)
+        results[name] = sizes(engine), time_lookups(
+            engine, parents, children, lookup_ids
+        )
+        results[name][0]["database file"] = os.path.getsize(path)
+        engine.dispose()
+        os.remove(path)
+    os.rmdir(directory)
+
+    print(f"{args.rows} parents and {args.rows} children on SQLite\n")
+    print(f"{'object':<32}{'text':>12}{'uuid':>12}")
+    text_sizes, uuid_sizes = results["text"][0], results["uuid"][0]
+    objects = sorted(set(text_sizes) - {"sqlite_schema", "database file"})
+    for object_name in objects + ["database file"]:
+        text_size = text_sizes.get(object_name)
+        uuid_size = uuid_sizes.get(object_name)
+        print(
+            f"{object_name:<32}"
+            f"{f'{text_size / 1024 / 1024:.1f} MB' if text_size else '-':>12}"
+            f"{f'{uuid_size / 1024 / 1024:.1f} MB' if uuid_size else '-':>12}"
+        )
+
+    (text_lookups, text_join), (uuid_lookups, uuid_join) = (
+        results["text"][1],
+        results["uuid"][1],
+    )
+    count = len(lookup_ids)
+    print(
+        f"\n{'pk lookup':<32}{text_lookups / count * 1e6:>10.1f}us"
+        f"{uuid_lookups / count * 1e6:>10.1f}us"
+    )
+    print(f"{'join count':<32}{text_join * 1000:>10.1f}ms{uuid_join * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
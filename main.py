@@ -1,22 +1,41 @@
-import sys
+import asyncio
 import uvicorn, os, time
 from typing import Optional
 from sqlalchemy.exc import IntegrityError
-from fastapi import HTTPException, Query, Request
+from fastapi import Depends, HTTPException, Query, Request
 from fastapi.templating import Jinja2Templates
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse, StreamingResponse
-from contextlib import asynccontextmanager
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI, status
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.requests import Request
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-from collections import defaultdict
 
-from api.db.database import get_db
-from api.loggers.app_logger import app_logger
+from api.core.middleware import (
+    PROFILE_TOKEN_HEADER,
+    ProfilingMiddleware,
+    RequestCountMiddleware,
+    RequestLoggingMiddleware,
+    is_profiling_token,
+)
+from api.db.database import engine, get_pool_engines
+from api.db.pool_metrics import render_pool_metrics
+from api.db.warmup import dispose_engines, warm_up_engine
+from api.utils.identity_cache import render_identity_cache_metrics
+from api.loggers.app_logger import app_logger, get_log_stats
+from api.utils.request_metrics import (
+    request_metrics,
+    latency_histograms,
+    get_route_template,
+    render_metric,
+    render_prometheus,
+)
+from api.utils.error_aggregator import error_aggregator
+from api.utils.json_response import FastJSONResponse
+from api.utils.profiler import profile_store
+from api.utils.shared_stats import attach_shared_stats
 from api.utils.success_response import success_response
 from api.v1.routes import api_version_one
 from api.utils.settings import settings
@@ -24,12 +43,29 @@ from api.utils.settings import settings
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    db = next(get_db())
+    await warm_up_engine(engine, settings.DB_WARMUP_CONNECTIONS)
+    shared_stats = attach_shared_stats(request_metrics)
+    error_summaries = error_aggregator.start_summaries(settings.ERROR_SUMMARY_INTERVAL)
 
     yield
 
-
-app = FastAPI(lifespan=lifespan, title="FastAPI Boilerplate", version="1.0.0")
+    # Cancelling makes it log the last summary, wait for it
+    if error_summaries is not None:
+        error_summaries.cancel()
+        with suppress(asyncio.CancelledError):
+            await error_summaries
+    if shared_stats is not None:
+        request_metrics.attach_shared(None)
+        shared_stats.close()
+    await dispose_engines(engine)
+
+
+app = FastAPI(
+    lifespan=lifespan,
+    title="FastAPI Boilerplate",
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+)
 
 
 MEDIA_DIR = "./media"
@@ -50,20 +86,6 @@ origins = [
 ]
 
 
-# In-memory request counter by endpoint and IP address
-request_counter = defaultdict(lambda: defaultdict(int))
-
-
-# Middleware to track request counts and IP addresses
-class RequestCountMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        endpoint = request.url.path
-        ip_address = request.client.host
-        request_counter[endpoint][ip_address] += 1
-        response = await call_next(request)
-        return response
-
-
 app.add_middleware(RequestCountMiddleware)
 app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
 app.add_middleware(
@@ -74,33 +96,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profile requests on demand
+app.add_middleware(ProfilingMiddleware)
 
-# Middleware to log details after each request
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    # Capture request start time
-    start_time = time.time()
-
-    # Process the request
-    response = await call_next(request)
-
-    # Calculate processing time
-    process_time = time.time() - start_time
-    formatted_process_time = f"{process_time:.3f}s"
-
-    # Capture request and response details
-    client_ip = request.client.host
-    method = request.method
-    url = request.url.path
-    status_code = response.status_code
-
-    # Format the log string similar to your example
-    log_string = f'{client_ip} - "{method} {url} HTTP/1.1" {status_code} - {formatted_process_time}'
-
-    # Log the formatted string
-    app_logger.info(log_string)
-
-    return response
+# Log details after each request
+app.add_middleware(RequestLoggingMiddleware)
 
 
 app.include_router(api_version_one)
@@ -118,28 +118,104 @@ async def get_request_stats():
     return success_response(
         status_code=status.HTTP_200_OK,
         message="Endpoints request retreived successfully",
-        data={
-            "request_counts": {
-                endpoint: dict(ips) for endpoint, ips in request_counter.items()
-            }
-        },
+        data={"request_counts": request_metrics.request_counts()},
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Home"])
+async def get_metrics():
+    """Endpoint to get request counts and latency histograms in Prometheus format"""
+
+    log_stats = get_log_stats()
+    content = (
+        render_prometheus(request_metrics, latency_histograms)
+        + render_metric(
+            "app_log_queue_depth",
+            log_stats["queued"],
+            "Log records waiting to be written.",
+        )
+        + render_metric(
+            "app_log_records_dropped_total",
+            log_stats["dropped"],
+            "Log records dropped because the log queue was full.",
+            "counter",
+        )
+        + render_pool_metrics(get_pool_engines())
+        + render_identity_cache_metrics()
+    )
+
+    return PlainTextResponse(
+        content, media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def require_profiling_token(request: Request):
+    """Only lets through requests carrying the profiling token"""
+
+    if not is_profiling_token(request.headers.get(PROFILE_TOKEN_HEADER)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+
+@app.get(
+    "/error-stats",
+    tags=["Home"],
+    dependencies=[Depends(require_profiling_token)],
+)
+async def get_error_stats(limit: int = Query(20, ge=1, le=500)):
+    """Endpoint to get the most frequent error fingerprints"""
+
+    return success_response(
+        status_code=status.HTTP_200_OK,
+        message="Error stats retrieved successfully",
+        data={"errors": error_aggregator.top(limit)},
+    )
+
+
+@app.get(
+    "/profiles",
+    tags=["Home"],
+    dependencies=[Depends(require_profiling_token)],
+)
+async def get_profiles():
+    """Endpoint to list the stored request profiles"""
+
+    return success_response(
+        status_code=status.HTTP_200_OK,
+        message="Profiles retrieved successfully",
+        data={"profiles": profile_store.list()},
     )
 
 
+@app.get(
+    "/profiles/{profile_id}",
+    response_class=PlainTextResponse,
+    tags=["Home"],
+    dependencies=[Depends(require_profiling_token)],
+)
+async def get_profile(profile_id: str):
+    """Endpoint to get a request profile as collapsed stacks for flamegraphs"""
+
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile does not exist")
+
+    return PlainTextResponse(profile["collapsed"])
+
+
 # REGISTER EXCEPTION HANDLERS
 @app.exception_handler(HTTPException)
 async def http_exception(request: Request, exc: HTTPException):
     """HTTP exception handler"""
 
-    exc_type, exc_obj, exc_tb = sys.exc_info()
-    app_logger.info(
-        f"HTTPException: {request.url.path} | {exc.status_code} | {exc.detail}"
-    )
-    app_logger.info(
-        f"[ERROR] - An error occured | {exc}, {exc_type} {exc_obj} line {exc_tb.tb_lineno}"
+    error_aggregator.capture(
+        exc,
+        get_route_template(request.scope),
+        f"HTTPException: {request.url.path} | {exc.status_code} | {exc.detail}",
+        exc_type=f"HTTPException {exc.status_code}",
+        client_error=exc.status_code < 500,
     )
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=exc.status_code,
         content={
             "status": False,
@@ -158,13 +234,14 @@ async def validation_exception(request: Request, exc: RequestValidationError):
         for error in exc.errors()
     ]
 
-    exc_type, exc_obj, exc_tb = sys.exc_info()
-    app_logger.info(f"RequestValidationError: {request.url.path} | {errors}")
-    app_logger.info(
-        f"[ERROR] - An error occured | {exc}, {exc_type} {exc_obj} line {exc_tb.tb_lineno}"
+    error_aggregator.capture(
+        exc,
+        get_route_template(request.scope),
+        f"RequestValidationError: {request.url.path} | {errors}",
+        client_error=True,
     )
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=422,
         content={
             "status": False,
@@ -179,13 +256,13 @@ async def validation_exception(request: Request, exc: RequestValidationError):
 async def integrity_exception(request: Request, exc: IntegrityError):
     """Integrity error exception handlers"""
 
-    exc_type, exc_obj, exc_tb = sys.exc_info()
-    app_logger.info(f"Exception occured | {request.url.path} | 500")
-    app_logger.info(
-        f"[ERROR] - An error occured | {exc}, {exc_type} {exc_obj} {exc_tb.tb_lineno}"
+    error_aggregator.capture(
+        exc,
+        get_route_template(request.scope),
+        f"Exception occured | {request.url.path} | 500",
     )
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
         content={
             "status": False,
@@ -199,13 +276,13 @@ async def integrity_exception(request: Request, exc: IntegrityError):
 async def exception(request: Request, exc: Exception):
     """Other exception handlers"""
 
-    exc_type, exc_obj, exc_tb = sys.exc_info()
-    app_logger.info(f"Exception occured | {request.url.path} | 500")
-    app_logger.info(
-        f"[ERROR] - An error occured | {exc}, {exc_type} {exc_obj} {exc_tb.tb_lineno}"
+    error_aggregator.capture(
+        exc,
+        get_route_template(request.scope),
+        f"Exception occured | {request.url.path} | 500",
     )
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
         content={
             "status": False,
@@ -216,4 +293,6 @@ async def exception(request: Request, exc: Exception):
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", port=7001, reload=True, workers=4, reload_excludes=["logs"])
+    from api.utils.launcher import main
+
+    main()
@@ -0,0 +1,48 @@
+"""
+Application Logger Tests
+File: tests/test_app_logger.py
+"""
+
+import io
+import logging
+import queue
+
+from api.loggers.app_logger import BatchLogWriter, NonBlockingQueueHandler
+
+
+def build_logger(handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(f"test_app_logger.{id(handler)}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    return logger
+
+
+def test_records_that_dont_fit_are_dropped_and_counted():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    logger = build_logger(handler)
+
+    for index in range(5):
+        logger.info("record %d", index)
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+    # Args are merged in before queueing
+    assert handler.queue.get_nowait().msg == "record 0"
+
+
+def test_writer_writes_queued_records_in_batches():
+    log_queue = queue.Queue(maxsize=100)
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    logger = build_logger(NonBlockingQueueHandler(log_queue))
+    for index in range(10):
+        logger.info("record %d", index)
+
+    writer = BatchLogWriter(log_queue, [output], batch_size=4)
+    writer.start()
+    writer.stop()
+
+    assert stream.getvalue().splitlines() == [f"INFO record {i}" for i in range(10)]
+    assert not writer.is_alive()
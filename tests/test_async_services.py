@@ -0,0 +1,84 @@
+"""
+Async CRUD Service Tests
+File: tests/test_async_services.py
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, String
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from api.core.base.async_services import AsyncCRUDService
+from api.v1.models.base_model import BaseTableModel
+
+
+class AsyncGadget(BaseTableModel):
+    __tablename__ = "test_async_gadgets"
+
+    name = Column(String)
+    color = Column(String)
+
+
+gadget_service = AsyncCRUDService(AsyncGadget)
+
+
+@pytest.fixture
+def run(tmp_path):
+    """Runs `test(db)` with an async session on a fresh SQLite database"""
+
+    def run(test):
+        async def main():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'a.db'}")
+            async with engine.begin() as connection:
+                await connection.run_sync(AsyncGadget.__table__.create)
+            sessions = async_sessionmaker(engine, expire_on_commit=False)
+            try:
+                async with sessions() as db:
+                    return await test(db)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+def test_create_fetch_update_delete(run):
+    async def test(db):
+        gadget = await gadget_service.create(db, {"name": "lamp", "color": "red"})
+        assert gadget.created_at is not None
+
+        fetched = await gadget_service.fetch(db, gadget.id)
+        assert fetched.name == "lamp"
+
+        updated = await gadget_service.update(db, gadget.id, {"color": "blue"})
+        assert (updated.name, updated.color) == ("lamp", "blue")
+
+        await gadget_service.delete(db, gadget.id)
+        assert await gadget_service.fetch(db, gadget.id, raise_if_none=False) is None
+
+    run(test)
+
+
+def test_fetch_all_filters_and_pages(run):
+    async def test(db):
+        for name, color in (("a", "red"), ("b", "blue"), ("c", "red")):
+            await gadget_service.create(db, {"name": name, "color": color})
+
+        red = await gadget_service.fetch_all(db, color="red")
+        assert sorted(gadget.name for gadget in red) == ["a", "c"]
+        assert len(await gadget_service.fetch_all(db, skip=1, limit=1)) == 1
+
+    run(test)
+
+
+@pytest.mark.parametrize("id", ["0" * 32, "not-an-id"])
+def test_missing_rows_are_a_404(run, id):
+    async def test(db):
+        with pytest.raises(HTTPException) as error:
+            await gadget_service.update(db, id, {"color": "green"})
+        assert error.value.status_code == 404
+
+    run(test)
@@ -0,0 +1,66 @@
+"""
+Base Model Tests
+File: tests/test_base_model.py
+"""
+
+from sqlalchemy import Column, String, event
+
+from api.v1.models.base_model import BaseTableModel
+
+
+class StreamedItem(BaseTableModel):
+    __tablename__ = "test_streamed_items"
+
+    name = Column(String)
+    status = Column(String)
+
+
+def add_items(session, count: int):
+    session.add_all(
+        StreamedItem(name=f"item {index}", status="even" if index % 2 else "odd")
+        for index in range(count)
+    )
+    session.commit()
+    session.expunge_all()
+
+
+def test_get_all_streams_every_matching_row(session):
+    add_items(session, 10)
+
+    items = StreamedItem.get_all(session, batch_size=3, status="odd")
+
+    assert sorted(item.name for item in items) == [f"item {i}" for i in range(0, 10, 2)]
+
+
+def test_batches_are_fetched_with_yield_per(session):
+    add_items(session, 10)
+    options = []
+
+    @event.listens_for(session, "do_orm_execute")
+    def record(orm_execute_state):
+        options.append(orm_execute_state.execution_options.get("yield_per"))
+
+    batches = list(StreamedItem.get_batches(session, batch_size=4))
+
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert options == [4]
+
+
+def test_get_all_stops_early_without_loading_the_rest(session):
+    add_items(session, 10)
+
+    stream = StreamedItem.get_all(session, batch_size=2)
+    next(stream)
+
+    # Only the first batch has been turned into objects
+    assert len(session.identity_map) == 2
+    stream.close()
+
+
+def test_columns_yield_plain_rows(session):
+    add_items(session, 3)
+
+    rows = list(StreamedItem.get_all(session, columns=["name"], status="odd"))
+
+    assert sorted(row.name for row in rows) == ["item 0", "item 2"]
+    assert len(session.identity_map) == 0
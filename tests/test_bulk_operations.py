@@ -0,0 +1,141 @@
+"""
+Bulk Operation Tests
+File: tests/test_bulk_operations.py
+"""
+
+import uuid
+from unittest import mock
+
+import pytest
+from sqlalchemy import Column, Integer, String, select
+
+from api.core.base import services
+from api.core.base.services import Service
+from api.db.database import Base
+from api.v1.models.base_model import BaseTableModel
+
+
+class BulkProduct(BaseTableModel):
+    __tablename__ = "test_bulk_products"
+
+    sku = Column(String, unique=True, nullable=False)
+    stock = Column(Integer, default=0)
+
+
+class BulkTag(Base):
+    # No updated_at, so rows of only conflict columns have nothing to update
+    __tablename__ = "test_bulk_tags"
+
+    id = Column(String, primary_key=True, default=lambda: uuid.uuid4().hex)
+    name = Column(String, unique=True, nullable=False)
+
+
+class ProductService(Service):
+    def create(self):
+        pass
+
+    def fetch(self):
+        pass
+
+    def fetch_all(self):
+        pass
+
+    def update(self):
+        pass
+
+    def delete(self):
+        pass
+
+
+service = ProductService()
+
+
+def stock(session):
+    rows = session.execute(select(BulkProduct.sku, BulkProduct.stock))
+    return dict(rows.all())
+
+
+def test_create_many_returns_ids_in_order(session):
+    ids = service.create_many(
+        session, BulkProduct, [{"sku": "a"}, {"sku": "b", "stock": 2}], chunk_size=1
+    )
+
+    skus = [session.get(BulkProduct, id).sku for id in ids]
+    assert skus == ["a", "b"]
+
+
+def test_upsert_many_updates_existing_rows(session):
+    first = service.create_many(session, BulkProduct, [{"sku": "a", "stock": 1}])
+
+    ids = service.upsert_many(
+        session,
+        BulkProduct,
+        [{"sku": "b", "stock": 5}, {"sku": "a", "stock": 3}],
+        conflict_columns=["sku"],
+    )
+
+    assert ids[1] == first[0]
+    assert stock(session) == {"a": 3, "b": 5}
+
+
+def test_upsert_many_without_updates_still_returns_every_id(session):
+    # ON CONFLICT DO NOTHING, whose RETURNING skips the existing row
+    existing = service.create_many(session, BulkTag, [{"name": "b"}])
+
+    ids = service.upsert_many(
+        session,
+        BulkTag,
+        [{"name": "a"}, {"name": "b"}, {"name": "c"}],
+        conflict_columns=["name"],
+    )
+
+    assert len(ids) == 3
+    assert ids[1] == existing[0]
+    assert [session.get(BulkTag, id).name for id in ids] == ["a", "b", "c"]
+
+
+@pytest.fixture
+def without_on_conflict():
+    # As on a dialect without INSERT ... ON CONFLICT
+    with mock.patch.dict(services.UPSERT_INSERTS, clear=True):
+        yield
+
+
+def test_upsert_many_fallback_matches_on_conflict_columns(session, without_on_conflict):
+    first = service.create_many(session, BulkProduct, [{"sku": "a", "stock": 1}])
+
+    ids = service.upsert_many(
+        session,
+        BulkProduct,
+        [{"sku": "b", "stock": 5}, {"sku": "a", "stock": 3}],
+        conflict_columns=["sku"],
+    )
+
+    assert ids[1] == first[0]
+    assert stock(session) == {"a": 3, "b": 5}
+    assert session.get(BulkProduct, ids[0]).sku == "b"
+
+
+def test_upsert_many_fallback_by_primary_key(session, without_on_conflict):
+    [id] = service.create_many(session, BulkProduct, [{"sku": "a", "stock": 1}])
+
+    ids = service.upsert_many(
+        session, BulkProduct, [{"id": id, "sku": "a", "stock": 7}, {"sku": "c"}]
+    )
+
+    assert ids[0] == id
+    assert stock(session) == {"a": 7, "c": 0}
+
+
+def test_upsert_many_fallback_without_updates(session, without_on_conflict):
+    existing = service.create_many(session, BulkTag, [{"name": "b"}])
+
+    ids = service.upsert_many(
+        session, BulkTag, [{"name": "a"}, {"name": "b"}], conflict_columns=["name"]
+    )
+
+    assert ids[1] == existing[0]
+    assert session.scalars(select(BulkTag.name).order_by(BulkTag.name)).all() == [
+        "a",
+        "b",
+    ]
@@ -0,0 +1,72 @@
+"""
+Count Cache Tests
+File: tests/test_count_cache.py
+"""
+
+from sqlalchemy import Column, String
+
+from api.utils.count_cache import (
+    count_cache,
+    estimate_count,
+    install_sqlite_row_counters,
+)
+from api.v1.models.base_model import BaseTableModel
+
+
+class CountedItem(BaseTableModel):
+    __tablename__ = "test_counted_items"
+
+    name = Column(String)
+
+
+def estimate(session):
+    return estimate_count(session, session.query(CountedItem), CountedItem, False)
+
+
+def triggers(session):
+    return (
+        session.connection()
+        .exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = 'test_counted_items'"
+        )
+        .scalars()
+        .all()
+    )
+
+
+def test_counters_are_installed_with_the_tables(session):
+    count_cache.clear()
+    session.add_all([CountedItem(name="a"), CountedItem(name="b")])
+    session.commit()
+    assert estimate(session) == 2
+
+    session.delete(session.query(CountedItem).first())
+    session.commit()
+    assert estimate(session) == 1
+
+
+def test_estimates_never_install_counters(session):
+    connection = session.connection()
+    for name in triggers(session):
+        connection.exec_driver_sql(f"DROP TRIGGER {name}")
+    connection.exec_driver_sql(
+        "DELETE FROM _row_counts WHERE table_name = 'test_counted_items'"
+    )
+    session.commit()
+
+    assert estimate(session) is None
+    assert triggers(session) == []
+
+
+def test_installing_again_only_adds_missing_counters(session):
+    session.add(CountedItem(name="a"))
+    session.commit()
+    connection = session.connection()
+    connection.exec_driver_sql("DROP TRIGGER test_counted_items_count_insert")
+    connection.exec_driver_sql("DROP TRIGGER test_counted_items_count_delete")
+
+    assert install_sqlite_row_counters(connection) == ["test_counted_items"]
+    assert install_sqlite_row_counters(connection) == []
+    session.commit()
+    assert estimate(session) == 1
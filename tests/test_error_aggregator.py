@@ -0,0 +1,110 @@
+"""
+Error Aggregator Tests
+File: tests/test_error_aggregator.py
+"""
+
+import asyncio
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+
+from api.utils import error_aggregator as module
+from api.utils.error_aggregator import ErrorAggregator
+from api.utils.settings import settings
+from main import app
+
+
+@pytest.fixture
+def logger():
+    with mock.patch.object(module, "app_logger") as app_logger:
+        yield app_logger
+
+
+def raised(exc: Exception) -> Exception:
+    try:
+        raise exc
+    except Exception as error:
+        return error
+
+
+def test_client_errors_are_logged_once_without_a_traceback(logger):
+    aggregator = ErrorAggregator(max_fingerprints=10)
+    for _ in range(3):
+        aggregator.capture(
+            raised(HTTPException(status_code=404, detail="Not found")),
+            "/items/{id}",
+            "HTTPException: /items/1 | 404 | Not found",
+            exc_type="HTTPException 404",
+            client_error=True,
+        )
+
+    logger.info.assert_called_once()
+    logger.error.assert_not_called()
+    assert aggregator.top()[0]["count"] == 3
+
+
+def test_server_errors_are_logged_with_a_traceback(logger):
+    aggregator = ErrorAggregator(max_fingerprints=10)
+    aggregator.capture(raised(ValueError("boom")), "/items", "Exception occured")
+
+    assert logger.error.call_args.kwargs["exc_info"][0] is ValueError
+
+
+def test_cancelling_the_summaries_flushes_the_last_one(logger):
+    aggregator = ErrorAggregator(max_fingerprints=10)
+
+    async def run():
+        task = aggregator.start_summaries(3600)
+        await asyncio.sleep(0)
+        for _ in range(2):
+            aggregator.capture(raised(ValueError("boom")), "/items", "Exception")
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+
+    summary = logger.info.call_args.args[0]
+    assert "Repeated 1 times" in summary
+
+
+@pytest.mark.parametrize("interval", [0, -5])
+def test_summaries_are_disabled_without_a_positive_interval(interval):
+    assert ErrorAggregator(max_fingerprints=10).start_summaries(interval) is None
+
+    with pytest.raises(ValueError):
+        asyncio.run(ErrorAggregator(max_fingerprints=10).run_summaries(interval))
+
+
+def test_startup_with_summaries_disabled():
+    with mock.patch.object(settings, "ERROR_SUMMARY_INTERVAL", 0):
+        with TestClient(app) as client:
+            assert client.get("/").status_code == 200
+
+
+def test_stored_messages_leave_out_the_sql_and_its_parameters(logger):
+    aggregator = ErrorAggregator(max_fingerprints=10)
+    error = IntegrityError(
+        "INSERT INTO users (email) VALUES (?)",
+        ("someone@example.com",),
+        Exception("UNIQUE constraint failed: users.email\nDETAIL: someone"),
+    )
+    aggregator.capture(raised(error), "/users", "Exception occured")
+
+    record = aggregator.top()[0]
+    assert record["type"] == "IntegrityError"
+    assert record["message"] == "UNIQUE constraint failed: users.email"
+
+
+def test_error_stats_require_the_profiling_token(client):
+    with mock.patch.object(settings, "PROFILING_TOKEN", "secret"):
+        assert client.get("/error-stats").status_code == 403
+        assert (
+            client.get("/error-stats", headers={"x-profile-token": "no"}).status_code
+            == 403
+        )
+        response = client.get("/error-stats", headers={"x-profile-token": "secret"})
+    assert response.status_code == 200
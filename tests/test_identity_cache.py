@@ -0,0 +1,137 @@
+"""
+Identity Cache Tests
+File: tests/test_identity_cache.py
+"""
+
+import uuid
+
+import pytest
+from sqlalchemy import JSON, Column, String, create_engine, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from api.db.routing import ReplicaSet, RoutingSession
+from api.utils.identity_cache import IdentityCachedSession, identity_cache
+from api.v1.models.base_model import BaseTableModel
+
+
+class CachedPlan(BaseTableModel):
+    __tablename__ = "test_cached_plans"
+    __identity_cache__ = True
+
+    name = Column(String)
+    features = Column(JSON)
+
+
+@pytest.fixture
+def db(session):
+    identity_cache.clear()
+    cached = IdentityCachedSession(bind=session.get_bind())
+    yield cached
+    cached.close()
+
+
+def add_plan(db, **values) -> str:
+    plan = CachedPlan(name="basic", features=["export"], **values)
+    db.add(plan)
+    db.commit()
+    id = plan.id
+    db.expunge_all()
+    return id
+
+
+def load(db, id):
+    # A fresh identity map for every lookup, like a new request
+    db.expunge_all()
+    return db.get(CachedPlan, id)
+
+
+def hits() -> int:
+    return identity_cache.hits[CachedPlan.__tablename__]
+
+
+def test_second_lookup_is_served_from_the_cache(db):
+    id = add_plan(db)
+    load(db, id)
+    before = hits()
+
+    assert load(db, id).name == "basic"
+    assert hits() == before + 1
+
+
+def test_every_spelling_of_an_id_shares_one_entry(db):
+    id = add_plan(db)
+    load(db, id)
+    before = hits()
+
+    load(db, str(uuid.UUID(id)))
+    load(db, uuid.UUID(id))
+    assert hits() == before + 2
+
+
+def test_mutating_a_loaded_value_leaves_the_cache_alone(db):
+    id = add_plan(db)
+    load(db, id).features.append("changed")
+    load(db, id).features.append("changed again")
+
+    assert load(db, id).features == ["export"]
+
+
+def test_flushed_changes_invalidate(db):
+    id = add_plan(db)
+    load(db, id).name = "pro"
+    db.commit()
+
+    assert load(db, id).name == "pro"
+
+
+def test_bulk_update_invalidates(db):
+    id = add_plan(db)
+    load(db, id)
+    db.execute(update(CachedPlan).values(name="pro"))
+    db.commit()
+
+    assert load(db, id).name == "pro"
+
+
+def test_core_upsert_invalidates(db):
+    id = add_plan(db)
+    load(db, id)
+    statement = insert(CachedPlan.__table__).values(id=id, name="pro")
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["id"], set_={"name": statement.excluded.name}
+        )
+    )
+    db.commit()
+
+    assert load(db, id).name == "pro"
+
+
+class RoutedSession(IdentityCachedSession, RoutingSession):
+    pass
+
+
+def test_misses_are_read_from_the_primary(tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, name in ((primary, "updated"), (replica, "stale")):
+        CachedPlan.__table__.create(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                CachedPlan.__table__.insert().values(id=uuid.UUID(int=1).hex, name=name)
+            )
+
+    identity_cache.clear()
+    replica_set = ReplicaSet([replica], check_interval=60, retry_interval=60)
+    db = RoutedSession(bind=primary, replica_set=replica_set)
+    try:
+        assert load(db, uuid.UUID(int=1).hex).name == "updated"
+        before = hits()
+        assert load(db, uuid.UUID(int=1).hex).name == "updated"
+        assert hits() == before + 1
+        # Other reads still go to the replica
+        assert db.scalar(select(CachedPlan.name)) == "stale"
+    finally:
+        db.close()
+        replica_set.dispose()
+        primary.dispose()
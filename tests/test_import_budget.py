@@ -0,0 +1,48 @@
+"""
+Import Time Budget Tests
+File: tests/test_import_budget.py
+"""
+
+import os
+
+import pytest
+
+from api.utils.import_budget import HEAVY_MODULES, check_budget
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    """Directory of stub modules importable by the measuring subprocess"""
+
+    path = os.pathsep.join(filter(None, [str(tmp_path), os.environ.get("PYTHONPATH")]))
+    monkeypatch.setenv("PYTHONPATH", path)
+    return tmp_path
+
+
+def test_a_light_module_is_within_budget(modules):
+    (modules / "stub_app.py").write_text("import json\n")
+
+    seconds, problems, timings = check_budget("stub_app", budget=5.0)
+
+    assert problems == []
+    assert 0 < seconds < 5.0
+    assert "json" in timings
+
+
+def test_heavy_imports_and_slow_imports_are_reported(modules):
+    (modules / "stub_heavy.py").write_text("x = 1\n")
+    (modules / "stub_app.py").write_text("import stub_heavy\n")
+
+    _, problems, _ = check_budget("stub_app", budget=0.0, forbidden=["stub_heavy"])
+
+    assert len(problems) == 2
+    assert problems[0].startswith("importing stub_app took")
+    assert problems[1] == "stub_heavy is imported at startup, import it lazily"
+
+
+def test_the_app_imports_within_budget():
+    budget = float(os.environ.get("IMPORT_TIME_BUDGET", 2.0))
+
+    seconds, problems, _ = check_budget("main", budget, HEAVY_MODULES)
+
+    assert problems == [], f"importing main took {seconds:.3f}s"
@@ -0,0 +1,57 @@
+"""
+JSON Response Tests
+File: tests/test_json_response.py
+"""
+
+import importlib
+import json
+import sys
+from unittest import mock
+
+import pytest
+from pydantic import BaseModel
+
+from api.utils import json_response
+
+
+class Reading(BaseModel):
+    value: float
+
+
+@pytest.fixture(params=["orjson", "json"])
+def dumps(request):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+        yield json_response.dumps
+        return
+
+    with mock.patch.dict(sys.modules, {"orjson": None}):
+        module = importlib.reload(json_response)
+    assert module.orjson is None
+    yield module.dumps
+    importlib.reload(json_response)
+
+
+def test_plain_payloads(dumps):
+    assert json.loads(dumps({"a": [1, 2.5, "é", None]})) == {"a": [1, 2.5, "é", None]}
+
+
+def test_nan_and_infinity_become_null(dumps):
+    payload = {
+        "nan": float("nan"),
+        "inf": [float("inf"), -float("inf")],
+        "nested": (1.5, {"x": float("nan")}),
+        "model": Reading(value=float("nan")),
+    }
+
+    assert json.loads(dumps(payload)) == {
+        "nan": None,
+        "inf": [None, None],
+        "nested": [1.5, {"x": None}],
+        "model": {"value": None},
+    }
+
+
+def test_unknown_types_still_raise(dumps):
+    with pytest.raises(TypeError):
+        dumps({"a": object()})
@@ -0,0 +1,91 @@
+"""
+Middleware Tests
+File: tests/test_middleware.py
+"""
+
+from unittest import mock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.core.middleware import (
+    ProfilingMiddleware,
+    RequestCountMiddleware,
+    RequestLoggingMiddleware,
+)
+from api.utils.request_metrics import latency_histograms, request_metrics
+from api.utils.settings import settings
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestCountMiddleware)
+    app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(RequestLoggingMiddleware)
+
+    @app.get("/test-middleware/ok")
+    async def ok():
+        return {"ok": True}
+
+    @app.get("/test-middleware/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    return app
+
+
+@pytest.fixture
+def client():
+    with TestClient(build_app(), raise_server_exceptions=False) as client:
+        yield client
+
+
+def observations(route: str, status_class: str) -> int:
+    return sum(
+        count
+        for (series_route, _, series_status), _, count, _ in latency_histograms.series()
+        if series_route == route and series_status == status_class
+    )
+
+
+def test_requests_are_counted_and_timed(client):
+    before = observations("/test-middleware/ok", "2xx")
+
+    assert client.get("/test-middleware/ok").status_code == 200
+
+    assert observations("/test-middleware/ok", "2xx") == before + 1
+    assert request_metrics.totals()["/test-middleware/ok"] >= 1
+
+
+def test_unhandled_exceptions_are_recorded_as_500(client):
+    before = observations("/test-middleware/boom", "5xx")
+    counted = request_metrics.totals().get("/test-middleware/boom", 0)
+
+    assert client.get("/test-middleware/boom").status_code == 500
+
+    assert observations("/test-middleware/boom", "5xx") == before + 1
+    assert request_metrics.totals()["/test-middleware/boom"] == counted + 1
+
+
+def test_query_stats_headers(client):
+    with mock.patch.object(settings, "SQL_STATS_HEADERS", True):
+        response = client.get("/test-middleware/ok")
+    assert response.headers["x-db-query-count"] == "0"
+    assert float(response.headers["x-db-time"]) == 0
+
+    with mock.patch.object(settings, "SQL_STATS_HEADERS", False):
+        response = client.get("/test-middleware/ok")
+    assert "x-db-query-count" not in response.headers
+
+
+def test_profiled_responses_carry_their_profile_id(client):
+    with mock.patch.object(settings, "PROFILING_TOKEN", "secret"):
+        profiled = client.get(
+            "/test-middleware/ok", headers={"x-profile-token": "secret"}
+        )
+        plain = client.get("/test-middleware/ok", headers={"x-profile-token": "wrong"})
+
+    assert len(profiled.headers["x-profile-id"]) == 12
+    assert profiled.json() == {"ok": True}
+    assert "x-profile-id" not in plain.headers
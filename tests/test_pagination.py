@@ -0,0 +1,130 @@
+"""
+Pagination Tests
+File: tests/test_pagination.py
+"""
+
+import json
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, String, event
+
+from api.utils.pagination import encode_cursor, paginated_response
+from api.v1.models.base_model import BaseTableModel
+
+
+class PaginatedItem(BaseTableModel):
+    __tablename__ = "test_paginated_items"
+    __searchable__ = ("name",)
+
+    name = Column(String)
+    status = Column(String)
+
+
+def add_items(session, count: int, **values):
+    items = [PaginatedItem(name=f"item {index}", **values) for index in range(count)]
+    session.add_all(items)
+    session.commit()
+    return items
+
+
+def fetch(session, **kwargs):
+    kwargs.setdefault("skip", 0)
+    kwargs.setdefault("limit", 10)
+    response = paginated_response(db=session, model=PaginatedItem, **kwargs)
+    return json.loads(response.body)["data"]
+
+
+def test_plain_filters_match_exactly(session):
+    add_items(session, 2, status="active")
+    add_items(session, 3, status="inactive")
+
+    data = fetch(session, filters={"status": "active"})
+
+    assert data["total"] == 2
+    assert {item["status"] for item in data["items"]} == {"active"}
+
+
+def test_searchable_filters_match_substrings(session):
+    add_items(session, 12, status="active")
+
+    data = fetch(session, filters={"name": "item 1"}, limit=20)
+
+    # item 1, item 10, item 11
+    assert data["total"] == 3
+
+
+def test_keyset_pages_cover_every_row_once(session):
+    items = add_items(session, 7, status="active")
+
+    seen = []
+    data = fetch(session, keyset=True, limit=3)
+    seen.extend(item["id"] for item in data["items"])
+    while data["next_cursor"]:
+        data = fetch(session, cursor=data["next_cursor"], limit=3)
+        seen.extend(item["id"] for item in data["items"])
+
+    assert sorted(seen) == sorted(item.id for item in items)
+    assert len(seen) == len(set(seen))
+
+
+def test_keyset_pages_are_newest_first(session):
+    items = []
+    for index in range(5):
+        items.extend(add_items(session, 1, status="active"))
+
+    data = fetch(session, keyset=True, limit=10)
+
+    assert [item["id"] for item in data["items"]] == [
+        item.id for item in reversed(items)
+    ]
+
+
+def test_keyset_pages_are_read_from_the_primary_key_index(session):
+    add_items(session, 3, status="active")
+    first = fetch(session, keyset=True, limit=1)
+    queries = []
+
+    def record(conn, cursor, statement, parameters, *args):
+        queries.append((statement, parameters))
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        fetch(session, cursor=first["next_cursor"], limit=1, include_total=False)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    statement, parameters = queries[-1]
+    plan = " ".join(
+        row[-1]
+        for row in session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        )
+    )
+    assert "USING INDEX" in plan or "USING PRIMARY KEY" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_keyset_prev_cursor_returns_the_previous_page(session):
+    add_items(session, 6, status="active")
+
+    first = fetch(session, keyset=True, limit=3)
+    second = fetch(session, cursor=first["next_cursor"], limit=3)
+    back = fetch(session, cursor=second["prev_cursor"], limit=3)
+
+    assert [item["id"] for item in back["items"]] == [
+        item["id"] for item in first["items"]
+    ]
+
+
+def test_invalid_cursor_is_a_bad_request(session):
+    with pytest.raises(HTTPException) as error:
+        fetch(session, cursor="not-a-cursor")
+    assert error.value.status_code == 400
+
+
+def test_cursor_with_a_malformed_id_is_a_bad_request(session):
+    with pytest.raises(HTTPException) as error:
+        fetch(session, cursor=encode_cursor("not-an-id", "next"))
+    assert error.value.status_code == 400
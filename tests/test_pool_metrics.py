@@ -0,0 +1,61 @@
+"""
+Connection Pool Metrics Tests
+File: tests/test_pool_metrics.py
+"""
+
+import pytest
+from sqlalchemy import create_engine
+
+from api.db.pool_metrics import InstrumentedQueuePool, render_pool_metrics
+from api.utils.request_metrics import process_label
+
+
+def build_engine(path):
+    return create_engine(
+        f"sqlite:///{path}", poolclass=InstrumentedQueuePool, pool_size=2
+    )
+
+
+@pytest.fixture
+def engines(tmp_path):
+    engines = {
+        "primary": build_engine(tmp_path / "primary.db"),
+        "replica0": build_engine(tmp_path / "replica.db"),
+    }
+    yield engines
+    for engine in engines.values():
+        engine.dispose()
+
+
+def connect(engine):
+    with engine.connect() as connection:
+        connection.exec_driver_sql("SELECT 1")
+
+
+def test_counts_survive_dispose_without_doubling(engines):
+    engine = engines["primary"]
+    connect(engine)
+    assert engine.pool.metrics.connections_created == 1
+
+    # dispose() recreates the pool, which copies its listeners
+    engine.dispose()
+    connect(engine)
+    engine.dispose()
+    connect(engine)
+
+    assert engine.pool.metrics.connections_created == 3
+    assert sum(engine.pool.metrics.checkout_wait.counts) == 3
+
+
+def test_every_pool_is_exported_with_its_label(engines):
+    connect(engines["primary"])
+
+    content = render_pool_metrics(engines)
+
+    pid = process_label()
+    assert f'db_pool_connections_created_total{{{pid},pool="primary"}} 1' in content
+    assert f'db_pool_connections_created_total{{{pid},pool="replica0"}} 0' in content
+    assert f'db_pool_checkout_wait_seconds_count{{{pid},pool="primary"}} 1' in content
+    assert f'db_pool_size{{{pid},pool="replica0"}} 2' in content
+    # One HELP/TYPE header per metric, whatever the number of pools
+    assert content.count("# TYPE db_pool_size gauge") == 1
@@ -0,0 +1,59 @@
+"""
+Request Profiler Tests
+File: tests/test_profiler.py
+"""
+
+import threading
+import time
+
+import pytest
+
+from api.utils.profiler import StackSampler
+
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.fixture
+def sampler():
+    return StackSampler(interval=0.001)
+
+
+def test_samples_the_profiled_thread(sampler):
+    profile = sampler.begin(threading.get_ident())
+    busy(0.05)
+    sampler.end(profile)
+
+    assert profile.samples > 0
+    assert any("busy" in stack for stack in profile.stacks)
+
+
+def profiler_threads() -> int:
+    return sum(thread.name == "request-profiler" for thread in threading.enumerate())
+
+
+def test_one_thread_serves_every_profile(sampler):
+    before = profiler_threads()
+    for _ in range(5):
+        profile = sampler.begin(threading.get_ident())
+        busy(0.005)
+        sampler.end(profile)
+
+    assert profiler_threads() == before + 1
+
+
+def test_an_ended_profile_gets_no_more_samples(sampler):
+    profile = sampler.begin(threading.get_ident())
+    busy(0.01)
+    sampler.end(profile)
+    samples = profile.samples
+
+    other = sampler.begin(threading.get_ident())
+    busy(0.02)
+    sampler.end(other)
+
+    assert profile.samples == samples
+    assert other.samples > 0
@@ -0,0 +1,105 @@
+"""
+Query Statistics Tests
+File: tests/test_query_stats.py
+"""
+
+from unittest import mock
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from api.db import query_stats as module
+from api.db.query_stats import (
+    QueryStats,
+    current_query_stats,
+    instrument_engine,
+    redact,
+    report_n_plus_one,
+)
+from api.utils.settings import settings
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def stats():
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    yield stats
+    current_query_stats.reset(token)
+
+
+@pytest.fixture
+def logger():
+    with mock.patch.object(module, "app_logger") as app_logger:
+        yield app_logger
+
+
+def test_statements_are_counted_per_request(engine, stats):
+    with engine.connect() as connection:
+        for value in range(3):
+            connection.execute(text("SELECT :value"), {"value": value})
+        connection.execute(text("SELECT 2"))
+
+    assert stats.count == 4
+    assert stats.duration > 0
+    assert stats.n_plus_one(3) == [("SELECT ?", 3)]
+
+
+def test_nothing_is_counted_outside_a_request(engine):
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    assert current_query_stats.get() is None
+
+
+def test_failed_statements_dont_unbalance_the_timings(engine, stats):
+    with engine.connect() as connection:
+        with pytest.raises(Exception):
+            connection.execute(text("SELECT * FROM no_such_table"))
+        assert connection.info["query_start"] == []
+        connection.execute(text("SELECT 1"))
+
+    assert stats.count == 1
+
+
+def test_instrumenting_twice_counts_once(engine, stats):
+    instrument_engine(engine)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    assert stats.count == 1
+
+
+def test_n_plus_one_candidates_are_reported(stats, logger):
+    for _ in range(4):
+        stats.record("SELECT * FROM orders WHERE user_id = ?", 0.001)
+    stats.record("SELECT * FROM users", 0.001)
+
+    with mock.patch.object(settings, "SQL_N_PLUS_ONE_THRESHOLD", 3):
+        report_n_plus_one(stats, "GET", "/users")
+
+    logger.warning.assert_called_once()
+    message = logger.warning.call_args.args[0]
+    assert "GET /users | 4 executions | SELECT * FROM orders" in message
+
+
+def test_slow_queries_are_logged_with_redacted_parameters(engine, logger):
+    with mock.patch.object(settings, "SQL_SLOW_QUERY_MS", 0):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT :email"), {"email": "someone@example.com"})
+
+    message = logger.warning.call_args.args[0]
+    assert "someone@example.com" not in message
+    assert "<str>" in message
+
+
+def test_redact_keeps_the_shape_only():
+    assert redact({"a": 1, "b": None}) == {"a": "<int>", "b": None}
+    assert redact([(1, "x"), (2, "y")]) == [["<int>", "<str>"], "... 2 rows"]
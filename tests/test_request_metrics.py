@@ -0,0 +1,165 @@
+"""
+Request Metrics Tests
+File: tests/test_request_metrics.py
+"""
+
+import math
+import random
+import re
+from collections import Counter, defaultdict
+
+from api.utils.request_metrics import (
+    OVERFLOW_ROUTE,
+    LatencyHistograms,
+    RequestMetrics,
+    SpaceSaving,
+    render_prometheus,
+)
+
+SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$")
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"(?:,|$)')
+
+
+def test_sketch_evicts_the_smallest_count_and_inherits_it():
+    sketch = SpaceSaving(capacity=2)
+    sketch.add("a", 5)
+    sketch.add("b", 2)
+
+    assert sketch.add("c") == "b"
+    assert sketch.count("c") == 3
+    assert sketch.error("c") == 2
+    assert sketch.count("b") == 0
+    assert len(sketch) == 2
+
+
+def test_sketch_counts_are_bounded_overestimates():
+    rng = random.Random(7)
+    # A few heavy keys among many light ones
+    stream = [f"heavy{rng.randrange(3)}" for _ in range(3000)] + [
+        f"light{rng.randrange(500)}" for _ in range(2000)
+    ]
+    rng.shuffle(stream)
+
+    sketch = SpaceSaving(capacity=20)
+    for key in stream:
+        sketch.add(key)
+
+    exact = Counter(stream)
+    for key, count in sketch.top():
+        assert exact[key] <= count <= exact[key] + sketch.error(key)
+        # No more than N / capacity
+        assert sketch.error(key) <= len(stream) // 20
+    assert {key for key, _ in sketch.top(3)} == {"heavy0", "heavy1", "heavy2"}
+
+
+def test_routes_past_the_limit_share_the_overflow_slot():
+    metrics = RequestMetrics(max_routes=2, top_ips=3)
+    for route in ("/a", "/b", "/c", "/d"):
+        metrics.record(route, "10.0.0.1")
+
+    assert metrics.route_label("/a") == "/a"
+    assert metrics.route_label("/c") == OVERFLOW_ROUTE
+    assert metrics.totals() == {OVERFLOW_ROUTE: 2, "/a": 1, "/b": 1}
+
+
+def test_request_counts_are_the_top_ips_per_route():
+    metrics = RequestMetrics(max_routes=4, top_ips=2)
+    for ip, count in (("10.0.0.1", 3), ("10.0.0.2", 1), ("10.0.0.3", 2)):
+        for _ in range(count):
+            metrics.record("/items/{id}", ip)
+    metrics.record("/users", None)
+
+    counts = metrics.request_counts()
+
+    assert counts["/users"] == {"unknown": 1}
+    # Only `top_ips` entries, heaviest first
+    assert list(counts["/items/{id}"].items())[0] == ("10.0.0.1", 3)
+    assert len(counts["/items/{id}"]) == 2
+
+
+def test_request_stats_endpoint(client):
+    client.get("/")
+
+    data = client.get("/request-stats").json()["data"]
+
+    assert data["request_counts"]["/"]["testclient"] >= 1
+
+
+def parse_exposition(content: str):
+    """Parses the Prometheus text format, failing on anything invalid.
+    Returns `({family: type}, [(name, labels, value)])`
+    """
+
+    types, samples = {}, []
+    assert content.endswith("\n")
+    for line in content.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, family, metric_type = line.split(" ")
+            assert family not in types, f"{family} declared twice"
+            assert metric_type in ("counter", "gauge", "histogram")
+            types[family] = metric_type
+            continue
+        if line.startswith("# HELP "):
+            continue
+
+        match = SAMPLE.match(line)
+        assert match, f"invalid sample line: {line!r}"
+        name, labels, value = match.groups()
+        family = re.sub(r"_(bucket|sum|count)$", "", name)
+        assert family in types or name in types, f"{name} has no TYPE"
+        parsed = dict(LABEL.findall(labels or ""))
+        assert ",".join(f'{k}="{v}"' for k, v in parsed.items()) == (labels or "")
+        samples.append((name, parsed, float(value)))
+    return types, samples
+
+
+def test_bucket_bounds_are_inclusive():
+    histograms = LatencyHistograms(buckets=(0.1, 0.5))
+    for seconds in (0.1, 0.1000001, 0.5, 3.0):
+        histograms.observe("/items", "GET", 200, seconds)
+
+    [(labels, cumulative, count, total)] = list(histograms.series())
+
+    assert labels == ("/items", "GET", "2xx")
+    # le="0.1", le="0.5", le="+Inf"
+    assert cumulative == [1, 3, 4]
+    assert count == 4
+    assert math.isclose(total, 3.7000001)
+
+
+def test_metrics_endpoint_is_valid_exposition(client):
+    for path in ("/", "/", "/request-stats"):
+        client.get(path)
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    types, samples = parse_exposition(response.text)
+
+    assert types["http_request_duration_seconds"] == "histogram"
+    assert types["http_requests_total"] == "counter"
+
+    buckets = defaultdict(list)
+    counts, sums = {}, {}
+    for name, labels, value in samples:
+        if not name.startswith("http_request_duration_seconds"):
+            continue
+        key = tuple(sorted((k, v) for k, v in labels.items() if k != "le"))
+        if name.endswith("_bucket"):
+            buckets[key].append((labels["le"], value))
+        elif name.endswith("_count"):
+            counts[key] = value
+        else:
+            sums[key] = value
+
+    root = next(key for key in buckets if ("route", "/") in key)
+    bounds = [bound for bound, _ in buckets[root]]
+    values = [value for _, value in buckets[root]]
+    assert bounds[-1] == "+Inf"
+    assert [float(bound) for bound in bounds[:-1]] == sorted(
+        float(bound) for bound in bounds[:-1]
+    )
+    assert values == sorted(values)
+    for key, series in buckets.items():
+        assert series[-1][1] == counts[key]
+        assert sums[key] >= 0
+    assert counts[root] >= 2
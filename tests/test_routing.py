@@ -0,0 +1,111 @@
+"""
+Read Replica Routing Tests
+File: tests/test_routing.py
+"""
+
+import time
+
+import pytest
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    insert,
+    select,
+    text,
+)
+
+from api.db.routing import ReplicaSet, RoutingSession
+
+metadata = MetaData()
+notes = Table(
+    "notes",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("source", String),
+)
+
+
+def build_engine(path, source: str):
+    engine = create_engine(f"sqlite:///{path}")
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(notes).values(id=1, source=source))
+    return engine
+
+
+@pytest.fixture
+def engines(tmp_path):
+    primary = build_engine(tmp_path / "primary.db", "primary")
+    replica = build_engine(tmp_path / "replica.db", "replica")
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+@pytest.fixture
+def replica_set(engines):
+    replica_set = ReplicaSet([engines[1]], check_interval=60, retry_interval=60)
+    yield replica_set
+    replica_set.dispose()
+
+
+@pytest.fixture
+def db(engines, replica_set):
+    session = RoutingSession(bind=engines[0], replica_set=replica_set)
+    yield session
+    session.close()
+
+
+def source(db) -> str:
+    return db.scalar(select(notes.c.source).where(notes.c.id == 1))
+
+
+def test_reads_go_to_a_replica(db):
+    assert source(db) == "replica"
+    assert source(db) == "replica"
+
+
+def test_dialect_lookups_stay_on_the_replica(db):
+    assert db.get_bind().dialect.name == "sqlite"
+
+    assert source(db) == "replica"
+
+
+def test_writes_switch_the_session_to_the_primary(db):
+    assert source(db) == "replica"
+
+    db.execute(insert(notes).values(id=2, source="written"))
+
+    assert source(db) == "primary"
+    assert db.scalar(select(notes.c.source).where(notes.c.id == 2)) == "written"
+
+
+def test_locking_reads_go_to_the_primary(db):
+    locked = db.scalar(select(notes.c.source).where(notes.c.id == 1).with_for_update())
+
+    assert locked == "primary"
+
+
+def test_closing_the_session_returns_it_to_the_replicas(db):
+    db.use_primary()
+    assert source(db) == "primary"
+
+    db.close()
+
+    assert source(db) == "replica"
+
+
+def test_a_failing_replica_is_marked_down(db, engines, replica_set):
+    with engines[1].begin() as connection:
+        connection.execute(text("DROP TABLE notes"))
+
+    with pytest.raises(Exception):
+        source(db)
+
+    assert replica_set.replicas[0].down_until > time.monotonic()
+    db.close()
+    assert source(db) == "primary"
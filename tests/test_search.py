@@ -0,0 +1,52 @@
+"""
+Search Index Tests
+File: tests/test_search.py
+"""
+
+from sqlalchemy import Column, String, select
+
+from api.utils.search import search_filter
+from api.v1.models.base_model import BaseTableModel
+
+
+class SearchedCustomer(BaseTableModel):
+    __tablename__ = "test_searched_customers"
+    __searchable__ = ("name",)
+
+    name = Column(String)
+
+
+def names(session, value):
+    query = select(SearchedCustomer.name).where(
+        search_filter(session, SearchedCustomer, "name", value)
+    )
+    return sorted(session.scalars(query))
+
+
+def test_index_follows_inserts_updates_and_deletes(session):
+    alice, bob = SearchedCustomer(name="Alice Smith"), SearchedCustomer(name="Bob")
+    session.add_all([alice, bob])
+    session.commit()
+    assert names(session, "smi") == ["Alice Smith"]
+
+    alice.name = "Alice Jones"
+    session.commit()
+    assert names(session, "smi") == []
+    assert names(session, "jon") == ["Alice Jones"]
+
+    session.delete(alice)
+    session.commit()
+    assert names(session, "ali") == []
+
+
+def test_index_survives_vacuum(session):
+    customers = [SearchedCustomer(name=f"customer {index:03}") for index in range(50)]
+    session.add_all(customers)
+    session.commit()
+    for customer in customers[:40]:
+        session.delete(customer)
+    session.commit()
+
+    session.connection().exec_driver_sql("VACUUM")
+
+    assert names(session, "customer 04") == [f"customer {i:03}" for i in range(40, 50)]
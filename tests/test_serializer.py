@@ -0,0 +1,119 @@
+"""
+Model Serializer Tests
+File: tests/test_serializer.py
+"""
+
+import datetime
+import enum
+import uuid
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Interval,
+    Numeric,
+    String,
+    Uuid,
+)
+from sqlalchemy.orm import relationship
+
+from api.db.types import HexUUID
+from api.utils.serializer import get_serializer
+from api.v1.models.base_model import BaseTableModel
+
+
+class Size(enum.Enum):
+    SMALL = "small"
+    LARGE = "large"
+
+
+class SerializedOwner(BaseTableModel):
+    __tablename__ = "test_serialized_owners"
+
+    name = Column(String)
+
+
+class SerializedItem(BaseTableModel):
+    __tablename__ = "test_serialized_items"
+
+    name = Column(String)
+    price = Column(Numeric(10, 2))
+    quantity = Column(Numeric(10, 0))
+    size = Column(Enum(Size))
+    ttl = Column(Interval)
+    token = Column(Uuid)
+    shipped_at = Column(DateTime)
+    extra = Column(JSON)
+    owner_id = Column(HexUUID, ForeignKey("test_serialized_owners.id"))
+
+    owner = relationship(SerializedOwner)
+
+
+def add_item(session, **values) -> SerializedItem:
+    defaults = dict(
+        name="box",
+        price=Decimal("9.99"),
+        quantity=Decimal("3"),
+        size=Size.LARGE,
+        ttl=datetime.timedelta(minutes=2),
+        token=uuid.UUID(int=5),
+        shipped_at=datetime.datetime(2024, 1, 2, 3, 4, 5),
+        extra={"tags": ["a"]},
+    )
+    item = SerializedItem(**{**defaults, **values})
+    session.add(item)
+    session.commit()
+    return item
+
+
+def test_values_are_converted_for_json(session):
+    item = add_item(session)
+
+    data = item.to_dict()
+
+    assert data["id"] == item.id
+    assert data["price"] == 9.99
+    assert data["quantity"] == 3 and isinstance(data["quantity"], int)
+    assert data["size"] == "large"
+    assert data["ttl"] == 120.0
+    assert data["token"] == str(uuid.UUID(int=5))
+    assert data["shipped_at"] == "2024-01-02T03:04:05"
+    assert data["extra"] == {"tags": ["a"]}
+    assert data["owner_id"] is None
+    assert isinstance(data["created_at"], str)
+
+
+def test_relationships_are_not_loaded(session):
+    owner = SerializedOwner(name="owner")
+    session.add(owner)
+    session.commit()
+    item = add_item(session, owner_id=owner.id)
+    session.expire_all()
+
+    data = get_serializer(SerializedItem).serialize(item)
+
+    assert "owner" not in data
+    assert "owner" not in item.__dict__
+
+
+def test_fields_and_rows(session):
+    add_item(session)
+    add_item(session, size=None)
+    serializer = get_serializer(SerializedItem, fields=["size"])
+
+    rows = session.execute(serializer.select()).all()
+
+    assert sorted(serializer.many_rows(rows), key=str) == sorted(
+        [{"size": "large"}, {"size": None}], key=str
+    )
+    assert get_serializer(SerializedItem, fields=["size"]) is serializer
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(ValueError, match="no column owner"):
+        get_serializer(SerializedItem, fields=["name", "owner"])
@@ -0,0 +1,105 @@
+"""
+Shared Request Stats Tests
+File: tests/test_shared_stats.py
+"""
+
+import multiprocessing
+
+import pytest
+
+from api.utils.request_metrics import (
+    LatencyHistograms,
+    RequestMetrics,
+    process_label,
+    render_prometheus,
+)
+from api.utils.shared_stats import SharedRequestStats
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "request_stats.bin")
+
+
+def attach(path, max_routes: int = 4, top_ips: int = 3) -> RequestMetrics:
+    metrics = RequestMetrics(max_routes=max_routes, top_ips=top_ips)
+    metrics.attach_shared(
+        SharedRequestStats(
+            path, max_workers=4, route_slots=max_routes + 1, top_ips=top_ips
+        )
+    )
+    return metrics
+
+
+def test_reset_clears_this_workers_region(path):
+    metrics = attach(path)
+    for index in range(10):
+        metrics.record("/items", f"10.0.0.{index}")
+
+    metrics.reset()
+    # Entries handed out again from the start, inside the region
+    for index in range(10):
+        metrics.record("/users", f"10.0.1.{index}")
+
+    assert metrics.totals() == {"/users": 10}
+    assert list(metrics.request_counts()) == ["/users"]
+    assert len(metrics.request_counts()["/users"]) == 3
+    metrics.shared.close()
+
+
+def test_metrics_render_only_this_process_with_its_pid(path):
+    this, other = attach(path), attach(path)
+    for _ in range(2):
+        this.record("/items", "10.0.0.1")
+    for _ in range(3):
+        other.record("/items", "10.0.0.2")
+
+    content = render_prometheus(this, LatencyHistograms())
+
+    assert f'http_requests_total{{{process_label()},route="/items"}} 2' in content
+    # /request-stats still merges every worker
+    assert this.request_counts() == {"/items": {"10.0.0.2": 3, "10.0.0.1": 2}}
+    this.shared.close()
+    other.shared.close()
+
+
+def record_in_worker(path, requests, ready, done):
+    metrics = attach(path)
+    for route, ip in requests:
+        metrics.record(route, ip)
+    ready.set()
+    # Stay alive until the parent has merged, dead workers' regions can be
+    # taken over
+    done.wait(10)
+    metrics.shared.close()
+
+
+def test_counts_are_merged_across_processes(path):
+    context = multiprocessing.get_context("spawn")
+    ready, done = context.Event(), context.Event()
+    worker = context.Process(
+        target=record_in_worker,
+        args=(
+            path,
+            [("/items", "10.0.0.1")] * 3 + [("/users", "10.0.0.2")],
+            ready,
+            done,
+        ),
+    )
+    worker.start()
+    try:
+        assert ready.wait(10)
+
+        metrics = attach(path)
+        metrics.record("/items", "10.0.0.1")
+        metrics.record("/items", "10.0.0.3")
+
+        assert metrics.request_counts() == {
+            "/items": {"10.0.0.1": 4, "10.0.0.3": 1},
+            "/users": {"10.0.0.2": 1},
+        }
+        assert metrics.shared.merge()[0] == {"/items": 5, "/users": 1}
+        metrics.shared.close()
+    finally:
+        done.set()
+        worker.join(10)
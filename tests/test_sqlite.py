@@ -0,0 +1,87 @@
+"""
+SQLite Production Mode Tests
+File: tests/test_sqlite.py
+"""
+
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from api.db.sqlite import WriteQueue, configure_sqlite_engine, sqlite_pragmas
+
+THREADS = 8
+WRITES = 25
+
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'concurrency.db'}",
+        connect_args={"check_same_thread": False},
+        pool_size=THREADS,
+    )
+    configure_sqlite_engine(engine, sqlite_pragmas())
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE counters (id INTEGER PRIMARY KEY, value INTEGER)"
+        )
+        connection.exec_driver_sql("INSERT INTO counters VALUES (1, 0)")
+    yield engine
+    engine.dispose()
+
+
+def increment(db: Session):
+    value = db.execute(text("SELECT value FROM counters WHERE id = 1")).scalar()
+    db.execute(
+        text("UPDATE counters SET value = :value WHERE id = 1"), {"value": value + 1}
+    )
+
+
+def run_threads(target):
+    errors = []
+
+    def worker():
+        for _ in range(WRITES):
+            try:
+                target()
+            except Exception as error:
+                errors.append(error)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def counter(engine) -> int:
+    with engine.connect() as connection:
+        return connection.exec_driver_sql("SELECT value FROM counters").scalar()
+
+
+def test_sessions_that_read_then_write_wait_for_the_lock(sqlite_engine):
+    def request():
+        # Like a get_db session: reads, writes, commits
+        with Session(sqlite_engine) as db:
+            increment(db)
+            db.commit()
+
+    assert run_threads(request) == []
+
+
+def test_write_queue_loses_no_updates(sqlite_engine):
+    queue = WriteQueue(sqlite_engine)
+
+    assert run_threads(lambda: queue.run(increment)) == []
+    assert counter(sqlite_engine) == THREADS * WRITES
+
+
+def test_write_queue_reads_inside_its_transaction(sqlite_engine):
+    with WriteQueue(sqlite_engine).transaction() as db:
+        increment(db)
+        assert db.connection().connection.in_transaction
+
+    assert counter(sqlite_engine) == 1
@@ -0,0 +1,64 @@
+"""
+Column Type Tests
+File: tests/test_types.py
+"""
+
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, MetaData, String, Table, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.exc import StatementError
+
+from api.db.types import HexUUID, MalformedIdError
+from api.utils.db_validators import check_model_existence, get_model_or_none
+from api.v1.models.base_model import BaseTableModel
+
+
+class KeyedItem(BaseTableModel):
+    __tablename__ = "test_keyed_items"
+
+    name = Column(String)
+
+
+def test_ids_round_trip_as_hex(session):
+    item = KeyedItem(name="a")
+    session.add(item)
+    session.commit()
+    id = item.id
+    session.expunge_all()
+
+    loaded = session.get(KeyedItem, str(uuid.UUID(id)))
+    assert loaded.id == id
+    assert len(loaded.id) == 32
+
+
+def test_malformed_ids_raise_instead_of_matching_null(session):
+    with pytest.raises(StatementError) as error:
+        session.execute(select(KeyedItem).where(KeyedItem.id == "not-an-id"))
+    assert isinstance(error.value.orig, MalformedIdError)
+
+
+def test_lookups_of_malformed_ids_find_nothing(session):
+    assert get_model_or_none(session, KeyedItem, "not-an-id") is None
+    assert KeyedItem.get_by_id(session, "not-an-id") is None
+
+    with pytest.raises(HTTPException) as error:
+        check_model_existence(session, KeyedItem, "not-an-id")
+    assert error.value.status_code == 404
+
+
+@pytest.mark.parametrize("dialect", [postgresql.dialect(), asyncpg.dialect()])
+def test_postgresql_binds_compare_with_uuid_and_varchar_ids(dialect):
+    table = Table("items", MetaData(), Column("id", HexUUID, primary_key=True))
+    id = uuid.uuid4()
+
+    compiled = select(table).where(table.c.id == str(id)).compile(dialect=dialect)
+
+    # No ::UUID cast, which a varchar id column (before migrating) rejects;
+    # hex text is read as a uuid, or matches the hex varchar ids
+    assert "UUID" not in str(compiled)
+    assert compiled.construct_params()["id_1"] == str(id)
+    assert table.c.id.type.process_bind_param(str(id), dialect) == id.hex
@@ -0,0 +1,69 @@
+"""
+Database Warm-up Tests
+File: tests/test_warmup.py
+"""
+
+import pytest
+from sqlalchemy import Column, String, create_engine, event
+from sqlalchemy.orm import Session
+
+from api.db.database import Base
+from api.db.warmup import run_hot_queries
+from api.utils.count_cache import count_cache
+from api.utils.pagination import paginated_response
+from api.v1.models.base_model import BaseTableModel
+
+
+class WarmedItem(BaseTableModel):
+    __tablename__ = "test_warmed_items"
+
+    name = Column(String)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'warmup.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_requests_reuse_the_statements_compiled_at_startup(engine):
+    assert run_hot_queries(engine) > 0
+    # The compiled statements, keyed by statement structure
+    cached = len(engine._compiled_cache)
+    assert cached > 0
+
+    with Session(engine) as db:
+        db.add(WarmedItem(name="first"))
+        db.commit()
+        db.expunge_all()
+        cached = len(engine._compiled_cache)
+
+        db.get(WarmedItem, WarmedItem.id.default.arg(None))
+        paginated_response(db, WarmedItem, skip=0, limit=1, include_total=False)
+
+    assert len(engine._compiled_cache) == cached
+
+
+def test_a_failing_query_does_not_stop_the_others(tmp_path):
+    # No tables at all: every query fails and is skipped
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+
+    assert run_hot_queries(engine) == 0
+    engine.dispose()
+
+
+def test_no_table_is_counted_on_startup(engine):
+    count_cache.clear()
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    run_hot_queries(engine)
+
+    assert statements
+    assert not [s for s in statements if "count(" in s.lower()]